@@ -1,13 +1,18 @@
+import asyncio
 import os
 import operator
 from typing import Annotated, Any, Dict, List, TypedDict, Union
 
 from ai.llm_client import LocalChatOllama as ChatOpenAI
+from ai.llm_scheduler import PRIORITY_CLASSIFICATION
 from langchain_core.messages import BaseMessage, HumanMessage
 from langgraph.graph import StateGraph, END
 
 from app.vector.chroma_store import search_documents
-from ai.risk_model import predict_patient_risk
+from ai.entity_extractor import canonical_test, extract_entities
+from ai.inference_executor import inference_executor
+from ai.intent_classifier import intent_classifier
+from ai.prompt_builder import build_prompt
 from database.db import get_connection
 import pandas as pd
 
@@ -33,16 +38,16 @@ class AgentState(TypedDict):
     numerical_result: Union[int, float, None, str]  # Results from SQL queries
     risk_data: Dict[str, Any]  # Output from the ML risk model
     final_answer: str  # The prompt prepared for the final LLM synthesis
+    prompt_stats: Dict[str, Any]  # Size of final_answer vs. its token budget
 
-# LLM Initialize (LocalChatOllama ignores model param, uses tinyllama from llm_client.py)
-llm = ChatOpenAI(temperature=0)
+# LLM Initialize (the model comes from the 'intent' route of ai/llm_router.py)
+# Intent classification queues behind interactive answers, ahead of background summaries
+llm = ChatOpenAI(temperature=0, priority=PRIORITY_CLASSIFICATION, task="intent")
 
 ### Nodes ###
 
-def categorize_intent(state: AgentState):
-    """
-    LLM-driven intent classification.
-    """
+async def _llm_intent(question: str) -> dict:
+    """LLM intent classification; parsed JSON, or {} if the output was not JSON"""
     prompt = f"""Analyze the user's query and categorize it into exactly one of these intents:
 1. 'rag': Clinical knowledge retrieval, explaining medical terms, or detailed patient lab lookups.
 2. 'count': Quantitative/statistical questions about lab result counts or patient populations.
@@ -53,9 +58,9 @@ Examples of 'unsupported': "Hi", "Tell me a joke", "What's the weather?", "Who a
 
 Return JSON only: {{"intent": "...", "entities": {{"subject_id": "...", "test": "...", "status": "..."}}}}
 
-Query: {state['question']}
+Query: {question}
 """
-    response = llm.invoke([HumanMessage(content=prompt)])
+    response = await llm.ainvoke([HumanMessage(content=prompt)])
     import json
     import re
     
@@ -66,44 +71,52 @@ Query: {state['question']}
         # Try to find JSON block if it's wrapped in markers
         json_match = re.search(r'\{.*\}', content, re.DOTALL)
         if json_match:
-            data = json.loads(json_match.group())
-        else:
-            data = json.loads(content)
+            return json.loads(json_match.group())
+        return json.loads(content)
     except Exception:
-        pass
-        
+        return {}
+
+async def categorize_intent(state: AgentState):
+    """
+    Intent classification: local embedding classifier (milliseconds), with
+    the LLM only when its confidence is below the threshold.
+    """
+    try:
+        intent, confidence = await asyncio.to_thread(intent_classifier.predict, state['question'])
+    except Exception as e:
+        print(f"⚠️ Local intent classifier failed, using the LLM: {e}")
+        intent, confidence = None, 0.0
+
+    if intent_classifier.is_confident(confidence):
+        data = {"intent": intent, "entities": {}}
+    else:
+        data = await _llm_intent(state['question'])
+
     # Post-processing heuristics to fix common local model JSON issues
-    data = data if 'data' in locals() else {"intent": "unsupported", "entities": {}}
+    data = data if data else {"intent": "unsupported", "entities": {}}
     if "entities" not in data: data["entities"] = {}
     
-    lower_content = content.lower()
     lower_question = state['question'].lower()
     
     # 1. Force RAG for "show", "list", "summarize"
     if any(word in lower_question for word in ["show", "list", "summarize", "what are", "results for"]):
         data["intent"] = "rag"
     
-    # 2. Extract/Fix Status
-    if "critical" in lower_question:
-        data["entities"]["status"] = "CRITICAL"
-    elif "abnormal" in lower_question:
-        data["entities"]["status"] = "ABNORMAL"
-    elif "normal" in lower_question:
-        data["entities"]["status"] = "NORMAL"
-        
-    # 3. Extract/Fix subject_id
-    id_match = re.search(r'\d{6,}', lower_question)
-    if id_match:
-        data["entities"]["subject_id"] = id_match.group()
+    # 2. Extract/Fix subject_id, test and status (deterministic extractor wins over the LLM)
+    llm_test = canonical_test(data["entities"].pop("test", None))
+    if llm_test:
+        data["entities"]["test_name"] = llm_test
+    data["entities"].update(extract_entities(state['question']))
 
     return {
         "intent": data.get("intent", "unsupported"),
         "entities": data.get("entities", {})
     }
 
-def retrieve_knowledge(state: AgentState):
+async def retrieve_knowledge(state: AgentState):
     """
     RAG Node: Retrieve semantically relevant chunks from ChromaDB with patient filtering.
+    Embedding + vector search are blocking, so they run in a worker thread.
     """
     query = state['question']
     entities = state.get('entities', {})
@@ -113,22 +126,19 @@ def retrieve_knowledge(state: AgentState):
     if subject_id:
         where_filter = {"subject_id": str(subject_id)}
         
-    results = search_documents(query, k=5, where=where_filter)
+    results = await asyncio.to_thread(search_documents, query, k=5, where=where_filter)
     context = [doc['content'] for doc in results]
     return {"context": context}
 
-def execute_aggregation(state: AgentState):
-    """
-    Aggregator Node: Runs optimized SQL aggregation on the database.
-    Uses the centralized get_connection for thread-safe access.
-    """
-    entities = state['entities']
+def _count_records(entities: Dict[str, Any]) -> str:
+    """Blocking COUNT(*) over lab_interpretations for the given entities"""
     conn = get_connection()
     cur = conn.cursor()
     
     # Safe filtering based on entities using SQL
-    status = entities.get("status", "").upper()
+    status = (entities.get("status") or "").upper()
     subject_id = entities.get("subject_id")
+    test_name = entities.get("test_name")
     
     query = "SELECT COUNT(*) FROM lab_interpretations"
     params = []
@@ -140,6 +150,9 @@ def execute_aggregation(state: AgentState):
     if subject_id:
         where_clauses.append("subject_id = ?")
         params.append(subject_id)
+    if test_name:
+        where_clauses.append("test_name = ?")
+        params.append(test_name)
         
     if where_clauses:
         query += " WHERE " + " AND ".join(where_clauses)
@@ -148,36 +161,59 @@ def execute_aggregation(state: AgentState):
     result = cur.fetchone()[0]
     
     msg = f"Found {result} records"
+    if test_name: msg += f" for {test_name}"
     if status: msg += f" with status {status}"
     if subject_id: msg += f" for patient {subject_id}"
     msg += "."
     
     conn.close()
+    return msg
+
+async def execute_aggregation(state: AgentState):
+    """
+    Aggregator Node: Runs optimized SQL aggregation on the database.
+    Uses the centralized get_connection for thread-safe access; the query
+    runs in a worker thread so the event loop is not blocked.
+    """
+    msg = await asyncio.to_thread(_count_records, state['entities'])
     return {"numerical_result": msg}
 
-def predict_risk(state: AgentState):
+async def predict_risk(state: AgentState):
     """
-    Risk Node: Calls the prediction model.
+    Risk Node: Calls the prediction model (in the inference process pool).
     """
-    subject_id = state['entities'].get("subject_id")
+    subject_id = state['entities'].get("subject_id") or extract_entities(state['question']).get("subject_id")
     if not subject_id:
-        # Try to extract subject_id from question if LLM missed it
+        # Shorter ids than the extractor accepts, e.g. test patients
         import re
         match = re.search(r'\d+', state['question'])
         if match:
-            subject_id = int(match.group())
-            
+            subject_id = match.group()
+
     if subject_id:
-        risk_profile = predict_patient_risk(int(subject_id))
+        risk_profile = await inference_executor.predict_risk(int(subject_id))
         return {"risk_data": risk_profile}
     else:
         return {"risk_data": {"error": "Patient ID not provided for risk assessment."}}
 
+RESPONSE_PROMPT_TEMPLATE = """Base on the following data, provide a clear, professional, and explainable answer.
+Query: {question}
+
+Context (Healthcare Knowledge):
+{context}
+
+Aggregation Result: {num_res}
+Risk Prediction: {risk_res}
+
+Explain the 'why' if providing a risk score or count. If it's a lab result, interpret what it means for the patient's health based on the context.
+
+Answer:"""
+
 def generate_response(state: AgentState):
     """
     Synthesizes the final answer using retrieved data.
+    Context is ranked and trimmed to the intent's prompt token budget.
     """
-    context_str = "\n".join(state.get('context', []))
     num_res = state.get('numerical_result', "")
     risk_res = str(state.get('risk_data', ""))
     
@@ -187,21 +223,18 @@ def generate_response(state: AgentState):
              return {"final_answer": "Hello! I specialized in medical lab records and clinical knowledge. How can I help you today? You can ask me to explain lab terms, check patient results, or provide risk assessments."}
         return {"final_answer": "I'm sorry, I couldn't find any specific clinical data for that query. I am a specialized assistant for medical lab records. Could you please provide more details, a patient ID, or ask a question about lab tests?"}
 
-    prompt = f"""Base on the following data, provide a clear, professional, and explainable answer.
-Query: {state['question']}
+    built = build_prompt(
+        state.get("intent", "rag"),
+        RESPONSE_PROMPT_TEMPLATE,
+        state.get('context', []),
+        question=state['question'],
+        num_res=num_res,
+        risk_res=risk_res,
+    )
+    prompt_stats = {k: v for k, v in built.items() if k != 'prompt'}
 
-Context (Healthcare Knowledge):
-{context_str}
-
-Aggregation Result: {num_res}
-Risk Prediction: {risk_res}
-
-Explain the 'why' if providing a risk score or count. If it's a lab result, interpret what it means for the patient's health based on the context.
-
-Answer:"""
-    
     # The final prompt is passed back to main.py to be used in the streaming response generator.
-    return {"final_answer": prompt}
+    return {"final_answer": built['prompt'], "prompt_stats": prompt_stats}
 
 ### Build Graph ###
 # ... (rest of the graph code remains same, just updating generate_response definition)
@@ -0,0 +1,161 @@
+"""
+Circuit Breaker for the LLM Backend
+Stops sending requests to Ollama while it is down or overloaded, so calls
+fail fast (callers answer with their safe fallback) instead of each one
+holding a thread and a socket until its read timeout.
+
+    closed     normal; failure_threshold consecutive failures open the circuit
+    open       every call is rejected with LLMUnavailable for cooldown_seconds
+    half_open  after the cooldown one trial call goes through; success
+               closes the circuit, failure opens it for another cooldown
+
+Health probes (see ai/llm_lifecycle.py) report through record_success /
+record_failure too, so the circuit closes as soon as Ollama answers
+again, even without traffic.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class LLMUnavailable(RuntimeError):
+    """Rejected without calling the backend because the circuit is open"""
+
+
+class CircuitBreaker:
+    def __init__(self,
+                 name: str = "llm",
+                 failure_threshold: int = LLM_BREAKER_FAILURES,
+                 cooldown_seconds: float = LLM_BREAKER_COOLDOWN_SECONDS):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.opened_since = None
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.opens = 0
+        self._transitions = deque(maxlen=20)
+
+    def _set_state(self, state: str):
+        if state == self.state:
+            return
+        self._transitions.append({'at': datetime.now().isoformat(), 'from': self.state, 'to': state})
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.opened_since = datetime.now().isoformat()
+            self.opens += 1
+        elif state == CLOSED:
+            self.opened_since = None
+
+    def _cooling_down(self) -> bool:
+        return time.monotonic() - self._opened_at < self.cooldown_seconds
+
+    def _reject(self):
+        self.rejected += 1
+        raise LLMUnavailable(f"{self.name} backend unavailable (circuit {self.state}): {self.last_error}")
+
+    def check(self):
+        """Fail fast before queueing; does not take the half-open trial"""
+        with self._lock:
+            if self.state == OPEN and self._cooling_down():
+                self._reject()
+            if self.state == HALF_OPEN and self._trial_in_flight:
+                self._reject()
+
+    def before_call(self):
+        """Raises LLMUnavailable unless this call may go to the backend"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and not self._cooling_down():
+                self._set_state(HALF_OPEN)
+                self._trial_in_flight = False
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self._reject()
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+                print(f"✓ {self.name} circuit closed: backend is answering again")
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(error) or type(error).__name__
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self.consecutive_failures >= self.failure_threshold
+            ):
+                self._set_state(OPEN)
+                print(f"⚠️ {self.name} circuit open for {self.cooldown_seconds:g}s after "
+                      f"{self.consecutive_failures} consecutive failures: {self.last_error}")
+
+    def release(self):
+        """Call ended without a verdict (cancelled); free the half-open trial"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    @contextmanager
+    def guard(self, is_failure=lambda e: True):
+        """before_call + record the outcome of the wrapped backend call"""
+        self.before_call()
+        try:
+            yield
+        except Exception as e:
+            if is_failure(e):
+                self.record_failure(e)
+            else:
+                self.release()
+            raise
+        except BaseException:
+            self.release()
+            raise
+        else:
+            self.record_success()
+
+    def stats(self) -> dict:
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.cooldown_seconds - (time.monotonic() - self._opened_at)), 1)
+            return {
+                'state': self.state,
+                'failure_threshold': self.failure_threshold,
+                'cooldown_seconds': self.cooldown_seconds,
+                'consecutive_failures': self.consecutive_failures,
+                'retry_in_seconds': retry_in,
+                'opened_since': self.opened_since,
+                'last_error': self.last_error,
+                'successes': self.successes,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'opens': self.opens,
+                'transitions': list(self._transitions),
+            }
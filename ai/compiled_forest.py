@@ -0,0 +1,107 @@
+"""
+Compiled Random Forest Inference
+Flattens a fitted RandomForestClassifier (and its StandardScaler) into plain
+NumPy arrays and evaluates all trees with vectorized traversal.
+
+Avoids sklearn's per-call input validation and joblib thread dispatch, which
+dominate the latency of single-patient predictions. Probabilities match
+RandomForestClassifier.predict_proba.
+"""
+
+import numpy as np
+
+
+class CompiledScaler:
+    """NumPy-only equivalent of a fitted StandardScaler.transform"""
+
+    def __init__(self, scaler):
+        n_features = scaler.n_features_in_
+        mean = getattr(scaler, 'mean_', None)
+        scale = getattr(scaler, 'scale_', None)
+        self.mean_ = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class CompiledForest:
+    """
+    All trees of a forest concatenated into flat node arrays:
+    feature, threshold, children and per-node class probabilities.
+    Leaves point to themselves, so traversal is a fixed number of
+    gather steps (the depth of the deepest tree) with no branching.
+    """
+
+    def __init__(self, model):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes)
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop back to themselves
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+            # Per-node class distribution, normalised like DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            totals[totals == 0.0] = 1.0
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(left)
+            rights.append(right)
+            values.append(value / totals)
+            roots.append(offset)
+
+            offset += n_nodes
+            depth = max(depth, tree.max_depth)
+
+        self.classes_ = model.classes_
+        self.n_features_in_ = model.n_features_in_
+        self.feature = np.concatenate(features).astype(np.intp)
+        self.threshold = np.concatenate(thresholds)
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = np.stack(
+            [np.concatenate(lefts), np.concatenate(rights)], axis=1
+        ).ravel().astype(np.intp)
+        self.value = np.concatenate(values)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.depth = depth
+
+    def predict_proba(self, X):
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_rows) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.roots.size))
+
+        for _ in range(self.depth):
+            go_right = flat_X[row_offsets + self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.children[2 * nodes + go_right]
+
+        return self.value[nodes].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def compile_model(model, scaler):
+    """
+    Build compiled equivalents of a fitted forest and scaler.
+    Returns (None, None) for models this engine cannot represent.
+    """
+    estimators = getattr(model, 'estimators_', None)
+    if not estimators or not all(hasattr(e, 'tree_') for e in estimators):
+        return None, None
+    if getattr(model, 'n_outputs_', 1) != 1:
+        return None, None
+
+    return CompiledForest(model), CompiledScaler(scaler)
@@ -0,0 +1,157 @@
+"""
+Entity Extraction
+Pulls subject ids, canonical lab test names and statuses out of a question
+in one pass, for the chat fast paths (app/main.py) and the agent graph.
+
+Test names come from a token trie compiled once at import from the MIMIC
+labels and canonical names of LAB_CANONICAL_MAP, the tests of
+LAB_THRESHOLDS and the common abbreviations in TEST_ALIASES. The scan is
+longest-match over word tokens, so 'red blood cells' wins over 'blood'
+and 'normal' never matches inside 'abnormal'. Test names are returned in
+their canonical form, the one stored in lab_interpretations.test_name.
+"""
+
+import re
+from typing import Optional
+
+from processing.lab_canonical_map import LAB_CANONICAL_MAP
+from rules.thresholds import LAB_THRESHOLDS
+
+
+SUBJECT_ID_MIN_DIGITS = 6
+
+# Abbreviations and spellings beyond the MIMIC labels -> canonical name
+TEST_ALIASES = {
+    "hgb": "Hemoglobin",
+    "hb": "Hemoglobin",
+    "haemoglobin": "Hemoglobin",
+    "hct": "Hematocrit",
+    "haematocrit": "Hematocrit",
+    "red blood cell": "RBC",
+    "red cell count": "RBC",
+    "erythrocytes": "RBC",
+    "white blood cell": "WBC",
+    "white cell count": "WBC",
+    "leukocytes": "WBC",
+    "platelet": "Platelets",
+    "plt": "Platelets",
+    "thrombocytes": "Platelets",
+    "bicarb": "Bicarbonate",
+    "hco3": "Bicarbonate",
+    "bun": "Blood Urea Nitrogen",
+    "urea nitrogen": "Blood Urea Nitrogen",
+    "creat": "Creatinine",
+    "blood sugar": "Glucose",
+    "sugar": "Glucose",
+}
+
+# Status words -> lab_interpretations.status; the most severe one wins
+STATUS_WORDS = {
+    "critical": "CRITICAL",
+    "critically": "CRITICAL",
+    "abnormal": "ABNORMAL",
+    "abnormally": "ABNORMAL",
+    "normal": "NORMAL",
+}
+STATUS_SEVERITY = ["CRITICAL", "ABNORMAL", "NORMAL"]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+# Ids glued to letters or symbols ('p10014354', 'patient#10014354')
+_SUBJECT_ID_RE = re.compile(r"\d{%d,}" % SUBJECT_ID_MIN_DIGITS)
+
+
+def _tokens(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _compile_trie(phrases: dict) -> dict:
+    """Token trie: nested dicts, with the canonical name under the None key"""
+    trie = {}
+    for phrase, canonical in phrases.items():
+        tokens = _tokens(phrase)
+        # Plural of the last word too ('hgbs', 'white blood cells')
+        variants = [tokens]
+        if not tokens[-1].endswith("s") and not tokens[-1].isdigit():
+            variants.append(tokens[:-1] + [tokens[-1] + "s"])
+        for variant in variants:
+            node = trie
+            for token in variant:
+                node = node.setdefault(token, {})
+            node.setdefault(None, canonical)
+    return trie
+
+
+def _test_phrases() -> dict:
+    phrases = {}
+    for label, canonical in LAB_CANONICAL_MAP.items():
+        phrases[label] = canonical
+        phrases[canonical] = canonical
+    for canonical in LAB_THRESHOLDS:
+        phrases[canonical] = canonical
+    phrases.update(TEST_ALIASES)
+    return phrases
+
+
+_TEST_TRIE = _compile_trie(_test_phrases())
+
+
+def _scan_tests(tokens: list[str]) -> list[str]:
+    """Canonical tests in order of mention, longest match first"""
+    found = []
+    i = 0
+    while i < len(tokens):
+        node, match, end = _TEST_TRIE, None, i
+        for j in range(i, len(tokens)):
+            node = node.get(tokens[j])
+            if node is None:
+                break
+            if None in node:
+                match, end = node[None], j + 1
+        if match:
+            if match not in found:
+                found.append(match)
+            i = end
+        else:
+            i += 1
+    return found
+
+
+def canonical_test(name: str) -> Optional[str]:
+    """Canonical test name for a free-text test mention (e.g. from the LLM)"""
+    if not name:
+        return None
+    tests = _scan_tests(_tokens(str(name)))
+    return tests[0] if tests else None
+
+
+def extract_entities(text: str) -> dict:
+    """
+    subject_id (first number of SUBJECT_ID_MIN_DIGITS+ digits, preferring a
+    standalone one over digits glued to other characters), test_name
+    (first test mentioned), tests (all of them) and status; only the keys
+    that were found are present.
+    """
+    tokens = _tokens(text or "")
+    entities = {}
+
+    for token in tokens:
+        if token.isdigit() and len(token) >= SUBJECT_ID_MIN_DIGITS:
+            entities["subject_id"] = token
+            break
+    else:
+        match = _SUBJECT_ID_RE.search(text or "")
+        if match:
+            entities["subject_id"] = match.group()
+
+    tests = _scan_tests(tokens)
+    if tests:
+        entities["test_name"] = tests[0]
+        entities["tests"] = tests
+
+    statuses = {STATUS_WORDS[t] for t in tokens if t in STATUS_WORDS}
+    for status in STATUS_SEVERITY:
+        if status in statuses:
+            entities["status"] = status
+            break
+
+    return entities
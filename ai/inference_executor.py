@@ -0,0 +1,217 @@
+"""
+Risk Model Inference Executor
+Runs predict_patient_risk in a process pool so model loading, SQL and
+inference never block the FastAPI event loop (or hold the GIL of the
+serving process).
+
+- async API for the chat stream and the agent graph nodes
+- workers are spawned, not forked: the serving process is multi-threaded
+  (HTTP clients, background threads, torch), and a forked child can
+  inherit a lock held by another thread and deadlock
+- bounded queue: requests beyond max_queue are rejected immediately
+- per-call timeouts
+- queue depth and latency metrics via stats()
+- prediction cache counters of the workers via cache_stats(); each worker
+  has its own cache, so the API process's cache sees none of this traffic
+
+Failures are returned in the same {'subject_id', 'error'} shape that
+predict_patient_risk already uses, so callers handle a single format.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+
+INFERENCE_WORKERS = int(os.getenv("RISK_INFERENCE_WORKERS", "2"))
+INFERENCE_MAX_QUEUE = int(os.getenv("RISK_INFERENCE_MAX_QUEUE", "64"))
+INFERENCE_TIMEOUT = float(os.getenv("RISK_INFERENCE_TIMEOUT", "10"))
+
+
+def _warm_worker():
+    """Load the model once per worker process"""
+    from ai.risk_model import load_model
+    load_model()
+
+
+def _ping():
+    """No-op task; the pool spawns worker processes on demand"""
+    return os.getpid()
+
+
+def _predict_in_worker(subject_id: int):
+    """(worker pid, prediction, worker prediction-cache stats)"""
+    from ai.risk_model import PREDICTION_CACHE, predict_patient_risk
+    result = predict_patient_risk(subject_id)
+    return os.getpid(), result, PREDICTION_CACHE.stats()
+
+
+_SUMMED_CACHE_COUNTERS = ['entries', 'bytes', 'hits', 'misses', 'evictions', 'invalidations']
+
+
+class InferenceExecutor:
+    def __init__(self,
+                 max_workers: int = INFERENCE_WORKERS,
+                 max_queue: int = INFERENCE_MAX_QUEUE,
+                 timeout: float = INFERENCE_TIMEOUT):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._latencies_ms = deque(maxlen=1000)
+        self._worker_cache_stats = {}  # pid -> cache stats after its last prediction
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker
+            )
+        return self._pool
+
+    def _submit(self, subject_id: int):
+        """Returns (future, start_time), or None when the queue is full"""
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self.rejected += 1
+                return None
+            self._pending += 1
+            self.submitted += 1
+            pool = self._get_pool()
+
+        start = time.perf_counter()
+        try:
+            future = pool.submit(_predict_in_worker, subject_id)
+        except Exception:
+            self._on_done(pool, None)
+            raise
+        future.add_done_callback(lambda f: self._on_done(pool, f))
+        return future, start
+
+    def _on_done(self, pool, future):
+        broken = future is None or (
+            not future.cancelled() and isinstance(future.exception(), BrokenProcessPool)
+        )
+        with self._lock:
+            self._pending -= 1
+            # A crashed worker breaks the whole pool; start a fresh one next
+            # time. Only the first failure of that pool replaces it.
+            if not broken or self._pool is not pool:
+                return
+            self._pool = None
+            self._worker_cache_stats.clear()
+        # Reap the surviving workers and fail whatever is still queued
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _record(self, start: float, outcome: str):
+        with self._lock:
+            self._latencies_ms.append((time.perf_counter() - start) * 1000)
+            if outcome == "ok":
+                self.completed += 1
+            elif outcome == "timeout":
+                self.timeouts += 1
+            else:
+                self.failed += 1
+
+    @staticmethod
+    def _error(subject_id: int, message: str) -> dict:
+        return {'subject_id': subject_id, 'error': message}
+
+    async def predict_risk(self, subject_id: int, timeout: float = None) -> dict:
+        """Awaitable risk prediction; the event loop stays free meanwhile"""
+        try:
+            submitted = self._submit(subject_id)
+        except Exception as e:
+            return self._error(subject_id, f'Risk prediction failed: {e}')
+        if submitted is None:
+            return self._error(subject_id, 'Risk prediction service is busy. Please retry shortly.')
+
+        future, start = submitted
+        try:
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout or self.timeout
+            )
+        except asyncio.TimeoutError:
+            future.cancel()
+            self._record(start, "timeout")
+            return self._error(subject_id, 'Risk prediction timed out.')
+        except Exception as e:
+            self._record(start, "error")
+            return self._error(subject_id, f'Risk prediction failed: {e}')
+
+        pid, prediction, cache_stats = result
+        with self._lock:
+            self._worker_cache_stats[pid] = cache_stats
+        self._record(start, "ok")
+        return prediction
+
+    def cache_stats(self) -> dict:
+        """Prediction cache counters summed over the workers (as of their last prediction)"""
+        with self._lock:
+            per_worker = list(self._worker_cache_stats.values())
+        totals = {key: sum(s[key] for s in per_worker) for key in _SUMMED_CACHE_COUNTERS}
+        lookups = totals['hits'] + totals['misses']
+        return {
+            'workers_reporting': len(per_worker),
+            **totals,
+            'hit_rate': round(totals['hits'] / lookups, 4) if lookups else 0.0,
+            'max_bytes_per_worker': per_worker[0]['max_bytes'] if per_worker else None,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = list(self._latencies_ms)
+            stats = {
+                'workers': self.max_workers,
+                'queue_depth': self._pending,
+                'max_queue': self.max_queue,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'timeouts': self.timeouts,
+                'rejected': self.rejected,
+            }
+
+        if latencies:
+            stats['latency_ms'] = {
+                'p50': round(float(np.percentile(latencies, 50)), 2),
+                'p95': round(float(np.percentile(latencies, 95)), 2),
+                'p99': round(float(np.percentile(latencies, 99)), 2),
+            }
+        return stats
+
+    def start(self):
+        """
+        Spawn the worker processes ahead of the first request; each loads
+        the model in the pool initializer
+        """
+        with self._lock:
+            pool = self._get_pool()
+        for _ in range(self.max_workers):
+            pool.submit(_ping)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._worker_cache_stats.clear()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared executor for all chat-side model calls
+inference_executor = InferenceExecutor()
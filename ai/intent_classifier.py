@@ -0,0 +1,189 @@
+"""
+Local Intent Classifier
+Routes agent questions into rag / count / risk / unsupported with the
+all-MiniLM-L6-v2 encoder that is already loaded for the vector store
+(ai/embedding_service.py), instead of a full LLM generation.
+
+Nearest centroid over a labeled seed set: the example questions of
+chatbot_questions.txt plus SEED_EXAMPLES below. Embeddings are normalized,
+so similarity is a dot product. Confidence is the softmax of the centroid
+similarities; below INTENT_CONFIDENCE_THRESHOLD the agent falls back to
+the LLM classifier.
+
+Accuracy and latency report: python scripts/evaluate_intent_classifier.py
+"""
+
+import os
+import re
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+
+INTENTS = ["rag", "count", "risk", "unsupported"]
+
+INTENT_SEED_PATH = Path(os.getenv("INTENT_SEED_PATH", "chatbot_questions.txt"))
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.6"))
+# Softmax temperature over cosine similarities (lower = more decisive)
+INTENT_SOFTMAX_TEMPERATURE = float(os.getenv("INTENT_SOFTMAX_TEMPERATURE", "0.05"))
+
+# Seeds beyond chatbot_questions.txt; that file has no 'unsupported' examples
+SEED_EXAMPLES = {
+    "rag": [
+        "What does a high potassium level mean?",
+        "Explain the normal range for sodium.",
+        "Show the lab results for patient 10014354.",
+        "What are the abnormal findings for subject 10001726?",
+        "Summarize the critical labs of patient 10014354.",
+        "What is creatinine used to measure?",
+    ],
+    "count": [
+        "How many patients have critical results?",
+        "Count the abnormal glucose results.",
+        "Number of lab results in the database.",
+        "How many normal results does patient 10014354 have?",
+        "How many critical potassium values were recorded?",
+    ],
+    "risk": [
+        "Is patient 10014354 high risk?",
+        "Predict the risk for subject 10001726.",
+        "What is the risk score of patient 10014354?",
+        "How likely is patient 10001726 to be critical?",
+        "Assess the clinical risk of this patient 10014354.",
+    ],
+    "unsupported": [
+        "Hi",
+        "Hello there",
+        "Good morning",
+        "Tell me a joke",
+        "What's the weather today?",
+        "Who are you?",
+        "Thanks!",
+        "What is the capital of France?",
+        "Recommend a good movie",
+        "Can you write me a poem?",
+        "What time is it?",
+        "Help me with my homework",
+    ],
+}
+
+_SECTION_RE = re.compile(r"^##\s*\d+\.\s*Intent:\s*(\w+)", re.IGNORECASE)
+_QUESTION_RE = re.compile(r'^\s*-\s*"(.+)"\s*$')
+
+
+def load_seed_questions(path: Path = INTENT_SEED_PATH) -> dict:
+    """Quoted example questions of chatbot_questions.txt, grouped by intent section"""
+    seeds = {intent: [] for intent in INTENTS}
+    if not Path(path).exists():
+        return seeds
+
+    intent = None
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        section = _SECTION_RE.match(line)
+        if section:
+            intent = section.group(1).lower()
+            continue
+        question = _QUESTION_RE.match(line)
+        if question and intent in seeds:
+            seeds[intent].append(question.group(1))
+    return seeds
+
+
+def seed_examples(path: Path = INTENT_SEED_PATH) -> list[tuple[str, str]]:
+    """(question, intent) pairs of the full seed set"""
+    seeds = load_seed_questions(path)
+    for intent, questions in SEED_EXAMPLES.items():
+        seeds[intent].extend(questions)
+    return [(q, intent) for intent, questions in seeds.items() for q in questions]
+
+
+def _embed(texts: list[str]) -> np.ndarray:
+    from ai.embedding_service import embed_texts
+    return np.asarray(embed_texts(texts), dtype=np.float32)
+
+
+class IntentClassifier:
+    def __init__(self,
+                 threshold: float = INTENT_CONFIDENCE_THRESHOLD,
+                 temperature: float = INTENT_SOFTMAX_TEMPERATURE):
+        self.threshold = threshold
+        self.temperature = temperature
+        self._lock = threading.Lock()
+        self._fit_lock = threading.Lock()  # one seed fit at a time
+        self._intents = None
+        self._centroids = None
+        self._latencies_ms = deque(maxlen=1000)
+        self.predictions = 0
+        self.confident = 0
+
+    def fit(self, examples: list[tuple[str, str]]):
+        """Build one normalized centroid per intent from (question, intent) pairs"""
+        vectors = _embed([q for q, _ in examples])
+        return self.fit_vectors(vectors, [intent for _, intent in examples])
+
+    def fit_vectors(self, vectors: np.ndarray, labels: list[str]):
+        labels = np.asarray(labels)
+        intents = [i for i in INTENTS if np.any(labels == i)]
+        centroids = np.stack([vectors[labels == i].mean(axis=0) for i in intents])
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+
+        with self._lock:
+            self._intents, self._centroids = intents, centroids
+        return self
+
+    def _ensure_fitted(self):
+        """Fit on the seed set once, even when the first questions arrive together"""
+        if self._centroids is not None:
+            return
+        with self._fit_lock:
+            if self._centroids is None:
+                self.fit(seed_examples())
+
+    def scores(self, question: str) -> dict:
+        """Softmax confidence per intent"""
+        self._ensure_fitted()
+        return self.scores_vector(_embed([question])[0])
+
+    def scores_vector(self, vector: np.ndarray) -> dict:
+        similarities = self._centroids @ vector
+        weights = np.exp((similarities - similarities.max()) / self.temperature)
+        weights /= weights.sum()
+        return dict(zip(self._intents, (float(w) for w in weights)))
+
+    def predict(self, question: str) -> tuple[str, float]:
+        """(intent, confidence) of the nearest centroid"""
+        start = time.perf_counter()
+        scores = self.scores(question)
+        intent = max(scores, key=scores.get)
+        confidence = scores[intent]
+
+        with self._lock:
+            self._latencies_ms.append((time.perf_counter() - start) * 1000)
+            self.predictions += 1
+            if confidence >= self.threshold:
+                self.confident += 1
+        return intent, confidence
+
+    def is_confident(self, confidence: float) -> bool:
+        return confidence >= self.threshold
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = list(self._latencies_ms)
+            return {
+                'fitted': self._centroids is not None,
+                'intents': self._intents,
+                'threshold': self.threshold,
+                'predictions': self.predictions,
+                'confident': self.confident,
+                'llm_fallbacks': self.predictions - self.confident,
+                'latency_ms_p50': round(float(np.percentile(latencies, 50)), 2) if latencies else None,
+                'latency_ms_p95': round(float(np.percentile(latencies, 95)), 2) if latencies else None,
+            }
+
+
+# Shared classifier; fitted on first use
+intent_classifier = IntentClassifier()
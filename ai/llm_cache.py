@@ -0,0 +1,210 @@
+"""
+Persistent LLM Response Cache
+SQLite-backed cache of Ollama completions, keyed by a fingerprint of
+(model, prompt, options).
+
+Entries expire after a TTL and the least recently used ones are evicted
+once the stored responses exceed a byte budget. The cache lives in its
+own database file so cache writes never contend with lab ingestion.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+LLM_CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", "database/llm_cache.db"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Run TTL/size eviction every this many writes
+EVICT_EVERY_PUTS = 50
+
+CREATE_LLM_CACHE_SQL = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_hit_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+CREATE_LLM_CACHE_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_llm_last_hit
+ON llm_responses (last_hit_at)
+"""
+
+
+def fingerprint(payload: dict) -> str:
+    """
+    Stable hash of everything that determines a completion.
+    'stream' is excluded so streamed and non-streamed calls share entries.
+    """
+    material = {k: v for k, v in payload.items() if k != "stream"}
+    blob = json.dumps(material, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(self,
+                 path: Path = LLM_CACHE_PATH,
+                 ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(CREATE_LLM_CACHE_SQL)
+            conn.execute(CREATE_LLM_CACHE_INDEX_SQL)
+            self._initialized = True
+        return conn
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key: str):
+        """Cached response text, or None on a miss / expired entry"""
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                conn.close()
+                self._count("misses")
+                return None
+
+            response, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                conn.close()
+                self._count("expired")
+                self._count("misses")
+                return None
+
+            conn.execute(
+                "UPDATE llm_responses SET last_hit_at = ?, hits = hits + 1 WHERE key = ?",
+                (now, key)
+            )
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"⚠️ LLM cache read failed: {e}")
+            self._count("errors")
+            return None
+
+        self._count("hits")
+        return response
+
+    def put(self, key: str, model: str, response: str):
+        if not response:
+            return
+
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        try:
+            conn = self._connect()
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO llm_responses
+                    (key, model, response, size, created_at, last_hit_at, hits)
+                VALUES (?, ?, ?, ?, ?, ?, 0)
+                """,
+                (key, model, response, size, now, now)
+            )
+
+            with self._lock:
+                self._puts += 1
+                evict = self._puts % EVICT_EVERY_PUTS == 0
+            if evict:
+                self._evict(conn, now)
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"⚠️ LLM cache write failed: {e}")
+            self._count("errors")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired entries, then least recently used ones over the byte budget"""
+        conn.execute("BEGIN IMMEDIATE")
+        expired = conn.execute(
+            "DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_responses").fetchone()[0]
+        victims = []
+        if total > self.max_bytes:
+            for key, size in conn.execute(
+                "SELECT key, size FROM llm_responses ORDER BY last_hit_at"
+            ):
+                if total <= self.max_bytes:
+                    break
+                victims.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM llm_responses WHERE key = ?", victims)
+        conn.execute("COMMIT")
+
+        with self._lock:
+            self.expired += expired
+            self.evictions += len(victims)
+
+    def evict(self):
+        """Run TTL and size eviction now"""
+        conn = self._connect()
+        self._evict(conn, time.time())
+        conn.close()
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM llm_responses")
+        conn.close()
+
+    def stats(self) -> dict:
+        try:
+            conn = self._connect()
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_responses"
+            ).fetchone()
+            conn.close()
+        except sqlite3.Error:
+            entries, size = None, None
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': entries,
+                'bytes': size,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'errors': self.errors,
+            }
@@ -1,12 +1,50 @@
+import asyncio
 import json
+import os
+import threading
+import time
 from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
 import requests
 import re
+from requests.adapters import HTTPAdapter
+
+from ai.circuit_breaker import CircuitBreaker
+from ai.llm_cache import LLMResponseCache, fingerprint
+from ai.llm_router import llm_router
+from ai.prompt_builder import estimate_tokens
+from ai.single_flight import SingleFlight, StreamFlights
+from ai.llm_scheduler import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    LLMQueueTimeout,
+    llm_scheduler,
+)
 
 OLLAMA_URL_GENERATE = "http://127.0.0.1:11434/api/generate"
 OLLAMA_URL_CHAT = "http://127.0.0.1:11434/api/chat"
-MODEL = "tinyllama:latest"
+# Default (small tier) model; see ai/llm_router.py for the tiers
+MODEL = llm_router.model("small")
+
+# Connection pool shared by every call in the process (keep-alive)
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "8"))
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "3"))
+# Read timeouts: plain completions / streams and long summaries
+OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "60"))
+OLLAMA_LONG_READ_TIMEOUT = float(os.getenv("OLLAMA_LONG_READ_TIMEOUT", "90"))
+# How long Ollama keeps the model loaded after a request (seconds or "30m"; -1 = forever)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# How the fixed instruction preamble of summaries / ask_llm is sent:
+#   "off"     - inlined at the start of the prompt text (default); Ollama
+#               still reuses its KV cache for the identical leading tokens
+#   "system"  - as the Ollama system prompt; replaces the model's own
+#               Modelfile SYSTEM prompt, so opt in per model
+#   "context" - evaluated once, then passed as Ollama's context (token ids)
+LLM_PREFIX_REUSE = os.getenv("LLM_PREFIX_REUSE", "off")
+
+# Persistent response cache (see ai/llm_cache.py)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
 
 SAFE_FALLBACK = (
     "Some laboratory values are outside expected ranges. "
@@ -14,6 +52,245 @@ SAFE_FALLBACK = (
 )
 
 
+# =====================================================
+# POOLED HTTP CLIENTS
+# =====================================================
+
+_sync_session: Optional[requests.Session] = None
+_async_clients: Dict[Any, Any] = {}  # event loop -> httpx.AsyncClient
+_client_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Process-wide requests session with a keep-alive connection pool"""
+    global _sync_session
+    with _client_lock:
+        if _sync_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=OLLAMA_MAX_CONNECTIONS,
+                pool_block=True,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sync_session = session
+        return _sync_session
+
+
+def get_async_http_client():
+    """
+    Shared httpx.AsyncClient for the running event loop.
+    httpx connections are bound to the loop that opened them, so one
+    client is kept per loop (in practice: the single uvicorn loop).
+    """
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        # Forget clients of loops that no longer exist (e.g. finished asyncio.run)
+        for stale in [l for l in _async_clients if l.is_closed()]:
+            del _async_clients[stale]
+
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=OLLAMA_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(OLLAMA_LONG_READ_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def _timeout(read: float):
+    """(connect, read) timeout pair for requests"""
+    return (OLLAMA_CONNECT_TIMEOUT, read)
+
+
+async def close_http_clients():
+    """Close pooled connections (called on FastAPI shutdown)"""
+    global _sync_session
+    with _client_lock:
+        session, _sync_session = _sync_session, None
+    if session is not None:
+        session.close()
+
+    clients = list(_async_clients.values())
+    _async_clients.clear()
+    for client in clients:
+        if not client.is_closed:
+            await client.aclose()
+
+
+# =====================================================
+# RESPONSE CACHE + REQUEST COALESCING
+# =====================================================
+
+response_cache = LLMResponseCache()
+
+# Identical concurrent requests share one upstream generation
+_sync_flights = SingleFlight()
+_stream_flights = StreamFlights()
+
+
+# Fail fast while Ollama is down (see ai/circuit_breaker.py); cache hits are still served
+llm_breaker = CircuitBreaker("LLM")
+
+
+def is_backend_failure(error: Exception) -> bool:
+    """
+    Connection errors, timeouts and 5xx responses count against the breaker.
+    A 4xx (e.g. an unknown model name in one tier) is a problem with the
+    request and must not open the circuit shared by every tier; our own
+    queue timeouts say nothing about Ollama's health either.
+    """
+    if isinstance(error, LLMQueueTimeout):
+        return False
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status >= 500
+
+    import httpx
+    return isinstance(error, httpx.TransportError)
+
+
+_last_activity = 0.0  # time.monotonic() of the last upstream generation
+
+
+def _note_activity():
+    global _last_activity
+    _last_activity = time.monotonic()
+
+
+def seconds_since_llm_activity() -> float:
+    """Idle time of the model as seen from this process (inf if never used)"""
+    return time.monotonic() - _last_activity if _last_activity else float("inf")
+
+
+def _replay_tokens(text: str) -> List[str]:
+    """Split a cached answer into word-sized tokens for streaming replay"""
+    return re.findall(r"\s*\S+\s*|\s+", text)
+
+
+def _generate(payload: dict, read_timeout: float,
+              priority: int = PRIORITY_INTERACTIVE, deadline: float = None) -> str:
+    """
+    Blocking non-streaming /api/generate call through the response cache.
+    Concurrent identical calls (same fingerprint) share one request, which
+    waits for an admission slot at the given priority (ai/llm_scheduler.py).
+    Raises on connection/HTTP errors and LLMQueueTimeout; failures are never cached.
+    """
+    key = fingerprint(payload)
+    # A follower may be more urgent than the queued leader it joins
+    llm_scheduler.promote(key, priority)
+    return _sync_flights.do(
+        key, lambda: _generate_once(payload, read_timeout, priority, deadline)
+    )
+
+
+def _generate_once(payload: dict, read_timeout: float, priority: int, deadline: float) -> str:
+    key = fingerprint(payload)
+    if LLM_CACHE_ENABLED:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+
+    llm_breaker.check()
+    with llm_scheduler.slot_sync(priority, deadline, key), llm_breaker.guard(is_backend_failure):
+        _note_activity()
+        response = get_http_session().post(OLLAMA_URL_GENERATE, json=payload, timeout=_timeout(read_timeout))
+        response.raise_for_status()
+        text = response.json().get("response", "")
+
+    if LLM_CACHE_ENABLED:
+        response_cache.put(key, payload["model"], text)
+    return text
+
+
+async def _stream_upstream(payload: dict, priority: int, deadline: float) -> AsyncIterator[str]:
+    """
+    Producer of a stream flight: replays a cached answer, or streams from
+    Ollama and caches the answer once generation completed.
+    """
+    import httpx
+
+    key = fingerprint(payload)
+    if LLM_CACHE_ENABLED:
+        cached = await asyncio.to_thread(response_cache.get, key)
+        if cached is not None:
+            for token in _replay_tokens(cached):
+                yield token
+            return
+
+    parts = []
+    completed = False
+    client = get_async_http_client()
+    timeout = httpx.Timeout(OLLAMA_LONG_READ_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT)
+    llm_breaker.check()
+    async with llm_scheduler.slot(priority, deadline, key):
+        with llm_breaker.guard(is_backend_failure):
+            _note_activity()
+            async with client.stream("POST", OLLAMA_URL_GENERATE, json=payload, timeout=timeout) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if "response" in chunk:
+                        parts.append(chunk["response"])
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        completed = True
+                        break
+
+    # Aborted streams are not cached
+    if LLM_CACHE_ENABLED and completed:
+        await asyncio.to_thread(response_cache.put, key, payload["model"], "".join(parts))
+
+
+def _stream_tokens(payload: dict, priority: int = PRIORITY_INTERACTIVE,
+                   deadline: float = None) -> AsyncIterator[str]:
+    """Join (or start) the shared token stream for this payload"""
+    payload = {**payload, "stream": True}
+    key = fingerprint(payload)
+    llm_scheduler.promote(key, priority)
+    return _stream_flights.join(key, lambda: _stream_upstream(payload, priority, deadline))
+
+
+async def _agenerate(payload: dict, priority: int = PRIORITY_INTERACTIVE,
+                     deadline: float = None) -> str:
+    """Async non-streaming generation; shares flights with astream callers"""
+    return "".join([token async for token in _stream_tokens(payload, priority, deadline)])
+
+
+def get_llm_cache_stats() -> dict:
+    return {'enabled': LLM_CACHE_ENABLED, **response_cache.stats()}
+
+
+def get_llm_flight_stats() -> dict:
+    """Leaders = upstream generations started, followers = requests coalesced onto one"""
+    return {
+        'sync': _sync_flights.stats(),
+        'stream': _stream_flights.stats(),
+    }
+
+
+def get_llm_breaker_stats() -> dict:
+    return llm_breaker.stats()
+
+
+def get_llm_routing_stats() -> dict:
+    return llm_router.stats()
+
+
+def get_llm_scheduler_stats() -> dict:
+    return llm_scheduler.stats()
+
+
 class LLMResponse:
     """Mock-like class for consistent response handling across LLM interfaces."""
     def __init__(self, content: str):
@@ -31,65 +308,93 @@ class LocalChatOllama:
     used in the LangGraph agent and streaming endpoints.
     """
 
-    def __init__(self, model: str = None, temperature: float = 0, streaming: bool = False):
-        self.model = MODEL  # Always use the local model
+    def __init__(self, model: str = None, temperature: float = 0, streaming: bool = False,
+                 priority: int = PRIORITY_INTERACTIVE, task: str = "synthesis"):
+        self.model = model  # None = routed by task, see ai/llm_router.py
+        self.task = task
         self.temperature = temperature
         self.streaming = streaming
+        self.priority = priority  # admission class, see ai/llm_scheduler.py
 
-    def invoke(self, messages: List[Any], **kwargs) -> Any:
-        """
-        Synchronous call to Ollama (mimics ChatOpenAI.invoke)
-        """
+    def _admission(self, kwargs: dict) -> tuple:
+        """(priority, deadline) for a call; both can be overridden per call"""
+        priority = kwargs.get("priority")
+        return (self.priority if priority is None else priority), kwargs.get("deadline")
+
+    def _payload(self, messages: List[Any], stream: bool) -> tuple:
+        """(tier, payload); an explicit model bypasses the router"""
         prompt = messages[-1].content if hasattr(messages[-1], "content") else str(messages[-1])
-        
-        payload = {
-            "model": self.model,
+        if self.model:
+            tier, model = "custom", self.model
+        else:
+            tier, model = llm_router.route(self.task, estimate_tokens(prompt))
+
+        return tier, {
+            "model": model,
             "prompt": prompt,
-            "stream": False,
+            "stream": stream,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
             "options": {
                 "temperature": self.temperature,
             }
         }
-        
+
+    def invoke(self, messages: List[Any], **kwargs) -> Any:
+        """
+        Synchronous call to Ollama (mimics ChatOpenAI.invoke)
+        """
+        tier, payload = self._payload(messages, stream=False)
+        start = time.perf_counter()
+
         try:
-            response = requests.post(OLLAMA_URL_GENERATE, json=payload, timeout=60)
-            response.raise_for_status()
-            content = response.json().get("response", "")
-            return LLMResponse(content)
+            text = _generate(payload, OLLAMA_READ_TIMEOUT, *self._admission(kwargs))
         except Exception as e:
+            llm_router.record(tier, time.perf_counter() - start, error=True)
             print(f"Error in LocalChatOllama.invoke: {e}")
             return LLMResponse(SAFE_FALLBACK)
 
+        llm_router.record(tier, time.perf_counter() - start)
+        return LLMResponse(text)
+
+    async def ainvoke(self, messages: List[Any], **kwargs) -> Any:
+        """
+        Asynchronous call to Ollama (mimics ChatOpenAI.ainvoke)
+        """
+        tier, payload = self._payload(messages, stream=False)
+        start = time.perf_counter()
+
+        try:
+            text = await _agenerate(payload, *self._admission(kwargs))
+        except Exception as e:
+            llm_router.record(tier, time.perf_counter() - start, error=True)
+            print(f"Error in LocalChatOllama.ainvoke: {e}")
+            return LLMResponse(SAFE_FALLBACK)
+
+        llm_router.record(tier, time.perf_counter() - start)
+        return LLMResponse(text)
+
     async def astream(self, messages: List[Any], **kwargs) -> AsyncIterator[Any]:
         """
         Asynchronous streaming call to Ollama (mimics ChatOpenAI.astream)
         """
-        prompt = messages[-1].content if hasattr(messages[-1], "content") else str(messages[-1])
-        
-        payload = {
-            "model": self.model,
-            "prompt": prompt,
-            "stream": True,
-            "options": {
-                "temperature": self.temperature,
-            }
-        }
-        
+        tier, payload = self._payload(messages, stream=True)
+        start = time.perf_counter()
+        first_token = None
+
+        # Cached answers are replayed as tokens, so the SSE contract is unchanged;
+        # concurrent identical prompts receive the tokens of one generation
         try:
-            import httpx
-            async with httpx.AsyncClient() as client:
-                async with client.stream("POST", OLLAMA_URL_GENERATE, json=payload, timeout=90) as response:
-                    async for line in response.aiter_lines():
-                        if not line:
-                            continue
-                        chunk = json.loads(line)
-                        if "response" in chunk:
-                            yield LLMChunk(chunk["response"])
-                        if chunk.get("done"):
-                            break
+            async for token in _stream_tokens(payload, *self._admission(kwargs)):
+                if first_token is None:
+                    first_token = time.perf_counter() - start
+                yield LLMChunk(token)
         except Exception as e:
+            llm_router.record(tier, time.perf_counter() - start, error=True)
             print(f"Error in LocalChatOllama.astream: {e}")
             yield LLMChunk(" Error connecting to local LLM.")
+            return
+
+        llm_router.record(tier, time.perf_counter() - start, first_token)
 
 
 def _clean_text(text: str) -> str:
@@ -127,21 +432,11 @@ def _clean_text(text: str) -> str:
     return text
 
 
-def generate_ai_summary(lab_results: list[dict]) -> str:
-    """
-    Generate a safe, non-diagnostic AI summary.
-    """
-
-    if not lab_results:
-        return "No abnormal or critical lab findings were detected."
+# =====================================================
+# PROMPT PREFIX REUSE
+# =====================================================
 
-    findings = "\n".join(
-        f"- {lab['test_name']} is {lab['status']} "
-        f"(value: {lab['value']} {lab['unit']})"
-        for lab in lab_results
-    )
-
-    prompt = f"""
+SUMMARY_INSTRUCTIONS = """
 You are a clinical explanation assistant.
 
 STRICT RULES:
@@ -151,7 +446,109 @@ STRICT RULES:
 - Use cautious, observational language
 - Always advise clinician review
 - Do Not Involve the above mentioned rules in your answer
+"""
+
+DATA_ASSISTANT_INSTRUCTIONS = """
+You are a clinical data assistant.
+
+Rules:
+- Use ONLY the provided data
+- Do NOT diagnose
+- Do NOT suggest treatment
+- Explain clearly in simple language
+- Do Not Involve the above mentioned rules in your answer
+"""
+
+_prefix_contexts: Dict[tuple, List[int]] = {}
+_prefix_stats = {'primed': 0, 'prime_failures': 0}
+
+
+def _prefix_context(model: str, instructions: str, priority: int) -> Optional[List[int]]:
+    """
+    Ollama context (token ids) of the evaluated instructions, primed once per
+    process. Token ids stay valid across model reloads; Ollama re-evaluates
+    them once after a reload. None if priming failed.
+    """
+    key = (model, instructions)
+    if key in _prefix_contexts:
+        return _prefix_contexts[key] or None
+
+    payload = {
+        "model": model,
+        "prompt": instructions.strip(),
+        "stream": False,
+        # Evaluate the instructions only: no template around them and no
+        # generated token appended to the returned context
+        "raw": True,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": {"num_predict": 0, "temperature": 0},
+    }
+
+    def prime():
+        llm_breaker.check()
+        with llm_scheduler.slot_sync(priority), llm_breaker.guard(is_backend_failure):
+            _note_activity()
+            response = get_http_session().post(
+                OLLAMA_URL_GENERATE, json=payload, timeout=_timeout(OLLAMA_READ_TIMEOUT)
+            )
+            response.raise_for_status()
+            return response.json().get("context")
+
+    try:
+        context = _sync_flights.do("prefix:" + fingerprint(payload), prime)
+    except Exception as e:
+        print(f"⚠️ Prompt prefix priming failed, sending full prompts: {e}")
+        _prefix_stats['prime_failures'] += 1
+        return None
+
+    # An empty context (server without context support) is remembered too
+    _prefix_contexts[key] = context or []
+    _prefix_stats['primed'] += 1
+    return context or None
+
+
+def _with_instructions(payload: dict, instructions: str, prompt: str,
+                       priority: int = PRIORITY_INTERACTIVE) -> dict:
+    """
+    Attach the fixed instruction preamble according to LLM_PREFIX_REUSE, so
+    Ollama can reuse its evaluation instead of re-reading it every request.
+    Blocking when a context still has to be primed.
+    """
+    if LLM_PREFIX_REUSE == "system":
+        return {**payload, "system": instructions.strip(), "prompt": prompt.strip()}
+
+    if LLM_PREFIX_REUSE == "context":
+        context = _prefix_context(payload["model"], instructions, priority)
+        if context:
+            return {**payload, "context": context, "prompt": prompt.strip()}
+
+    return {**payload, "prompt": instructions + prompt}
+
+
+def get_llm_prefix_stats() -> dict:
+    contexts = [c for c in _prefix_contexts.values() if c]
+    return {'mode': LLM_PREFIX_REUSE, 'contexts': len(contexts), **_prefix_stats}
+
 
+# =====================================================
+# AI SUMMARIES
+# =====================================================
+
+NO_FINDINGS_SUMMARY = "No abnormal or critical lab findings were detected."
+
+# A sentence ends at . ! ? followed by whitespace (so "1.5" is not split)
+_SENTENCE_END_RE = re.compile(r"[.!?](?=\s)")
+
+
+def _summary_payload(lab_results: list[dict], model: str = MODEL,
+                     priority: int = PRIORITY_BACKGROUND) -> dict:
+    findings = "\n".join(
+        f"- {lab['test_name']} is {lab['status']} "
+        f"(value: {lab['value']} {lab['unit']})"
+        for lab in lab_results
+    )
+
+    prompt = f"""
 LAB FINDINGS:
 {findings}
 
@@ -159,9 +556,9 @@ Provide a concise explanation in 2–3 complete sentences.
 """
 
     payload = {
-        "model": MODEL,
-        "prompt": prompt,
+        "model": model,
         "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
         "options": {
             "num_predict": 180,
             "temperature": 0.2,
@@ -169,33 +566,79 @@ Provide a concise explanation in 2–3 complete sentences.
         },
         "stop": ["\n\n", "###"]
     }
+    return _with_instructions(payload, SUMMARY_INSTRUCTIONS, prompt, priority)
 
-    try:
-        response = requests.post(
-            OLLAMA_URL_GENERATE,
-            json=payload,
-            timeout=90
-        )
-        response.raise_for_status()
 
-        raw_text = response.json().get("response", "")
-        return _clean_text(raw_text)
+def generate_ai_summary(lab_results: list[dict], priority: int = PRIORITY_BACKGROUND) -> str:
+    """
+    Generate a safe, non-diagnostic AI summary.
+    Runs as background work by default so it never delays chat answers.
+    """
 
+    if not lab_results:
+        return NO_FINDINGS_SUMMARY
+
+    tier, model = llm_router.route("summary")
+    start = time.perf_counter()
+    try:
+        raw_text = _generate(_summary_payload(lab_results, model, priority), OLLAMA_LONG_READ_TIMEOUT, priority)
     except Exception:
+        llm_router.record(tier, time.perf_counter() - start, error=True)
         return SAFE_FALLBACK
 
+    llm_router.record(tier, time.perf_counter() - start)
+    return _clean_text(raw_text)
 
-def ask_llm(context: str, question: str) -> str:
-    prompt = f"""
-You are a clinical data assistant.
 
-Rules:
-- Use ONLY the provided data
-- Do NOT diagnose
-- Do NOT suggest treatment
-- Explain clearly in simple language
-- Do Not Involve the above mentioned rules in your answer
+async def _clean_sentences(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Apply _clean_text per completed sentence, so nothing reaches the client
+    before the safety pass. The joined output equals _clean_text(full text).
+    """
+    buffer = ""
+    emitted = False
+    async for token in tokens:
+        buffer += token
+        while (match := _SENTENCE_END_RE.search(buffer)) is not None:
+            sentence, buffer = buffer[:match.end()], buffer[match.end():]
+            if sentence.strip():
+                yield (" " if emitted else "") + _clean_text(sentence)
+                emitted = True
+
+    # Trailing fragment: _clean_text completes it (or gives the fallback if nothing came)
+    if buffer.strip() or not emitted:
+        yield (" " if emitted else "") + _clean_text(buffer)
+
+
+async def astream_ai_summary(lab_results: list[dict],
+                             priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[str]:
+    """
+    Streaming generate_ai_summary: yields cleaned sentences as they complete.
+    Shares the generation (and the response cache) with identical requests;
+    raises on connection/HTTP errors so callers can decide what to cache.
+    """
+    if not lab_results:
+        yield NO_FINDINGS_SUMMARY
+        return
+
+    tier, model = llm_router.route("summary")
+    start = time.perf_counter()
+    first_sentence = None
+    try:
+        payload = await asyncio.to_thread(_summary_payload, lab_results, model, priority)
+        async for sentence in _clean_sentences(_stream_tokens(payload, priority)):
+            if first_sentence is None:
+                first_sentence = time.perf_counter() - start
+            yield sentence
+    except Exception:
+        llm_router.record(tier, time.perf_counter() - start, error=True)
+        raise
+
+    llm_router.record(tier, time.perf_counter() - start, first_sentence)
+
 
+def ask_llm(context: str, question: str) -> str:
+    prompt = f"""
 DATA:
 {context}
 
@@ -205,16 +648,25 @@ QUESTION:
 Answer concisely.
 """
 
+    tier, model = llm_router.route("ask", estimate_tokens(prompt))
     payload = {
-        "model": MODEL,
-        "prompt": prompt,
+        "model": model,
         "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
         "options": {
             "temperature": 0.2,
             "num_predict": 200
         }
     }
+    payload = _with_instructions(payload, DATA_ASSISTANT_INSTRUCTIONS, prompt)
+
+    start = time.perf_counter()
+    try:
+        text = _generate(payload, OLLAMA_READ_TIMEOUT)
+    except Exception:
+        llm_router.record(tier, time.perf_counter() - start, error=True)
+        raise
 
-    response = requests.post(OLLAMA_URL_GENERATE, json=payload, timeout=60)
-    return response.json().get("response", "").strip()
+    llm_router.record(tier, time.perf_counter() - start)
+    return text.strip()
 
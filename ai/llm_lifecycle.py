@@ -0,0 +1,202 @@
+"""
+LLM Backend Lifecycle
+Keeps the Ollama model loaded so no chat request pays the model load.
+
+- warm-up at startup: an empty-prompt /api/generate call (Ollama's way to
+  load a model) with keep_alive, retried until it succeeds
+- keep-alive pings while traffic is low: if no generation ran for
+  OLLAMA_PING_SECONDS, the load request is repeated, which also renews
+  keep_alive. Real requests renew it too, so busy servers never ping.
+- readiness: ready only once the default (small tier) model loaded; a
+  failed ping marks the backend not ready until the next successful one.
+  Other tiers' models are loaded best-effort: a missing LLM_MODEL_LARGE
+  is reported in status() but does not gate readiness or the breaker
+
+Pings bypass the admission scheduler: they are tiny, and only sent when
+the model is idle anyway. They also serve as health probes for the LLM
+circuit breaker: while the circuit is not closed, a ping is sent every
+OLLAMA_WARMUP_RETRY_SECONDS and its outcome is recorded, so the circuit
+closes as soon as Ollama answers again.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from ai.llm_client import (
+    OLLAMA_CONNECT_TIMEOUT,
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_URL_GENERATE,
+    get_async_http_client,
+    is_backend_failure,
+    llm_breaker,
+    seconds_since_llm_activity,
+)
+from ai.circuit_breaker import CLOSED
+from ai.llm_router import llm_router
+
+
+OLLAMA_PING_SECONDS = float(os.getenv("OLLAMA_PING_SECONDS", "240"))
+OLLAMA_WARMUP_RETRY_SECONDS = float(os.getenv("OLLAMA_WARMUP_RETRY_SECONDS", "5"))
+# First load of a model from disk can take a while on CPU
+OLLAMA_WARMUP_TIMEOUT = float(os.getenv("OLLAMA_WARMUP_TIMEOUT", "120"))
+
+
+class LLMLifecycle:
+    def __init__(self,
+                 ping_seconds: float = OLLAMA_PING_SECONDS,
+                 retry_seconds: float = OLLAMA_WARMUP_RETRY_SECONDS):
+        self.ping_seconds = ping_seconds
+        self.retry_seconds = retry_seconds
+        self.state = "stopped"  # stopped -> warming -> ready (<-> degraded)
+        self.ready = False
+        self._task = None
+        self.warmup_attempts = 0
+        self.warmup_ms = None
+        self.ready_since = None
+        self.pings = 0
+        self.last_ping = None
+        self.last_error = None
+        self.model_errors = {}  # non-default model -> last load error
+        self._last_load = 0.0
+
+    async def _load_model(self) -> float:
+        """Load (or keep) the default model in Ollama; returns elapsed ms, raises on failure"""
+        import httpx
+
+        start = time.perf_counter()
+        response = await get_async_http_client().post(
+            OLLAMA_URL_GENERATE,
+            json={"model": llm_router.model("small"), "prompt": "", "stream": False,
+                  "keep_alive": OLLAMA_KEEP_ALIVE},
+            timeout=httpx.Timeout(OLLAMA_WARMUP_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+        )
+        response.raise_for_status()
+        self._last_load = time.monotonic()
+        return (time.perf_counter() - start) * 1000
+
+    async def _load_other_models(self):
+        """Best-effort load of the other tiers' models; failures are only reported"""
+        import httpx
+
+        client = get_async_http_client()
+        for model in llm_router.models():
+            if model == llm_router.model("small"):
+                continue
+            try:
+                response = await client.post(
+                    OLLAMA_URL_GENERATE,
+                    json={"model": model, "prompt": "", "stream": False, "keep_alive": OLLAMA_KEEP_ALIVE},
+                    timeout=httpx.Timeout(OLLAMA_WARMUP_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+                )
+                response.raise_for_status()
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                if self.model_errors.get(model) is None:
+                    print(f"⚠️ LLM model {model} could not be loaded: {error}")
+                self.model_errors[model] = error
+            else:
+                self.model_errors.pop(model, None)
+
+    async def warm_up(self):
+        """Retry loading the model until it succeeds"""
+        self.state = "warming"
+        while True:
+            self.warmup_attempts += 1
+            try:
+                self.warmup_ms = round(await self._load_model(), 1)
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                print(f"⚠️ LLM warm-up failed ({self.last_error}); retrying in {self.retry_seconds:g}s")
+                await asyncio.sleep(self.retry_seconds)
+                continue
+
+            llm_breaker.record_success()
+            self._mark_ready()
+            print(f"✓ LLM model {llm_router.model('small')} loaded in {self.warmup_ms:.0f}ms (keep_alive {OLLAMA_KEEP_ALIVE})")
+            await self._load_other_models()
+            return
+
+    async def ping(self):
+        self.pings += 1
+        self.last_ping = datetime.now().isoformat()
+        try:
+            await self._load_model()
+        except Exception as e:
+            if is_backend_failure(e):
+                llm_breaker.record_failure(e)
+            self.last_error = str(e) or type(e).__name__
+            if self.ready:
+                print(f"⚠️ LLM keep-alive ping failed: {self.last_error}")
+            self.ready = False
+            self.state = "degraded"
+            return
+        llm_breaker.record_success()
+        if not self.ready:
+            self._mark_ready()
+        await self._load_other_models()
+
+    def _mark_ready(self):
+        self.ready = True
+        self.state = "ready"
+        self.ready_since = datetime.now().isoformat()
+        self.last_error = None
+
+    def _idle_seconds(self) -> float:
+        """Since the model was last used by a request, warm-up or ping"""
+        own = time.monotonic() - self._last_load if self._last_load else float("inf")
+        return min(own, seconds_since_llm_activity())
+
+    async def _run(self):
+        await self.warm_up()
+        while True:
+            if not self.ready or llm_breaker.state != CLOSED:
+                await asyncio.sleep(self.retry_seconds)
+                await self.ping()
+                continue
+
+            # Only ping when no real request renewed keep_alive recently
+            idle = self._idle_seconds()
+            if idle < self.ping_seconds:
+                await asyncio.sleep(self.ping_seconds - idle)
+                continue
+            await self.ping()
+
+    def start(self):
+        """Warm up and keep alive in the background (call from the running loop)"""
+        if self._task is None or self._task.done():
+            self.state = "warming"
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.ready = False
+        self.state = "stopped"
+
+    def status(self) -> dict:
+        return {
+            'ready': self.ready,
+            'state': self.state,
+            'models': llm_router.models(),
+            'model_errors': dict(self.model_errors),
+            'keep_alive': OLLAMA_KEEP_ALIVE,
+            'warmup_attempts': self.warmup_attempts,
+            'warmup_ms': self.warmup_ms,
+            'ready_since': self.ready_since,
+            'idle_seconds': round(min(self._idle_seconds(), 10 ** 9), 1),
+            'pings': self.pings,
+            'last_ping': self.last_ping,
+            'last_error': self.last_error,
+            'circuit': llm_breaker.state,
+        }
+
+
+# Shared lifecycle manager for the FastAPI app
+llm_lifecycle = LLMLifecycle()
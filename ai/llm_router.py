@@ -0,0 +1,131 @@
+"""
+LLM Model Tiers and Routing
+Sends each LLM task to the smallest model that is good enough:
+
+    small  - fast model for short templated answers (count / risk fast
+             paths), intent JSON and AI summaries
+    large  - optional bigger model for long syntheses (agent answers,
+             knowledge explanations); falls back to small when unset
+
+A task routed 'auto' goes to the large tier only when its prompt has at
+least LLM_ROUTE_AUTO_MIN_TOKENS tokens, so short agent answers stay fast.
+Tiers and routes are environment settings (LLM_MODEL_SMALL / _LARGE,
+LLM_ROUTE_<TASK>), so quality can be traded for throughput without code
+changes. Every decision and the latency per tier are recorded.
+"""
+
+import os
+import threading
+from collections import deque
+
+import numpy as np
+
+
+DEFAULT_MODEL = "tinyllama:latest"
+
+LLM_MODEL_TIERS = {
+    "small": os.getenv("LLM_MODEL_SMALL", DEFAULT_MODEL),
+    "large": os.getenv("LLM_MODEL_LARGE", ""),
+}
+
+LLM_ROUTE_AUTO_MIN_TOKENS = int(os.getenv("LLM_ROUTE_AUTO_MIN_TOKENS", "256"))
+
+# task -> 'small' | 'large' | 'auto'
+DEFAULT_ROUTES = {
+    "intent": "small",
+    "count": "small",
+    "risk": "small",
+    "summary": "small",
+    "ask": "small",
+    "knowledge": "auto",
+    "synthesis": "auto",
+}
+
+LLM_ROUTES = {
+    task: os.getenv(f"LLM_ROUTE_{task.upper()}", tier)
+    for task, tier in DEFAULT_ROUTES.items()
+}
+
+
+class LLMRouter:
+    def __init__(self, tiers: dict = None, routes: dict = None,
+                 auto_min_tokens: int = LLM_ROUTE_AUTO_MIN_TOKENS):
+        self.tiers = dict(tiers or LLM_MODEL_TIERS)
+        self.routes = dict(routes or LLM_ROUTES)
+        self.auto_min_tokens = auto_min_tokens
+        self._lock = threading.Lock()
+        self._decisions = {}     # (task, tier) -> count
+        self._calls = {}         # tier -> completed calls
+        self._latencies_ms = {}  # tier -> deque of total latencies
+        self._ttft_ms = {}       # tier -> deque of time to first token (streams)
+        self._errors = {}        # tier -> count
+        self._recent = deque(maxlen=50)
+
+    def model(self, tier: str) -> str:
+        """Model of a tier; unconfigured tiers fall back to small"""
+        return self.tiers.get(tier) or self.tiers["small"]
+
+    def models(self) -> list[str]:
+        """Distinct configured models (e.g. to warm them all up)"""
+        return list(dict.fromkeys(m for m in self.tiers.values() if m))
+
+    def route(self, task: str, prompt_tokens: int = None) -> tuple[str, str]:
+        """(tier, model) for a task; unknown tasks go to small"""
+        tier = self.routes.get(task, "small")
+        if tier == "auto":
+            tier = "large" if (prompt_tokens or 0) >= self.auto_min_tokens else "small"
+        if tier != "small" and not self.tiers.get(tier):
+            tier = "small"
+
+        with self._lock:
+            self._decisions[(task, tier)] = self._decisions.get((task, tier), 0) + 1
+            self._recent.append({'task': task, 'tier': tier, 'prompt_tokens': prompt_tokens})
+        return tier, self.model(tier)
+
+    def record(self, tier: str, seconds: float, first_token_seconds: float = None, error: bool = False):
+        with self._lock:
+            if error:
+                self._errors[tier] = self._errors.get(tier, 0) + 1
+                return
+            self._calls[tier] = self._calls.get(tier, 0) + 1
+            self._latencies_ms.setdefault(tier, deque(maxlen=1000)).append(seconds * 1000)
+            if first_token_seconds is not None:
+                self._ttft_ms.setdefault(tier, deque(maxlen=1000)).append(first_token_seconds * 1000)
+
+    @staticmethod
+    def _percentiles(values) -> dict:
+        if not values:
+            return None
+        return {
+            'p50': round(float(np.percentile(values, 50)), 1),
+            'p95': round(float(np.percentile(values, 95)), 1),
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            tiers = {}
+            for tier in sorted(set(self.tiers) | set(self._latencies_ms) | set(self._errors)):
+                tiers[tier] = {
+                    'model': self.model(tier),
+                    'configured': bool(self.tiers.get(tier)),
+                    'calls': self._calls.get(tier, 0),
+                    'errors': self._errors.get(tier, 0),
+                    'latency_ms': self._percentiles(list(self._latencies_ms.get(tier, ()))),
+                    'first_token_ms': self._percentiles(list(self._ttft_ms.get(tier, ()))),
+                }
+
+            decisions = {}
+            for (task, tier), count in self._decisions.items():
+                decisions.setdefault(task, {})[tier] = count
+
+            return {
+                'routes': dict(self.routes),
+                'auto_min_tokens': self.auto_min_tokens,
+                'tiers': tiers,
+                'decisions': decisions,
+                'recent': list(self._recent)[-10:],
+            }
+
+
+# Shared router for the process
+llm_router = LLMRouter()
@@ -0,0 +1,249 @@
+"""
+LLM Admission Scheduler
+Every upstream Ollama call needs a slot. At most max_concurrency calls run
+at once; the rest wait in a priority queue:
+
+    interactive (chat answers) > classification (agent intent) > background (AI summaries)
+
+FIFO within a priority. A waiter gives up with LLMQueueTimeout when its
+deadline passes before it is admitted, and an async waiter that is
+cancelled (e.g. the client disconnected) leaves the queue immediately.
+
+Works for both threads and asyncio tasks, since background summaries run
+in the threadpool while chat runs on the event loop.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional
+
+import numpy as np
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_CLASSIFICATION = 1
+PRIORITY_BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_CLASSIFICATION: "classification",
+    PRIORITY_BACKGROUND: "background",
+}
+
+# Concurrent generations sent to Ollama (match OLLAMA_NUM_PARALLEL)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "1"))
+
+# Default max queue wait per priority in seconds (0 = wait indefinitely)
+DEFAULT_QUEUE_TIMEOUTS = {
+    PRIORITY_INTERACTIVE: float(os.getenv("LLM_QUEUE_TIMEOUT_INTERACTIVE", "30")),
+    PRIORITY_CLASSIFICATION: float(os.getenv("LLM_QUEUE_TIMEOUT_CLASSIFICATION", "30")),
+    PRIORITY_BACKGROUND: float(os.getenv("LLM_QUEUE_TIMEOUT_BACKGROUND", "0")),
+}
+
+
+class LLMQueueTimeout(TimeoutError):
+    """The request was not admitted before its deadline"""
+
+
+def deadline_in(seconds: float) -> float:
+    """Absolute deadline (time.monotonic based) for a relative budget"""
+    return time.monotonic() + seconds
+
+
+class _Waiter:
+    __slots__ = ("priority", "key", "deadline", "enqueued",
+                 "granted", "abandoned", "event", "loop", "future")
+
+    def __init__(self, priority, key, deadline, loop=None):
+        self.priority = priority
+        self.key = key
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.abandoned = False
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+
+class LLMScheduler:
+    def __init__(self,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 queue_timeouts: dict = None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_timeouts = queue_timeouts or dict(DEFAULT_QUEUE_TIMEOUTS)
+        self._lock = threading.Lock()
+        self._heap = []  # (priority, seq, waiter); stale entries skipped lazily
+        self._seq = itertools.count()
+        self._active = 0
+        self._depth = {p: 0 for p in PRIORITY_NAMES}
+        self._waits_ms = {p: deque(maxlen=1000) for p in PRIORITY_NAMES}
+        self.admitted = {p: 0 for p in PRIORITY_NAMES}
+        self.timed_out = {p: 0 for p in PRIORITY_NAMES}
+        self.cancelled = {p: 0 for p in PRIORITY_NAMES}
+        self.promoted = 0
+
+    # ---------------- queue internals (call with self._lock held) ----------------
+
+    def _default_deadline(self, priority: int, deadline: Optional[float]) -> Optional[float]:
+        if deadline is not None:
+            return deadline
+        timeout = self.queue_timeouts.get(priority, 0)
+        return deadline_in(timeout) if timeout else None
+
+    def _enqueue(self, priority, deadline, key, loop=None) -> _Waiter:
+        waiter = _Waiter(priority, key, self._default_deadline(priority, deadline), loop)
+        with self._lock:
+            self._depth[priority] += 1
+            heapq.heappush(self._heap, (priority, next(self._seq), waiter))
+            self._grant_next()
+        return waiter
+
+    def _grant_next(self):
+        now = time.monotonic()
+        while self._active < self.max_concurrency and self._heap:
+            priority, _, waiter = heapq.heappop(self._heap)
+            if waiter.abandoned or waiter.granted or priority != waiter.priority:
+                continue
+            # Leave expired waiters for their own timeout handling
+            if waiter.deadline is not None and waiter.deadline <= now:
+                continue
+
+            waiter.granted = True
+            self._active += 1
+            self._depth[waiter.priority] -= 1
+            self.admitted[waiter.priority] += 1
+            self._waits_ms[waiter.priority].append((now - waiter.enqueued) * 1000)
+            waiter.wake()
+
+    def _abandon(self, waiter: _Waiter, counter: dict):
+        waiter.abandoned = True
+        self._depth[waiter.priority] -= 1
+        counter[waiter.priority] += 1
+
+    # ---------------- public API ----------------
+
+    def release(self):
+        with self._lock:
+            self._active -= 1
+            self._grant_next()
+
+    def promote(self, key: str, priority: int):
+        """
+        Raise the priority of a queued request (e.g. an interactive request
+        coalesced onto a queued background generation of the same prompt).
+        """
+        if key is None:
+            return
+        with self._lock:
+            for _, _, waiter in list(self._heap):
+                if (waiter.key == key and not waiter.granted and not waiter.abandoned
+                        and priority < waiter.priority):
+                    self._depth[waiter.priority] -= 1
+                    self._depth[priority] += 1
+                    waiter.priority = priority
+                    heapq.heappush(self._heap, (priority, next(self._seq), waiter))
+                    self.promoted += 1
+            self._grant_next()
+
+    def acquire_sync(self, priority: int = PRIORITY_INTERACTIVE,
+                     deadline: float = None, key: str = None):
+        """Block the calling thread until admitted; raises LLMQueueTimeout"""
+        waiter = self._enqueue(priority, deadline, key)
+        waiter.event.wait(waiter.remaining())
+        with self._lock:
+            if waiter.granted:
+                return
+            self._abandon(waiter, self.timed_out)
+        raise LLMQueueTimeout(f"LLM request not admitted within its deadline ({PRIORITY_NAMES[priority]})")
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE,
+                      deadline: float = None, key: str = None):
+        """Wait on the event loop until admitted; raises LLMQueueTimeout"""
+        waiter = self._enqueue(priority, deadline, key, loop=asyncio.get_running_loop())
+        try:
+            await asyncio.wait_for(waiter.future, waiter.remaining())
+        except asyncio.TimeoutError:
+            with self._lock:
+                if waiter.granted:
+                    return
+                self._abandon(waiter, self.timed_out)
+            raise LLMQueueTimeout(f"LLM request not admitted within its deadline ({PRIORITY_NAMES[priority]})")
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._abandon(waiter, self.cancelled)
+            if granted:
+                self.release()
+            raise
+
+    @contextmanager
+    def slot_sync(self, priority: int = PRIORITY_INTERACTIVE,
+                  deadline: float = None, key: str = None):
+        self.acquire_sync(priority, deadline, key)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE,
+                   deadline: float = None, key: str = None):
+        await self.acquire(priority, deadline, key)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {
+                'max_concurrency': self.max_concurrency,
+                'active': self._active,
+                'queue_depth': sum(self._depth.values()),
+                'promoted': self.promoted,
+                'priorities': {},
+            }
+            waits = {p: list(w) for p, w in self._waits_ms.items()}
+            for priority, name in PRIORITY_NAMES.items():
+                stats['priorities'][name] = {
+                    'queue_depth': self._depth[priority],
+                    'admitted': self.admitted[priority],
+                    'timed_out': self.timed_out[priority],
+                    'cancelled': self.cancelled[priority],
+                }
+
+        for priority, name in PRIORITY_NAMES.items():
+            if waits[priority]:
+                stats['priorities'][name]['wait_ms'] = {
+                    'p50': round(float(np.percentile(waits[priority], 50)), 2),
+                    'p95': round(float(np.percentile(waits[priority], 95)), 2),
+                    'p99': round(float(np.percentile(waits[priority], 99)), 2),
+                }
+        return stats
+
+
+# Shared scheduler for every Ollama call in the process
+llm_scheduler = LLMScheduler()
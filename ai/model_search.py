@@ -0,0 +1,226 @@
+"""
+Risk Model Hyperparameter Search
+Runs a hyperparameter grid with cross-validation on a process pool and
+benchmarks every candidate for accuracy, artifact size, load time and
+inference latency, then keeps the most accurate model that fits the
+serving latency budget.
+"""
+
+import io
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import product
+
+import numpy as np
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from ai.compiled_forest import compile_model
+from database.repository import get_lab_row_watermark
+from ai.risk_model import (
+    MODELS_DIR,
+    USE_COMPILED_INFERENCE,
+    build_model,
+    ensure_models_dir,
+    holdout_scheme,
+    prepare_training_data,
+    save_model,
+    split_training_data,
+)
+
+
+DEFAULT_PARAM_GRID = {
+    'n_estimators': [25, 50, 100, 200],
+    'max_depth': [6, 10, 14],
+    'min_samples_split': [2, 5],
+}
+
+# p99 single-row latency (ms) the served model must stay under
+DEFAULT_LATENCY_BUDGET_MS = 2.0
+
+SEARCH_REPORT_PATH = os.path.join(MODELS_DIR, "search_report.json")
+
+BATCH_SIZE = 256
+LATENCY_ITERATIONS = 200
+
+
+def expand_grid(param_grid: dict) -> list[dict]:
+    """{'a': [1, 2], 'b': [3]} -> [{'a': 1, 'b': 3}, {'a': 2, 'b': 3}]"""
+    keys = list(param_grid)
+    return [dict(zip(keys, values)) for values in product(*param_grid.values())]
+
+
+def _latency_ms(model, scaler, X, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        model.predict_proba(scaler.transform(X))
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(samples, 50)), float(np.percentile(samples, 99))
+
+
+def evaluate_candidate(params: dict, X_train, y_train, X_test, y_test, cv_folds: int) -> dict:
+    """
+    Cross-validate and fit one hyperparameter set.
+    Runs inside a worker process, so the forest itself is single-threaded.
+    """
+    cv = StratifiedKFold(n_splits=cv_folds, shuffle=True, random_state=42)
+    cv_scores = cross_val_score(
+        make_pipeline(StandardScaler(), build_model(n_jobs=1, **params)),
+        X_train, y_train, cv=cv
+    )
+
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    model = build_model(n_jobs=1, **params)
+
+    start = time.perf_counter()
+    model.fit(X_train_scaled, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    return {
+        'params': params,
+        'cv_accuracy': float(cv_scores.mean()),
+        'cv_std': float(cv_scores.std()),
+        'test_accuracy': float(model.score(scaler.transform(X_test), y_test)),
+        'fit_seconds': round(fit_seconds, 3),
+        'model': model,
+        'scaler': scaler,
+    }
+
+
+def benchmark_candidate(result: dict, X_test) -> dict:
+    """
+    Measure artifact size, load time and inference latency of a fitted
+    candidate. Run sequentially in the parent so timings are not skewed
+    by other candidates training in parallel.
+    """
+    model, scaler = result['model'], result['scaler']
+
+    # Artifact size and unpickle time
+    blob = pickle.dumps(model)
+    start = time.perf_counter()
+    pickle.load(io.BytesIO(blob))
+    load_ms = (time.perf_counter() - start) * 1000
+
+    # Latency of the path the server will actually use
+    if USE_COMPILED_INFERENCE:
+        compiled_model, compiled_scaler = compile_model(model, scaler)
+        if compiled_model is not None:
+            model, scaler = compiled_model, compiled_scaler
+
+    single_p50, single_p99 = _latency_ms(model, scaler, X_test[:1], LATENCY_ITERATIONS)
+    batch_p50, batch_p99 = _latency_ms(
+        model, scaler, X_test[:BATCH_SIZE], max(10, LATENCY_ITERATIONS // 10)
+    )
+
+    result.update({
+        'size_bytes': len(blob),
+        'load_ms': round(load_ms, 3),
+        'single_p50_ms': round(single_p50, 4),
+        'single_p99_ms': round(single_p99, 4),
+        'batch_p50_ms': round(batch_p50, 4),
+        'batch_p99_ms': round(batch_p99, 4),
+        'batch_size': min(BATCH_SIZE, len(X_test)),
+    })
+    return result
+
+
+def _print_results(results, budget_ms):
+    print(f"{'params':<52} {'cv acc':>7} {'test':>6} {'size KB':>8} {'load ms':>8} "
+          f"{'1-row p99':>9} {'batch p99':>9}")
+    print("-" * 106)
+    for r in results:
+        flag = "" if r['single_p99_ms'] <= budget_ms else "  (over budget)"
+        print(f"{json.dumps(r['params']):<52} {r['cv_accuracy']:>7.2%} {r['test_accuracy']:>6.2%} "
+              f"{r['size_bytes'] / 1024:>8.0f} {r['load_ms']:>8.1f} "
+              f"{r['single_p99_ms']:>9.3f} {r['batch_p99_ms']:>9.3f}{flag}")
+
+
+def search_risk_model(param_grid: dict = None,
+                      cv_folds: int = 5,
+                      max_workers: int = None,
+                      latency_budget_ms: float = DEFAULT_LATENCY_BUDGET_MS,
+                      save: bool = True,
+                      data_options: dict = None):
+    """
+    Grid search with cross-validation on a process pool.
+    Saves the best model (by CV accuracy) whose single-row p99 latency
+    fits latency_budget_ms, and writes every candidate's metrics to
+    SEARCH_REPORT_PATH. data_options are passed to prepare_training_data.
+    Returns the winning result dict, or None if no candidate qualifies.
+    """
+    ensure_models_dir()
+    candidates = expand_grid(param_grid or DEFAULT_PARAM_GRID)
+
+    print("📊 Preparing training data...")
+    watermark = get_lab_row_watermark()
+    try:
+        X, y, feature_cols, training_df = prepare_training_data(**(data_options or {}))
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return None
+
+    X_train, X_test, y_train, y_test = split_training_data(X, y, training_df['subject_id'].values)
+
+    # Every fold needs at least one sample of each class
+    min_class_count = int(np.unique(y_train, return_counts=True)[1].min())
+    cv_folds = max(2, min(cv_folds, min_class_count))
+
+    print(f"🔎 Evaluating {len(candidates)} candidates with {cv_folds}-fold CV "
+          f"on {max_workers or os.cpu_count()} processes...")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(evaluate_candidate, params, X_train, y_train, X_test, y_test, cv_folds)
+            for params in candidates
+        ]
+        results = [f.result() for f in futures]
+
+    print("⏱️  Benchmarking candidates...")
+    results = [benchmark_candidate(r, X_test) for r in results]
+
+    results.sort(key=lambda r: r['cv_accuracy'], reverse=True)
+    _print_results(results, latency_budget_ms)
+
+    within_budget = [r for r in results if r['single_p99_ms'] <= latency_budget_ms]
+    best = within_budget[0] if within_budget else None
+
+    with open(SEARCH_REPORT_PATH, 'w') as f:
+        json.dump({
+            'latency_budget_ms': latency_budget_ms,
+            'cv_folds': cv_folds,
+            'samples': len(X),
+            'selected': best['params'] if best else None,
+            'candidates': [
+                {k: v for k, v in r.items() if k not in ('model', 'scaler')}
+                for r in results
+            ],
+        }, f, indent=2)
+    print(f"✓ Search report saved to {SEARCH_REPORT_PATH}")
+
+    if best is None:
+        print(f"❌ No candidate meets the {latency_budget_ms}ms latency budget")
+        return None
+
+    print(f"✓ Selected {best['params']} "
+          f"(CV accuracy {best['cv_accuracy']:.2%}, p99 {best['single_p99_ms']:.3f}ms)")
+
+    if save:
+        save_model(best['model'], best['scaler'], feature_cols, metrics={
+            'params': best['params'],
+            'cv_accuracy': best['cv_accuracy'],
+            'holdout_accuracy': best['test_accuracy'],
+            'holdout': holdout_scheme(training_df['subject_id'].values),
+            'single_p99_ms': best['single_p99_ms'],
+            'samples': len(X),
+            'lab_row_watermark': watermark,
+            'trained_at': datetime.now().isoformat(),
+        })
+
+    return best
@@ -0,0 +1,175 @@
+"""
+Token-Budgeted Prompt Builder
+Assembles LLM prompts from retrieved context without exceeding a
+per-intent token budget, because on tinyllama prompt evaluation of large
+contexts dominates time-to-first-token.
+
+Context is split into lines, noise (section separators and per-chunk
+summaries) is dropped, and the chunks of one patient are merged under
+their heading. Lines are ranked CRITICAL > ABNORMAL > other text > NORMAL
+to decide what fits the budget, but every line stays under its patient's
+heading, so results are never attributed to the wrong patient. Token counts are estimates (no tokenizer is loaded): Llama-family
+tokenizers split digits individually, so digits and punctuation count as
+one token each and words as roughly one token per four letters.
+"""
+
+import math
+import os
+import re
+
+
+DEFAULT_PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "768"))
+
+# Whole-prompt budgets per intent (template + question + context)
+PROMPT_TOKEN_BUDGETS = {
+    "rag": int(os.getenv("PROMPT_BUDGET_RAG", str(DEFAULT_PROMPT_TOKEN_BUDGET))),
+    "knowledge": int(os.getenv("PROMPT_BUDGET_KNOWLEDGE", "512")),
+    "count": int(os.getenv("PROMPT_BUDGET_COUNT", "384")),
+    "risk": int(os.getenv("PROMPT_BUDGET_RISK", "384")),
+    "unsupported": int(os.getenv("PROMPT_BUDGET_UNSUPPORTED", "256")),
+}
+
+# Lower rank = packed first ('heading' = e.g. "Clinical Report for Patient ...:")
+LINE_RANK = {"heading": -1, "CRITICAL": 0, "ABNORMAL": 1, None: 2, "NORMAL": 3}
+
+_TOKEN_RE = re.compile(r"[A-Za-z]+|\d|[^\sA-Za-z\d]")
+_STATUS_RE = re.compile(r"\((CRITICAL|ABNORMAL|NORMAL)\)")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Chunk scaffolding that is meaningless once lines are re-ranked
+_NOISE_PATTERNS = [
+    re.compile(r"^-{3,}$"),
+    re.compile(r"^Summary of this section:", re.IGNORECASE),
+]
+
+# Lines longer than this (e.g. knowledge paragraphs) are packed per sentence
+MAX_LINE_TOKENS = 60
+
+
+def estimate_tokens(text: str) -> int:
+    tokens = 0
+    for piece in _TOKEN_RE.findall(text or ""):
+        tokens += math.ceil(len(piece) / 4) if piece[0].isalpha() else 1
+    return tokens
+
+
+def _line_status(line: str):
+    match = _STATUS_RE.search(line)
+    return match.group(1) if match else None
+
+
+def _document_lines(doc: str):
+    """(rank, position, line) for every usable line of one document"""
+    lines = []
+    for raw in (doc or "").splitlines():
+        line = re.sub(r"\s+", " ", raw).strip()
+        if not line or any(p.search(line) for p in _NOISE_PATTERNS):
+            continue
+
+        status = _line_status(line)
+        if status is None and line.endswith(":") and not line.startswith("- "):
+            status = "heading"
+
+        pieces = [line]
+        if status is None and estimate_tokens(line) > MAX_LINE_TOKENS:
+            pieces = [s for s in _SENTENCE_SPLIT_RE.split(line) if s]
+
+        for piece in pieces:
+            lines.append((LINE_RANK.get(status, LINE_RANK[None]), len(lines), piece))
+    return lines
+
+
+def _group_documents(context_docs: list[str]):
+    """
+    [(heading, lines)] with the documents that open with the same heading
+    (the chunks of one patient) merged, in order of first appearance.
+    Documents without a heading stay separate (heading None).
+    """
+    groups, by_heading = [], {}
+    for doc in context_docs:
+        lines = _document_lines(doc)
+        heading = None
+        if lines and lines[0][0] == LINE_RANK["heading"]:
+            heading, lines = lines[0][2], lines[1:]
+
+        key = heading.lower() if heading else None
+        if key is not None and key in by_heading:
+            group = groups[by_heading[key]][1]
+            offset = len(group)
+            group.extend((rank, offset + position, line) for rank, position, line in lines)
+            continue
+        if key is not None:
+            by_heading[key] = len(groups)
+        groups.append((heading, lines))
+    return groups
+
+
+def select_context(context_docs: list[str], max_tokens: int) -> dict:
+    """
+    Rank, deduplicate and pack context lines into max_tokens.
+    Lines compete for the budget by rank across documents, but stay with
+    their document: each group is emitted under its heading (charged with
+    its first line), so a result line is never separated from its patient.
+    Duplicates are only removed within a patient.
+    """
+    groups = _group_documents(context_docs)
+    candidates = sorted(
+        (rank, group_index, position, line)
+        for group_index, (_, lines) in enumerate(groups)
+        for rank, position, line in lines
+    )
+
+    selected, seen = {}, set()
+    used = duplicates = dropped = 0
+    for rank, group_index, position, line in candidates:
+        heading = groups[group_index][0]
+        key = (heading.lower() if heading else None, line.lower())
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+
+        cost = estimate_tokens(line) + 1  # + newline
+        if heading and group_index not in selected:
+            cost += estimate_tokens(heading) + 1
+        if used + cost > max_tokens:
+            dropped += 1
+            continue
+        selected.setdefault(group_index, []).append((rank, position, line))
+        used += cost
+
+    lines = []
+    for group_index in sorted(selected):
+        heading = groups[group_index][0]
+        if heading:
+            lines.append(heading)
+        lines.extend(line for _, _, line in sorted(selected[group_index]))
+
+    return {
+        'lines': lines,
+        'tokens': used,
+        'duplicates': duplicates,
+        'dropped': dropped,
+    }
+
+
+def build_prompt(intent: str, template: str, context_docs: list[str] = None,
+                 budget: int = None, **fields) -> dict:
+    """
+    Fill template ({context} plus any other fields) within the token budget
+    for intent. Returns the prompt with size stats for status events/logs.
+    """
+    budget = budget or PROMPT_TOKEN_BUDGETS.get(intent, DEFAULT_PROMPT_TOKEN_BUDGET)
+    base_tokens = estimate_tokens(template.format(context="", **fields))
+
+    context = select_context(context_docs or [], max(0, budget - base_tokens))
+    prompt = template.format(context="\n".join(context['lines']), **fields)
+
+    return {
+        'prompt': prompt,
+        'prompt_tokens': base_tokens + context['tokens'],
+        'budget': budget,
+        'context_lines': len(context['lines']),
+        'dropped_lines': context['dropped'],
+        'duplicate_lines': context['duplicates'],
+    }
@@ -0,0 +1,169 @@
+"""
+Background Risk Model Retraining
+Retrains the risk model outside the serving process, validates the
+candidate against the currently active model on the fixed held-out
+patients that neither model trained on (ai.risk_model.is_holdout_subject),
+and only then switches the CURRENT pointer (see ai.risk_model.save_model).
+
+Serving processes notice the new pointer on their next prediction, load
+the new version on a background thread and swap it in, so there is no
+downtime and no request waits on unpickling.
+
+Run as a separate process: python scripts/retrain_worker.py
+"""
+
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from ai.risk_model import (
+    DEFAULT_MODEL_PARAMS,
+    build_model,
+    HOLDOUT_SCHEME,
+    current_model_version,
+    holdout_scheme,
+    list_model_versions,
+    load_model_metrics,
+    load_model_version,
+    prepare_training_data,
+    refresh_risk_scores,
+    reload_model,
+    save_model,
+    split_training_data,
+)
+from database.repository import get_lab_row_watermark
+
+
+# Retrain at least this often (seconds)...
+RETRAIN_INTERVAL_SECONDS = float(os.getenv("RETRAIN_INTERVAL_SECONDS", str(24 * 3600)))
+# ...or as soon as this many lab rows were ingested since the last training
+RETRAIN_MIN_NEW_ROWS = int(os.getenv("RETRAIN_MIN_NEW_ROWS", "100000"))
+# How often the worker checks whether retraining is due (seconds)
+RETRAIN_POLL_SECONDS = float(os.getenv("RETRAIN_POLL_SECONDS", "60"))
+
+# Holdout validation gates for a candidate model
+RETRAIN_MIN_ACCURACY = float(os.getenv("RETRAIN_MIN_ACCURACY", "0.70"))
+RETRAIN_MAX_ACCURACY_DROP = float(os.getenv("RETRAIN_MAX_ACCURACY_DROP", "0.02"))
+
+
+def _holdout_accuracy(model, scaler, model_cols, X_test, y_test, feature_cols) -> float:
+    """Accuracy of a model on the holdout, aligned to that model's feature columns"""
+    X = (
+        pd.DataFrame(X_test, columns=feature_cols)
+          .reindex(columns=model_cols)
+          .fillna(0.0)
+          .values
+    )
+    return float(np.mean(model.predict(scaler.transform(X)) == y_test))
+
+
+def retraining_due(now: float = None) -> tuple[bool, str]:
+    """
+    Whether the schedule or the ingestion volume calls for retraining.
+    Measured from the latest training run, activated or rejected, so a
+    rejected candidate is not retrained on every poll.
+    """
+    versions = list_model_versions()
+    if not versions:
+        return True, "no versioned model yet"
+    version = versions[-1]
+
+    metrics = load_model_metrics(version)
+    new_rows = get_lab_row_watermark() - metrics.get('lab_row_watermark', 0)
+    if new_rows >= RETRAIN_MIN_NEW_ROWS:
+        return True, f"{new_rows} new lab rows"
+
+    trained_at = metrics.get('trained_at')
+    if trained_at:
+        age = (now or time.time()) - datetime.fromisoformat(trained_at).timestamp()
+        if age >= RETRAIN_INTERVAL_SECONDS:
+            return True, f"model is {age / 3600:.1f}h old"
+    else:
+        return True, "latest model has no training timestamp"
+
+    return False, ""
+
+
+def retrain_and_swap(data_options: dict = None) -> dict:
+    """
+    Train a candidate, validate it on a holdout set and activate it if it
+    passes. Returns a summary dict with 'activated' and the metrics.
+    """
+    watermark = get_lab_row_watermark()
+    X, y, feature_cols, training_df = prepare_training_data(**(data_options or {}))
+    subject_ids = training_df['subject_id'].values
+    X_train, X_test, y_train, y_test = split_training_data(X, y, subject_ids)
+    scheme = holdout_scheme(subject_ids)
+
+    # Keep the hyperparameters of the active model (e.g. from a search run)
+    current = current_model_version()
+    current_metrics = load_model_metrics(current) if current else {}
+    params = current_metrics.get('params') or DEFAULT_MODEL_PARAMS
+
+    scaler = StandardScaler()
+    model = build_model(**params)
+    model.fit(scaler.fit_transform(X_train), y_train)
+
+    candidate_accuracy = _holdout_accuracy(model, scaler, feature_cols, X_test, y_test, feature_cols)
+
+    # Only comparable if the active model was held out from the same patients;
+    # older versions trained on a random row split have seen most of them
+    current_accuracy = None
+    if current and scheme == HOLDOUT_SCHEME and current_metrics.get('holdout') == HOLDOUT_SCHEME:
+        current_model, current_scaler, current_cols = load_model_version(current)
+        current_accuracy = _holdout_accuracy(
+            current_model, current_scaler, current_cols, X_test, y_test, feature_cols
+        )
+
+    metrics = {
+        'params': params,
+        'holdout_accuracy': candidate_accuracy,
+        'holdout': scheme,
+        'previous_version': current,
+        'previous_holdout_accuracy': current_accuracy,
+        'samples': len(X),
+        'lab_row_watermark': watermark,
+        'trained_at': datetime.now().isoformat(),
+    }
+
+    passed = candidate_accuracy >= RETRAIN_MIN_ACCURACY and (
+        current_accuracy is None
+        or candidate_accuracy >= current_accuracy - RETRAIN_MAX_ACCURACY_DROP
+    )
+
+    # Rejected candidates are kept (inactive) for inspection
+    version = save_model(model, scaler, feature_cols, metrics=metrics, activate=passed)
+
+    if passed:
+        # Pre-score the ranking table so servers don't do it on first request
+        reload_model()
+        refresh_risk_scores()
+
+    return {'version': version, 'activated': passed, **metrics}
+
+
+def run_retraining_loop(data_options: dict = None, once: bool = False):
+    """Poll for due retraining and run it; intended for a dedicated process"""
+    while True:
+        due, reason = retraining_due()
+        if due:
+            print(f"🔁 Retraining risk model ({reason})...")
+            try:
+                result = retrain_and_swap(data_options)
+                status = "activated" if result['activated'] else "rejected"
+                previous = result['previous_holdout_accuracy']
+                print(
+                    f"✓ Version {result['version']} {status}: holdout accuracy "
+                    f"{result['holdout_accuracy']:.2%}"
+                    + (f" (previous {previous:.2%})" if previous is not None else "")
+                )
+            except ValueError as e:
+                print(f"❌ Retraining skipped: {e}")
+
+        if once:
+            return
+        time.sleep(RETRAIN_POLL_SECONDS)
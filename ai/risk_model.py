@@ -5,85 +5,228 @@ Trains a machine learning model to predict patient risk based on lab values
 
 import pandas as pd
 import numpy as np
+import hashlib
+import json
 import pickle
 import os
+import shutil
+import sqlite3
+import threading
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
+from ai.compiled_forest import compile_model
+from ai.prediction_cache import VersionedLRUCache
 from database.db import get_connection as get_db
+from database.feature_store import STATUS_RANK, feature_name, feature_store_ready, get_patient_features
+from database.repository import get_lab_row_watermark
+from database.risk_scores import STALE_FEATURES_SQL, prune_orphan_risk_scores, upsert_risk_scores
 from datetime import datetime
 
 
 MODEL_PATH = "ai/models/risk_model.pkl"
 SCALER_PATH = "ai/models/scaler.pkl"
+FEATURE_COLS_PATH = "ai/models/feature_cols.pkl"
 MODELS_DIR = "ai/models"
 
+# Versioned artifacts: ai/models/versions/<version>/, selected by the CURRENT pointer.
+# The flat files above are only read when no CURRENT pointer exists yet.
+VERSIONS_DIR = os.path.join(MODELS_DIR, "versions")
+CURRENT_POINTER = os.path.join(MODELS_DIR, "CURRENT")
+ARTIFACT_NAMES = ("risk_model.pkl", "scaler.pkl", "feature_cols.pkl")
+METRICS_NAME = "metrics.json"
+
+# Serve predictions through the NumPy-compiled forest (see ai/compiled_forest.py)
+USE_COMPILED_INFERENCE = os.getenv("RISK_COMPILED_INFERENCE", "1") == "1"
+
+# Fixed share of patients that no training run ever uses: every model
+# version is validated on the same unseen patients, so versions compare fairly
+RISK_HOLDOUT_PERCENT = int(os.getenv("RISK_HOLDOUT_PERCENT", "20"))
+HOLDOUT_SCHEME = f"subject-hash-{RISK_HOLDOUT_PERCENT}"
+
+# 'bundle': currently served model, 'loading': version key being preloaded
+_MODEL_STATE = {'bundle': None, 'loading': None}
+_model_lock = threading.Lock()
+
+# Predictions keyed by subject_id, tagged with (patient data version, model version)
+PREDICTION_CACHE = VersionedLRUCache()
+
 
 def ensure_models_dir():
     """Create models directory if it doesn't exist"""
     os.makedirs(MODELS_DIR, exist_ok=True)
 
 
-def prepare_training_data():
+def build_feature_frame(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Fetch lab data from database and prepare features for model training
-    Returns: (X, y) where X is features and y is risk labels
+    Pivot raw lab rows into one feature row per patient.
+    Shared by training and inference so both see identical features.
+
+    Expects columns: subject_id, test_name, value (and optionally status)
+    Returns: DataFrame indexed by subject_id with one '<test>_value' column
+             per test (last value wins) plus 'risk_level' when status is given
     """
-    conn = get_db()
-    cur = conn.cursor()
-
-    # Get all patient lab records with risk status
-    cur.execute("""
-        SELECT
-            subject_id,
-            test_name,
-            value,
-            status
-        FROM lab_interpretations
-        WHERE value IS NOT NULL AND status IS NOT NULL
-    """)
+    features = (
+        df.assign(feature=df['test_name'].map(feature_name))
+          .groupby(['subject_id', 'feature'], sort=False)['value']
+          .last()
+          .unstack('feature')
+    )
+    features.columns.name = None
 
-    records = cur.fetchall()
-    conn.close()
+    if 'status' in df.columns:
+        # CRITICAL = 2, ABNORMAL = 1, NORMAL = 0
+        features['risk_level'] = (
+            df['status'].map(STATUS_RANK).fillna(0).astype(int)
+              .groupby(df['subject_id']).max()
+        )
 
-    if not records:
-        raise ValueError("No training data available in database")
+    return features
 
-    # Convert to DataFrame
-    df = pd.DataFrame([dict(r) for r in records])
 
-    # Pivot to get features per patient
-    pivot_data = []
+def feature_matrix(features: pd.DataFrame, feature_cols: list) -> np.ndarray:
+    """Align a feature frame to the model's columns (0 for missing features)"""
+    return features.reindex(columns=feature_cols).fillna(0.0).values.astype(float)
 
-    for subject_id in df['subject_id'].unique():
-        patient_data = df[df['subject_id'] == subject_id]
 
-        # Get patient features
-        features = {'subject_id': subject_id}
+RAW_TRAINING_SQL = """
+    SELECT
+        subject_id,
+        test_name,
+        value,
+        status
+    FROM lab_interpretations
+    WHERE value IS NOT NULL AND status IS NOT NULL
+    ORDER BY subject_id, id
+"""
 
-        # Add lab test values as features
-        for _, row in patient_data.iterrows():
-            test_name = row['test_name'].lower().replace(' ', '_').replace('-', '_')
-            features[f'{test_name}_value'] = row['value']
 
-        # Determine risk label from status
-        # CRITICAL = 2, ABNORMAL = 1, NORMAL = 0
-        max_risk = 0
-        if 'CRITICAL' in patient_data['status'].values:
-            max_risk = 2
-        elif 'ABNORMAL' in patient_data['status'].values:
-            max_risk = 1
+def iter_store_feature_chunks(chunk_rows: int = None):
+    """
+    Read the persisted patient feature store (one row per patient).
+    Yields a single frame, or frames of chunk_rows patients when given.
+    """
+    conn = get_db()
+    try:
+        chunks = pd.read_sql_query(
+            "SELECT * FROM patient_features ORDER BY subject_id",
+            conn, index_col='subject_id', chunksize=chunk_rows
+        )
+        for chunk in ([chunks] if chunk_rows is None else chunks):
+            # Drop bookkeeping columns
+            yield chunk.drop(columns=['version', 'updated_time'])
+    finally:
+        conn.close()
+
+
+def iter_raw_feature_chunks(chunk_rows: int = None):
+    """
+    Build patient features from raw lab_interpretations rows.
+    With chunk_rows, rows are streamed in subject_id order and a patient
+    split across two chunks is carried over, so every yielded frame holds
+    complete patients and memory stays bounded by the chunk size.
+    """
+    conn = get_db()
+    try:
+        if chunk_rows is None:
+            df = pd.read_sql_query(RAW_TRAINING_SQL, conn)
+            if not df.empty:
+                yield build_feature_frame(df)
+            return
+
+        carry = None
+        for chunk in pd.read_sql_query(RAW_TRAINING_SQL, conn, chunksize=chunk_rows):
+            if carry is not None:
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+
+            # The last patient may continue in the next chunk
+            complete = chunk['subject_id'] != chunk['subject_id'].iat[-1]
+            carry = chunk[~complete]
+            if complete.any():
+                yield build_feature_frame(chunk[complete])
+
+        if carry is not None and not carry.empty:
+            yield build_feature_frame(carry)
+    finally:
+        conn.close()
+
+
+def iter_feature_chunks(use_feature_store: bool = True, chunk_rows: int = None):
+    """Feature frames from the feature store once backfilled, else raw lab rows"""
+    if use_feature_store and not feature_store_ready():
+        print("⚠️ Feature store not backfilled yet (python scripts/rebuild_feature_store.py); "
+              "using raw lab rows")
+    elif use_feature_store:
+        found = False
+        try:
+            for chunk in iter_store_feature_chunks(chunk_rows):
+                if not chunk.empty:
+                    found = True
+                    yield chunk
+        except pd.errors.DatabaseError:  # feature store table not created yet
+            pass
+        if found:
+            return
+
+    yield from iter_raw_feature_chunks(chunk_rows)
+
+
+def stratified_sample(chunks, max_per_class: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Uniform sample of at most max_per_class patients per risk class,
+    drawn in one pass over feature chunks (bottom-k on random keys),
+    so memory is bounded by the sample plus one chunk.
+    """
+    rng = np.random.default_rng(seed)
+    sample = None
+
+    for chunk in chunks:
+        chunk = chunk.assign(_sample_key=rng.random(len(chunk)))
+        sample = (
+            (chunk if sample is None else pd.concat([sample, chunk]))
+              .sort_values('_sample_key')
+              .groupby('risk_level', group_keys=False)
+              .head(max_per_class)
+        )
+
+    if sample is None:
+        return pd.DataFrame()
+    return sample.drop(columns=['_sample_key']).sort_index()
+
+
+def prepare_training_data(use_feature_store: bool = True,
+                          chunk_rows: int = None,
+                          max_patients_per_class: int = None):
+    """
+    Fetch lab data from database and prepare features for model training
+    Reads the patient feature store when populated, else raw lab rows
+
+    chunk_rows: stream the source in chunks instead of loading it at once
+    max_patients_per_class: keep a stratified sample of at most this many
+                            patients per risk class
+
+    Returns: (X, y) where X is features and y is risk labels
+    """
+    chunks = iter_feature_chunks(use_feature_store, chunk_rows)
 
-        features['risk_level'] = max_risk
-        pivot_data.append(features)
+    if max_patients_per_class:
+        features = stratified_sample(chunks, max_patients_per_class)
+    else:
+        chunks = list(chunks)
+        features = pd.concat(chunks) if chunks else pd.DataFrame()
 
-    training_df = pd.DataFrame(pivot_data)
+    if features.empty:
+        raise ValueError("No training data available in database")
+
+    # Drop never-observed test columns
+    training_df = features.dropna(axis=1, how='all').reset_index()
 
     # Fill missing values with median
-    numeric_cols = training_df.select_dtypes(include=[np.number]).columns
-    for col in numeric_cols:
-        if col != 'subject_id' and col != 'risk_level':
-            training_df[col].fillna(training_df[col].median(), inplace=True)
+    feature_cols = [col for col in training_df.columns
+                    if col not in ['subject_id', 'risk_level']]
+    training_df[feature_cols] = training_df[feature_cols].fillna(
+        training_df[feature_cols].median()
+    )
 
     # Remove rows with missing values
     training_df = training_df.dropna()
@@ -92,23 +235,152 @@ def prepare_training_data():
         raise ValueError("Insufficient training data after preprocessing")
 
     # Prepare X and y
-    feature_cols = [col for col in training_df.columns
-                    if col not in ['subject_id', 'risk_level']]
     X = training_df[feature_cols].values
     y = training_df['risk_level'].values
 
     return X, y, feature_cols, training_df
 
 
-def train_risk_model():
+DEFAULT_MODEL_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'min_samples_split': 5,
+}
+
+
+def build_model(n_jobs: int = -1, **params) -> RandomForestClassifier:
+    """Random Forest with the project's fixed settings and given hyperparameters"""
+    return RandomForestClassifier(
+        **{**DEFAULT_MODEL_PARAMS, **params},
+        random_state=42,
+        n_jobs=n_jobs,
+        class_weight='balanced_subsample'
+    )
+
+
+def is_holdout_subject(subject_id) -> bool:
+    """Stable per patient: the same patients are held out from every training run"""
+    digest = hashlib.blake2b(str(int(subject_id)).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % 100 < RISK_HOLDOUT_PERCENT
+
+
+def _holdout_mask(subject_ids):
+    """Held-out rows, or None when the fixed holdout leaves one side empty"""
+    if subject_ids is None:
+        return None
+    mask = np.fromiter((is_holdout_subject(s) for s in subject_ids), dtype=bool, count=len(subject_ids))
+    return mask if 0 < mask.sum() < len(mask) else None
+
+
+def holdout_scheme(subject_ids) -> str:
+    """How split_training_data splits these patients (recorded in metrics.json)"""
+    return HOLDOUT_SCHEME if _holdout_mask(subject_ids) is not None else "random"
+
+
+def split_training_data(X, y, subject_ids=None):
+    """
+    Train/holdout split shared by training, model search and retraining.
+    With subject_ids the holdout is the fixed set of held-out patients;
+    tiny datasets (or no ids) fall back to a random 80/20 split.
+    """
+    mask = _holdout_mask(subject_ids)
+    if mask is None:
+        return train_test_split(X, y, test_size=0.2, random_state=42)
+    return X[~mask], X[mask], y[~mask], y[mask]
+
+
+def save_model(model, scaler, feature_cols, metrics: dict = None, activate: bool = True) -> str:
+    """
+    Persist model, scaler and feature names as a new versioned artifact set.
+    Files are written to a temporary directory that is renamed into place,
+    then the CURRENT pointer is switched atomically (when activate=True),
+    so a serving process never sees a half-written model.
+    Returns the new version name.
+    """
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+
+    version = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    tmp_dir = os.path.join(VERSIONS_DIR, f".tmp-{version}")
+    os.makedirs(tmp_dir)
+
+    # Save model, scaler and feature names for later use
+    for name, obj in zip(ARTIFACT_NAMES, (model, scaler, feature_cols)):
+        with open(os.path.join(tmp_dir, name), 'wb') as f:
+            pickle.dump(obj, f)
+
+    with open(os.path.join(tmp_dir, METRICS_NAME), 'w') as f:
+        json.dump({'version': version, **(metrics or {})}, f, indent=2)
+
+    os.rename(tmp_dir, os.path.join(VERSIONS_DIR, version))
+    print(f"✓ Model saved to {os.path.join(VERSIONS_DIR, version)}")
+
+    if activate:
+        activate_model_version(version)
+
+    return version
+
+
+def activate_model_version(version: str):
+    """Atomically point CURRENT at an existing model version"""
+    if not os.path.isdir(os.path.join(VERSIONS_DIR, version)):
+        raise ValueError(f"Unknown model version: {version}")
+
+    tmp_pointer = f"{CURRENT_POINTER}.tmp-{os.getpid()}"
+    with open(tmp_pointer, 'w') as f:
+        f.write(version)
+    os.replace(tmp_pointer, CURRENT_POINTER)
+    print(f"✓ Active model version: {version}")
+
+
+def current_model_version():
+    """Version named by the CURRENT pointer (None when using legacy flat files)"""
+    try:
+        with open(CURRENT_POINTER) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_model_metrics(version: str) -> dict:
+    """metrics.json of a saved model version ({} if missing)"""
+    try:
+        with open(os.path.join(VERSIONS_DIR, version, METRICS_NAME)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def list_model_versions() -> list[str]:
+    """Saved model versions, oldest first (names sort chronologically)"""
+    if not os.path.isdir(VERSIONS_DIR):
+        return []
+    return sorted(v for v in os.listdir(VERSIONS_DIR) if not v.startswith('.'))
+
+
+def load_model_version(version: str):
+    """Unpickle (model, scaler, feature_cols) of a specific saved version"""
+    return _read_model_files(('version', version))
+
+
+def remove_model_version(version: str):
+    """Delete a saved (inactive) model version"""
+    if version == current_model_version():
+        raise ValueError("Cannot remove the active model version")
+    shutil.rmtree(os.path.join(VERSIONS_DIR, version), ignore_errors=True)
+
+
+def train_risk_model(**data_options):
     """
     Train the risk prediction model
+    data_options are passed to prepare_training_data
+    (chunk_rows, max_patients_per_class, use_feature_store)
     """
     ensure_models_dir()
 
     print("📊 Preparing training data...")
+    watermark = get_lab_row_watermark()
     try:
-        X, y, feature_cols, training_df = prepare_training_data()
+        X, y, feature_cols, training_df = prepare_training_data(**data_options)
     except ValueError as e:
         print(f"❌ Error: {e}")
         return False
@@ -116,9 +388,7 @@ def train_risk_model():
     print(f"✓ Training data prepared: {len(X)} samples, {len(feature_cols)} features")
 
     # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
-    )
+    X_train, X_test, y_train, y_test = split_training_data(X, y, training_df['subject_id'].values)
 
     # Scale features
     scaler = StandardScaler()
@@ -134,14 +404,7 @@ def train_risk_model():
 
     # Train Random Forest model
     print("🤖 Training Random Forest model...")
-    model = RandomForestClassifier(
-        n_estimators=100,
-        max_depth=10,
-        min_samples_split=5,
-        random_state=42,
-        n_jobs=-1,
-        class_weight='balanced_subsample'
-    )
+    model = build_model()
 
     model.fit(X_train_scaled, y_train)
 
@@ -152,38 +415,153 @@ def train_risk_model():
     print(f"✓ Training accuracy: {train_score:.2%}")
     print(f"✓ Testing accuracy: {test_score:.2%}")
 
-    # Save model and scaler
-    with open(MODEL_PATH, 'wb') as f:
-        pickle.dump(model, f)
+    save_model(model, scaler, feature_cols, metrics={
+        'params': DEFAULT_MODEL_PARAMS,
+        'train_accuracy': float(train_score),
+        'holdout_accuracy': float(test_score),
+        'holdout': holdout_scheme(training_df['subject_id'].values),
+        'samples': len(X),
+        'lab_row_watermark': watermark,
+        'trained_at': datetime.now().isoformat(),
+    })
+
+    return True
+
 
-    with open(SCALER_PATH, 'wb') as f:
-        pickle.dump(scaler, f)
+def _artifact_key():
+    """
+    Identify the artifacts that should be served:
+    ('version', name) via the CURRENT pointer, else ('legacy', mtimes)
+    Returns None when no trained model exists.
+    """
+    version = current_model_version()
+    if version is not None:
+        return ('version', version)
 
-    # Save feature names for later use
-    with open('ai/models/feature_cols.pkl', 'wb') as f:
-        pickle.dump(feature_cols, f)
+    if not os.path.exists(MODEL_PATH) or not os.path.exists(SCALER_PATH):
+        return None
+    return ('legacy', tuple(os.path.getmtime(p) for p in (MODEL_PATH, SCALER_PATH, FEATURE_COLS_PATH)))
 
-    print(f"✓ Model saved to {MODEL_PATH}")
-    print(f"✓ Scaler saved to {SCALER_PATH}")
 
-    return True
+def _read_model_files(key):
+    """Unpickle model, scaler and feature columns from disk"""
+    if key[0] == 'version':
+        paths = [os.path.join(VERSIONS_DIR, key[1], name) for name in ARTIFACT_NAMES]
+    else:
+        paths = [MODEL_PATH, SCALER_PATH, FEATURE_COLS_PATH]
 
+    loaded = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            loaded.append(pickle.load(f))
 
-def load_model():
-    """Load trained model and scaler"""
-    if not os.path.exists(MODEL_PATH) or not os.path.exists(SCALER_PATH):
+    return tuple(loaded)
+
+
+def _install_model(key):
+    """Load artifacts for key and swap them in as the served model"""
+    model, scaler, feature_cols = _read_model_files(key)
+    bundle = {
+        'key': key,
+        'version': key[1] if key[0] == 'version' else f"legacy-{max(key[1])}",
+        'sklearn': (model, scaler, feature_cols),
+        'compiled': (*compile_model(model, scaler), feature_cols),
+    }
+    # Single assignment, so readers see either the old or the new model
+    _MODEL_STATE['bundle'] = bundle
+
+    # Predictions from the previous model can never be hit again
+    PREDICTION_CACHE.clear()
+
+
+def _preload_in_background(key):
+    def run():
+        try:
+            _install_model(key)
+        except Exception as e:
+            print(f"Error loading model version {key}: {e}")
+        finally:
+            _MODEL_STATE['loading'] = None
+
+    with _model_lock:
+        if _MODEL_STATE['loading'] == key:
+            return
+        _MODEL_STATE['loading'] = key
+    threading.Thread(target=run, daemon=True).start()
+
+
+def _load_bundle():
+    """Currently served model bundle (see load_model), or None if untrained"""
+    key = _artifact_key()
+    if key is None:
+        return None
+
+    bundle = _MODEL_STATE['bundle']
+    if bundle is None:
+        # Nothing to serve yet: load synchronously
+        with _model_lock:
+            if _MODEL_STATE['bundle'] is None or _MODEL_STATE['bundle']['key'] != key:
+                _install_model(key)
+        bundle = _MODEL_STATE['bundle']
+    elif bundle['key'] != key:
+        _preload_in_background(key)
+
+    return bundle
+
+
+def reload_model():
+    """Synchronously load and serve the artifacts CURRENT points at"""
+    key = _artifact_key()
+    if key is not None:
+        with _model_lock:
+            _install_model(key)
+
+
+def _bundle_model(bundle, compiled: bool):
+    if bundle is None:
         return None, None, None
+    if compiled and bundle['compiled'][0] is not None:
+        return bundle['compiled']
+    return bundle['sklearn']
 
-    with open(MODEL_PATH, 'rb') as f:
-        model = pickle.load(f)
 
-    with open(SCALER_PATH, 'rb') as f:
-        scaler = pickle.load(f)
+def load_model(compiled: bool = USE_COMPILED_INFERENCE):
+    """
+    Load trained model and scaler
+    Artifacts are unpickled once and reused until the CURRENT pointer
+    (or the legacy files) change. A new version is loaded on a background
+    thread while the previous one keeps serving, then swapped in.
+    With compiled=True the forest and scaler are returned as their
+    NumPy-compiled equivalents (same interface, same probabilities).
+    """
+    return _bundle_model(_load_bundle(), compiled)
+
+
+def model_version():
+    """Version name of the currently served model (None if not loaded)"""
+    bundle = _MODEL_STATE['bundle']
+    return bundle['version'] if bundle else None
+
+
+def get_prediction_cache_stats() -> dict:
+    """Hit/miss counters and size of the prediction cache"""
+    return PREDICTION_CACHE.stats()
+
+
+def _raw_patient_features(subject_id: int, feature_cols: list):
+    """Fallback feature vector built from raw rows (patient not in store)"""
+    conn = get_db()
+    df = pd.read_sql_query("""
+        SELECT subject_id, test_name, value
+        FROM lab_interpretations
+        WHERE subject_id = ? AND value IS NOT NULL
+    """, conn, params=(subject_id,))
+    conn.close()
 
-    with open('ai/models/feature_cols.pkl', 'rb') as f:
-        feature_cols = pickle.load(f)
+    if df.empty:
+        return None
 
-    return model, scaler, feature_cols
+    return feature_matrix(build_feature_frame(df), feature_cols)
 
 
 def predict_patient_risk(subject_id: int):
@@ -197,7 +575,8 @@ def predict_patient_risk(subject_id: int):
         'predicted_at': str
     }
     """
-    model, scaler, feature_cols = load_model()
+    bundle = _load_bundle()
+    model, scaler, feature_cols = _bundle_model(bundle, USE_COMPILED_INFERENCE)
 
     if model is None:
         return {
@@ -205,42 +584,37 @@ def predict_patient_risk(subject_id: int):
             'error': 'Model not trained. Please train the model first.'
         }
 
-    # Fetch patient's lab data
-    conn = get_db()
-    cur = conn.cursor()
-
-    cur.execute("""
-        SELECT test_name, value
-        FROM lab_interpretations
-        WHERE subject_id = ? AND value IS NOT NULL
-    """, (subject_id,))
-
-    records = cur.fetchall()
-    conn.close()
-
-    if not records:
+    # Single-row lookup in the feature store (a store row of a database that
+    # was never backfilled may hold only the patient's newest labs)
+    stored = None
+    if feature_store_ready():
+        try:
+            stored = get_patient_features(subject_id)
+        except sqlite3.OperationalError:  # feature store table not created yet
+            stored = None
+
+    # Only store-backed patients carry a data version to validate the cache
+    cache_version = None
+    if stored is not None:
+        cache_version = (stored['version'], bundle['version'])
+        cached = PREDICTION_CACHE.get(subject_id, cache_version)
+        if cached is not None:
+            return cached
+
+        X = np.array([[stored.get(col) or 0.0 for col in feature_cols]])
+    else:
+        X = _raw_patient_features(subject_id, feature_cols)
+
+    if X is None:
         return {
             'subject_id': subject_id,
             'error': 'No lab data found for this patient'
         }
 
-    # Prepare features for prediction
-    patient_features = {}
-    for record in records:
-        test_name = record['test_name'].lower().replace(' ', '_').replace('-', '_')
-        patient_features[f'{test_name}_value'] = record['value']
-
-    # Create feature vector matching model's expected features
-    X = []
-    for col in feature_cols:
-        X.append(patient_features.get(col, 0.0))  # Use 0 for missing features
-
-    X = np.array([X])
-
     # Scale and predict
     X_scaled = scaler.transform(X)
-    risk_level = model.predict(X_scaled)[0]
     probabilities = model.predict_proba(X_scaled)[0]
+    risk_level = model.classes_[np.argmax(probabilities)]  # same as model.predict
     
     # Handle case where model has fewer than 3 classes
     # Create proper probability mapping for all 3 classes
@@ -266,7 +640,7 @@ def predict_patient_risk(subject_id: int):
     padded_probs = list(probabilities) + [0.0] * (3 - len(probabilities))
     padded_probs = padded_probs[:3]  # Ensure exactly 3 elements
 
-    return {
+    result = {
         'subject_id': subject_id,
         'risk_level': int(risk_level),
         'risk_label': risk_label,
@@ -279,6 +653,67 @@ def predict_patient_risk(subject_id: int):
         }
     }
 
+    if cache_version is not None:
+        PREDICTION_CACHE.put(subject_id, cache_version, result)
+
+    return result
+
+
+def refresh_risk_scores(batch_size: int = 2000) -> int:
+    """
+    Batch-score every patient whose features or model changed since the
+    last run and store the results in patient_risk_scores. Scores of
+    patients that left the feature store are dropped.
+    Returns the number of patients scored.
+    """
+    bundle = _load_bundle()
+    model, scaler, feature_cols = _bundle_model(bundle, USE_COMPILED_INFERENCE)
+    if model is None:
+        return 0
+
+    try:
+        prune_orphan_risk_scores()
+    except sqlite3.OperationalError:  # feature store table not created yet
+        pass
+
+    version = bundle['version']
+    classes = list(model.classes_)
+    scored = 0
+
+    while True:
+        conn = get_db()
+        try:
+            batch = pd.read_sql_query(STALE_FEATURES_SQL, conn, params=(version, batch_size))
+        except pd.errors.DatabaseError:  # feature store table not created yet
+            batch = pd.DataFrame()
+        conn.close()
+
+        if batch.empty:
+            return scored
+
+        probabilities = model.predict_proba(scaler.transform(feature_matrix(batch, feature_cols)))
+
+        # Map model classes onto NORMAL / ABNORMAL / CRITICAL columns
+        full = np.zeros((len(batch), 3))
+        for class_idx, class_label in enumerate(classes):
+            full[:, int(class_label)] = probabilities[:, class_idx]
+
+        risk_levels = np.asarray(classes)[np.argmax(probabilities, axis=1)]
+        confidences = probabilities.max(axis=1) * 100
+        scored_at = datetime.now().isoformat()
+
+        upsert_risk_scores([
+            (
+                int(subject_id), gender, int(level), round(float(conf), 2),
+                round(float(p[0]) * 100, 2), round(float(p[1]) * 100, 2), round(float(p[2]) * 100, 2),
+                int(data_version), version, scored_at
+            )
+            for subject_id, gender, level, conf, p, data_version in zip(
+                batch['subject_id'], batch['gender'], risk_levels, confidences, full, batch['version']
+            )
+        ])
+        scored += len(batch)
+
 
 if __name__ == '__main__':
     train_risk_model()
@@ -0,0 +1,165 @@
+"""
+Single-Flight Request Coalescing
+Concurrent calls with the same key share one execution instead of each
+doing the same work.
+
+- SingleFlight: blocking calls from threads (background tasks, scripts);
+  followers wait for the leader's result or exception
+- StreamFlights: async token streams; one producer task per key fans its
+  tokens out to every subscriber. Late joiners first receive the tokens
+  produced so far, then follow live.
+
+A flight ends when its producer finishes. The next call with the same key
+starts a new one, so results are not cached here (see ai/llm_cache.py).
+A stream flight whose subscribers have all left is cancelled, so nobody
+keeps the model busy for an answer no one will read.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import AsyncIterator, Callable, Dict, List
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key: str, fn: Callable):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'followers': self.followers,
+            }
+
+
+class _Broadcast:
+    """Token log of one flight plus a wake-up signal for subscribers"""
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.done = False
+        self.error = None
+        self.task = None
+        self.subscribers = 0
+        self.on_abandoned = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def publish(self, token: str):
+        self.tokens.append(token)
+        self._notify()
+
+    def close(self, error: Exception = None):
+        self.error = error
+        self.done = True
+        self._notify()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        self.subscribers += 1
+        try:
+            position = 0
+            while True:
+                changed = self._changed
+                while position < len(self.tokens):
+                    yield self.tokens[position]
+                    position += 1
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done and self.on_abandoned:
+                self.on_abandoned()
+
+
+class StreamFlights:
+    def __init__(self):
+        self._flights: Dict[tuple, _Broadcast] = {}  # (event loop, key) -> flight
+        self.leaders = 0
+        self.followers = 0
+        self.cancelled = 0
+
+    def join(self, key: str, produce: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Subscribe to the flight for key, starting it with produce() if none
+        is running. The producer runs as its own task, so it keeps going (and
+        can populate caches) when the subscriber that started it leaves, as
+        long as any other subscriber is still reading.
+        """
+        loop = asyncio.get_running_loop()
+        flight = self._flights.get((loop, key))
+        if flight is None:
+            flight = _Broadcast()
+            self._flights[(loop, key)] = flight
+            flight.task = loop.create_task(self._drive(loop, key, flight, produce))
+            flight.on_abandoned = lambda: self._cancel(loop, key, flight)
+            self.leaders += 1
+        else:
+            self.followers += 1
+        return flight.subscribe()
+
+    def _cancel(self, loop, key, flight: _Broadcast):
+        """Last subscriber left: stop the producer and let new callers start afresh"""
+        if self._flights.get((loop, key)) is flight:
+            del self._flights[(loop, key)]
+        flight.task.cancel()
+        self.cancelled += 1
+
+    async def _drive(self, loop, key, flight: _Broadcast, produce):
+        try:
+            async for token in produce():
+                flight.publish(token)
+        except asyncio.CancelledError:
+            flight.close(RuntimeError("LLM generation cancelled"))
+            raise
+        except Exception as e:
+            flight.close(e)
+        else:
+            flight.close()
+        finally:
+            if self._flights.get((loop, key)) is flight:
+                del self._flights[(loop, key)]
+
+    def stats(self) -> dict:
+        return {
+            'in_flight': len(self._flights),
+            'leaders': self.leaders,
+            'followers': self.followers,
+            'cancelled': self.cancelled,
+        }
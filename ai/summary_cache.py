@@ -0,0 +1,266 @@
+"""
+AI Summary Cache
+SQLite-backed cache of per-patient AI summaries, shared by all app workers
+and kept across restarts.
+
+- bounded: the least recently read summaries are evicted beyond
+  SUMMARY_CACHE_MAX_ENTRIES
+- de-duplicated: a generation first claims the patient's entry ('pending'),
+  so polls and other workers don't start a second one. Claims older than
+  SUMMARY_PENDING_TIMEOUT_SECONDS are treated as abandoned (crashed worker).
+- invalidated by content: every entry stores a signature of the abnormal
+  labs it was generated from; once those labs change, the entry is stale
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+SUMMARY_CACHE_PATH = Path(os.getenv("SUMMARY_CACHE_PATH", "database/summary_cache.db"))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "5000"))
+SUMMARY_PENDING_TIMEOUT_SECONDS = float(os.getenv("SUMMARY_PENDING_TIMEOUT_SECONDS", "300"))
+
+# Run size eviction every this many writes
+EVICT_EVERY_PUTS = 50
+
+CREATE_SUMMARY_CACHE_SQL = """
+CREATE TABLE IF NOT EXISTS ai_summaries (
+    subject_id INTEGER PRIMARY KEY,
+    state TEXT NOT NULL,            -- 'pending' | 'ready'
+    labs_signature TEXT NOT NULL,
+    summary TEXT,
+    updated_at REAL NOT NULL,
+    last_hit_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+CREATE_SUMMARY_CACHE_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_ai_summaries_last_hit
+ON ai_summaries (state, last_hit_at)
+"""
+
+
+def labs_signature(labs: list[dict]) -> str:
+    """Hash of the lab rows a summary is generated from"""
+    blob = json.dumps(labs, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    def __init__(self,
+                 path: Path = SUMMARY_CACHE_PATH,
+                 max_entries: int = SUMMARY_CACHE_MAX_ENTRIES,
+                 pending_timeout: float = SUMMARY_PENDING_TIMEOUT_SECONDS):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.pending_timeout = pending_timeout
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.claims = 0
+        self.duplicates_avoided = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(CREATE_SUMMARY_CACHE_SQL)
+            conn.execute(CREATE_SUMMARY_CACHE_INDEX_SQL)
+            self._initialized = True
+        return conn
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _live(self, row, signature: str, now: float) -> bool:
+        """Entry matches the current labs and, if pending, is not abandoned"""
+        state, row_signature, updated_at = row
+        if row_signature != signature:
+            return False
+        return state == "ready" or now - updated_at < self.pending_timeout
+
+    def get(self, subject_id: int, signature: str):
+        """
+        Ready summary text for these labs, or None (missing, pending or stale).
+        Stale entries are deleted.
+        """
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT state, labs_signature, updated_at, summary FROM ai_summaries WHERE subject_id = ?",
+                (subject_id,)
+            ).fetchone()
+
+            if row is not None and row[1] != signature:
+                conn.execute("DELETE FROM ai_summaries WHERE subject_id = ?", (subject_id,))
+                self._count("invalidated")
+                row = None
+
+            if row is None or row[0] != "ready":
+                conn.close()
+                self._count("misses")
+                return None
+
+            conn.execute(
+                "UPDATE ai_summaries SET last_hit_at = ?, hits = hits + 1 WHERE subject_id = ?",
+                (now, subject_id)
+            )
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"⚠️ Summary cache read failed: {e}")
+            self._count("errors")
+            return None
+
+        self._count("hits")
+        return row[3]
+
+    def claim(self, subject_id: int, signature: str) -> bool:
+        """
+        Mark a generation for these labs as in progress.
+        False if a ready summary or a live pending generation already exists.
+        """
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT state, labs_signature, updated_at FROM ai_summaries WHERE subject_id = ?",
+                (subject_id,)
+            ).fetchone()
+
+            if row is not None and self._live(row, signature, now):
+                conn.execute("COMMIT")
+                conn.close()
+                if row[0] == "pending":
+                    self._count("duplicates_avoided")
+                return False
+
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO ai_summaries
+                    (subject_id, state, labs_signature, summary, updated_at, last_hit_at, hits)
+                VALUES (?, 'pending', ?, NULL, ?, ?, 0)
+                """,
+                (subject_id, signature, now, now)
+            )
+            conn.execute("COMMIT")
+            conn.close()
+        except sqlite3.Error as e:
+            # Without the shared state, generating is better than never answering
+            print(f"⚠️ Summary cache claim failed: {e}")
+            self._count("errors")
+            return True
+
+        self._count("claims")
+        return True
+
+    def put(self, subject_id: int, signature: str, summary: str):
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO ai_summaries
+                    (subject_id, state, labs_signature, summary, updated_at, last_hit_at, hits)
+                VALUES (?, 'ready', ?, ?, ?, ?, 0)
+                """,
+                (subject_id, signature, summary, now, now)
+            )
+
+            with self._lock:
+                self._puts += 1
+                evict = self._puts % EVICT_EVERY_PUTS == 0
+            if evict:
+                self._evict(conn)
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"⚠️ Summary cache write failed: {e}")
+            self._count("errors")
+
+    def release(self, subject_id: int):
+        """Drop a pending claim (generation failed), so the next request retries"""
+        try:
+            conn = self._connect()
+            conn.execute(
+                "DELETE FROM ai_summaries WHERE subject_id = ? AND state = 'pending'", (subject_id,)
+            )
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"⚠️ Summary cache release failed: {e}")
+            self._count("errors")
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop the least recently read ready summaries beyond max_entries"""
+        conn.execute("BEGIN IMMEDIATE")
+        evicted = conn.execute(
+            """
+            DELETE FROM ai_summaries WHERE subject_id IN (
+                SELECT subject_id FROM ai_summaries
+                WHERE state = 'ready'
+                ORDER BY last_hit_at DESC
+                LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,)
+        ).rowcount
+        conn.execute("COMMIT")
+
+        with self._lock:
+            self.evictions += evicted
+
+    def evict(self):
+        """Run size eviction now"""
+        conn = self._connect()
+        self._evict(conn)
+        conn.close()
+
+    def invalidate(self, subject_id: int):
+        conn = self._connect()
+        conn.execute("DELETE FROM ai_summaries WHERE subject_id = ?", (subject_id,))
+        conn.close()
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM ai_summaries")
+        conn.close()
+
+    def stats(self) -> dict:
+        try:
+            conn = self._connect()
+            counts = dict(conn.execute(
+                "SELECT state, COUNT(*) FROM ai_summaries GROUP BY state"
+            ).fetchall())
+            conn.close()
+        except sqlite3.Error:
+            counts = {}
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'ready': counts.get('ready', 0),
+                'pending': counts.get('pending', 0),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'invalidated': self.invalidated,
+                'claims': self.claims,
+                'duplicates_avoided': self.duplicates_avoided,
+                'evictions': self.evictions,
+                'errors': self.errors,
+            }
@@ -6,13 +6,14 @@
 # and Random Forest models for risk prediction.
 # ==============================================================================
 
+import asyncio
 import json
-import re
 import sqlite3
+from contextlib import asynccontextmanager
 from typing import List, Dict, Any, Optional
 
 from fastapi import FastAPI, Request, BackgroundTasks, HTTPException
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
@@ -21,8 +22,12 @@ from langchain_core.messages import HumanMessage
 # --- Internal Service Imports ---
 from app.services.chatbot_service import (
     generate_ai_summary_background,
+    get_ai_summary_cache_stats,
     get_ai_summary_from_cache,
+    stream_ai_summary,
+    DISCLAIMER,
 )
+from app.services.summary_precompute import SUMMARY_PRECOMPUTE_ENABLED, summary_precomputer
 from app.services.report_service import (
     report_summary,
     report_by_lab,
@@ -36,28 +41,84 @@ from app.services.report_service import (
 from app.services.risk_service import (
     get_patient_risk_score,
     get_high_risk_patients,
+    get_ranked_high_risk_patients,
     get_risk_distribution,
+    get_prediction_cache_report,
 )
 from database.db import get_connection
 
 # --- AI & Agent Imports ---
 from ai.agent import app as agent_app, AgentState
-from ai.llm_client import LocalChatOllama as ChatOpenAI
-from ai.risk_model import predict_patient_risk
+from ai.llm_client import (
+    LocalChatOllama as ChatOpenAI,
+    SAFE_FALLBACK,
+    close_http_clients,
+    get_llm_breaker_stats,
+    get_llm_cache_stats,
+    get_llm_flight_stats,
+    get_llm_prefix_stats,
+    get_llm_routing_stats,
+    get_llm_scheduler_stats,
+)
+from ai.entity_extractor import extract_entities
+from ai.inference_executor import inference_executor
+from ai.intent_classifier import intent_classifier
+from ai.llm_lifecycle import llm_lifecycle
+from ai.prompt_builder import build_prompt, estimate_tokens
 from app.vector.chroma_store import search_documents
 from app.queries.sql_templates import get_count_query
 
+# --- App Lifecycle ---
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm model inference worker processes
+    inference_executor.start()
+    # Load the Ollama model and keep it loaded (in the background; see /health/ready)
+    llm_lifecycle.start()
+    # Opt-in: pre-generate AI summaries of unreviewed critical patients (one process only)
+    if SUMMARY_PRECOMPUTE_ENABLED:
+        summary_precomputer.start()
+    yield
+    summary_precomputer.shutdown()
+    await llm_lifecycle.stop()
+    # Stop model inference worker processes
+    inference_executor.shutdown()
+    # Close pooled Ollama connections
+    await close_http_clients()
+
+
 # --- App Initialization ---
 app = FastAPI(
     title="Lab Report Interpretation System",
     description="Human-like chatbot with AI-assisted lab summaries (Non-diagnostic)",
     version="1.2.1",
+    lifespan=lifespan,
 )
 
 # --- Static Files & Template Configuration ---
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
 
+# =====================================================
+# HEALTH
+# =====================================================
+
+@app.get("/health/live")
+def health_live():
+    """The process is up"""
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+def health_ready():
+    """
+    Ready once the LLM model was loaded by the startup warm-up;
+    503 while warming up or when keep-alive pings fail
+    """
+    status = llm_lifecycle.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
 # =====================================================
 # DASHBOARD ROUTES
 # =====================================================
@@ -110,6 +171,101 @@ def patient_ai_summary(subject_id: int, background_tasks: BackgroundTasks):
     }
 
 
+@app.get("/chat/patient/{subject_id}/ai-summary/stream")
+async def patient_ai_summary_stream(subject_id: int):
+    """
+    Streams the AI summary as SSE (same events as /chat/stream) instead of polling.
+    Tokens are whole sentences that already passed the safety pass.
+    """
+
+    async def event_generator():
+        yield f"data: {json.dumps({'type': 'status', 'content': 'Generating AI summary...'})}\n\n"
+        sent = False
+        try:
+            async for sentence in stream_ai_summary(subject_id):
+                sent = True
+                yield f"data: {json.dumps({'type': 'token', 'content': sentence})}\n\n"
+        except Exception as e:
+            print(f"⚠️ AI summary stream failed for {subject_id}: {e}")
+            if not sent:
+                yield f"data: {json.dumps({'type': 'token', 'content': SAFE_FALLBACK})}\n\n"
+        yield f"data: {json.dumps({'type': 'done', 'disclaimer': DISCLAIMER})}\n\n"
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
+@app.get("/chat/ai-summary-cache-stats")
+def chat_ai_summary_cache_stats():
+    """
+    Shared AI summary cache: ready/pending entries, hit rate, duplicate generations avoided
+    """
+    return get_ai_summary_cache_stats()
+
+
+@app.get("/chat/ai-summary-precompute-stats")
+def chat_ai_summary_precompute_stats():
+    """
+    Background precomputation of summaries for unreviewed critical patients
+    """
+    return summary_precomputer.stats()
+
+
+@app.get("/chat/llm-breaker-stats")
+def chat_llm_breaker_stats():
+    """
+    LLM circuit breaker state (closed / open / half_open), failures and fast-failed calls
+    """
+    return get_llm_breaker_stats()
+
+
+@app.get("/chat/llm-cache-stats")
+def chat_llm_cache_stats():
+    """
+    Persistent LLM response cache size and hit rate
+    """
+    return get_llm_cache_stats()
+
+
+@app.get("/chat/llm-routing-stats")
+def chat_llm_routing_stats():
+    """
+    Model tiers, routing decisions per task and latency per tier
+    """
+    return get_llm_routing_stats()
+
+
+@app.get("/chat/intent-classifier-stats")
+def chat_intent_classifier_stats():
+    """
+    Local intent classifier: predictions, LLM fallbacks and latency
+    """
+    return intent_classifier.stats()
+
+
+@app.get("/chat/llm-prefix-stats")
+def chat_llm_prefix_stats():
+    """
+    Prompt prefix reuse mode (LLM_PREFIX_REUSE) and primed instruction contexts
+    """
+    return get_llm_prefix_stats()
+
+
+@app.get("/chat/llm-flight-stats")
+def chat_llm_flight_stats():
+    """
+    Upstream generations started vs identical requests coalesced onto them
+    """
+    return get_llm_flight_stats()
+
+
+@app.get("/chat/llm-queue-stats")
+def chat_llm_queue_stats():
+    """
+    Ollama admission queue: active calls, queue depth and wait time per priority
+    """
+    return get_llm_scheduler_stats()
+
+
 class ChatRequest(BaseModel):
     question: str = Field(..., min_length=1, description="User question")
 
@@ -191,24 +347,62 @@ def predict_high_risk_patients(risk_level: int = 2, limit: int = 50):
     return get_high_risk_patients(risk_level, limit)
 
 
+@app.get("/predict/high-risk/ranked")
+def predict_ranked_high_risk_patients(
+    limit: int = 50,
+    risk_level: int = 0,
+    gender: Optional[str] = None,
+    cursor: Optional[str] = None,
+):
+    """
+    Top-k patients by predicted CRITICAL probability with cursor pagination
+    Pass next_cursor from the previous response to get the next page
+    """
+    try:
+        return get_ranked_high_risk_patients(limit, risk_level, gender, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/predict/cache-stats")
+def predict_cache_stats():
+    """
+    Prediction cache hit/miss counters, for sizing the cache: summed over
+    the inference workers (chat) and for the API process (/predict endpoints)
+    """
+    return get_prediction_cache_report()
+
+
+@app.get("/predict/inference-stats")
+def predict_inference_stats():
+    """
+    Chat-side inference executor queue depth, outcomes and latency
+    """
+    return inference_executor.stats()
+
+
 
 
 # ==============================================================================
 # AGENTIC CHATBOT API (LANGGRAPH + STREAMING)
 # ==============================================================================
 
+# Knowledge fast path; {context} is filled within the intent's token budget
+KNOWLEDGE_PROMPT_TEMPLATE = "Answer the following question using the context provided.\nContext: {context}\nQuestion: {question}"
+
+
 @app.post("/chat/stream")
 async def chat_stream(payload: ChatRequest):
     """
     OPTIMIZED Streaming LangGraph Agent with Fast-Path:
     - Fast-path for simple count queries (bypasses slow LLM intent classification)
+    - Compiled entity extraction (patient, test, status) for the fast paths
     - LLM-driven Intent Classification (for complex queries)
     - RAG retrieval (Semantic)
     - SQL Aggregation (Safe)
     - ML Risk Prediction
     - Token Streaming
     """
-    import re
     from database.db import get_connection
     from app.queries.sql_templates import get_count_query
     
@@ -216,7 +410,8 @@ async def chat_stream(payload: ChatRequest):
     
     async def event_generator():
         lower_q = question.lower().strip()
-        patient_match = re.search(r'\d{6,}', question)
+        entities = extract_entities(question)
+        subject_id = entities.get("subject_id")
         
         # ============================================================
         # FAST PATH 0: GREETINGS & SHORT INPUTS (0 LLM Calls)
@@ -231,25 +426,25 @@ async def chat_stream(payload: ChatRequest):
         # FAST PATH 1: COUNT Intent (1 LLM Call)
         # ============================================================
         is_count = any(w in lower_q for w in ["how many", "total", "count", "number of"])
-        if is_count and patient_match:
+        if is_count and subject_id:
             yield f"data: {json.dumps({'type': 'status', 'content': 'Processing query...'})}\n\n"
-            subject_id = patient_match.group()
-            status = "CRITICAL" if "critical" in lower_q else "ABNORMAL" if "abnormal" in lower_q else "NORMAL" if "normal" in lower_q else None
-            
-            entities = {"subject_id": subject_id}
-            if status: entities["status"] = status
-            sql, params = get_count_query(entities)
+            status = entities.get("status")
             
+            # One count per mentioned test ("glucose and potassium")
             conn = get_connection()
             cur = conn.cursor()
-            cur.execute(sql, params)
-            count = cur.fetchone()[0]
+            counts = []
+            for test_name in entities.get("tests") or [None]:
+                sql, params = get_count_query({**entities, "test_name": test_name})
+                cur.execute(sql, params)
+                described = " ".join(filter(None, [status, test_name]))
+                counts.append(f"{cur.fetchone()[0]} {described}".strip())
             conn.close()
             
-            prompt = f"Patient {subject_id} has {count} {status if status else ''} laboratory results. Provide a brief, professional explanation."
+            prompt = f"Patient {subject_id} has {', '.join(counts)} laboratory results. Provide a brief, professional explanation."
             
-            yield f"data: {json.dumps({'type': 'status', 'content': 'Generating answer...'})}\n\n"
-            llm = ChatOpenAI(streaming=True)
+            yield f"data: {json.dumps({'type': 'status', 'content': 'Generating answer...', 'prompt_tokens': estimate_tokens(prompt)})}\n\n"
+            llm = ChatOpenAI(streaming=True, task="count")
             async for chunk in llm.astream([HumanMessage(content=prompt)]):
                 if chunk.content: yield f"data: {json.dumps({'type': 'token', 'content': chunk.content})}\n\n"
             yield f"data: {json.dumps({'type': 'done'})}\n\n"
@@ -259,18 +454,17 @@ async def chat_stream(payload: ChatRequest):
         # FAST PATH 2: RISK Intent (1 LLM Call)
         # ============================================================
         is_risk = any(w in lower_q for w in ["risk", "prediction", "assessment"])
-        if is_risk and patient_match:
+        if is_risk and subject_id:
             yield f"data: {json.dumps({'type': 'status', 'content': 'Predicting patient risk...'})}\n\n"
-            subject_id = int(patient_match.group())
-            risk_data = predict_patient_risk(subject_id)
+            risk_data = await inference_executor.predict_risk(int(subject_id))
             
             if "error" in risk_data:
                 prompt = f"Explain that we couldn't calculate risk for patient {subject_id} due to: {risk_data['error']}"
             else:
                 prompt = f"Based on our Random Forest model, patient {subject_id} has a {risk_data['risk_label']} risk level ({risk_data['confidence']}% confidence). Explain this to the user."
             
-            yield f"data: {json.dumps({'type': 'status', 'content': 'Generating clinical summary...'})}\n\n"
-            llm = ChatOpenAI(streaming=True)
+            yield f"data: {json.dumps({'type': 'status', 'content': 'Generating clinical summary...', 'prompt_tokens': estimate_tokens(prompt)})}\n\n"
+            llm = ChatOpenAI(streaming=True, task="risk")
             async for chunk in llm.astream([HumanMessage(content=prompt)]):
                 if chunk.content: yield f"data: {json.dumps({'type': 'token', 'content': chunk.content})}\n\n"
             yield f"data: {json.dumps({'type': 'done'})}\n\n"
@@ -280,15 +474,19 @@ async def chat_stream(payload: ChatRequest):
         # FAST PATH 3: RAG Knowledge (1 LLM Call)
         # ============================================================
         is_knowledge = any(lower_q.startswith(w) for w in ["what is", "define", "explain", "why is"])
-        if is_knowledge and not patient_match:
+        if is_knowledge and not subject_id:
             yield f"data: {json.dumps({'type': 'status', 'content': 'Searching knowledge base...'})}\n\n"
-            context_docs = search_documents(question, k=3)
-            context_text = "\n".join([doc["content"] for doc in context_docs])
-            
-            prompt = f"Answer the following question using the context provided.\nContext: {context_text}\nQuestion: {question}"
+            context_docs = await asyncio.to_thread(search_documents, question, k=3)
+            built = build_prompt(
+                "knowledge",
+                KNOWLEDGE_PROMPT_TEMPLATE,
+                [doc["content"] for doc in context_docs],
+                question=question,
+            )
+            prompt, prompt_tokens = built["prompt"], built["prompt_tokens"]
             
-            yield f"data: {json.dumps({'type': 'status', 'content': 'Generating explanation...'})}\n\n"
-            llm = ChatOpenAI(streaming=True)
+            yield f"data: {json.dumps({'type': 'status', 'content': f'Generating explanation (~{prompt_tokens} prompt tokens)...', 'prompt_tokens': prompt_tokens})}\n\n"
+            llm = ChatOpenAI(streaming=True, task="knowledge")
             async for chunk in llm.astream([HumanMessage(content=prompt)]):
                 if chunk.content: yield f"data: {json.dumps({'type': 'token', 'content': chunk.content})}\n\n"
             yield f"data: {json.dumps({'type': 'done'})}\n\n"
@@ -299,17 +497,21 @@ async def chat_stream(payload: ChatRequest):
         # ============================================================
         state = {"question": question, "context": [], "numerical_result": "", "risk_data": {}}
         final_prompt = ""
+        prompt_tokens = 0
         
-        for event in agent_app.stream(state):
+        # Async graph execution: nodes await the LLM / executor / worker threads,
+        # so other chat sessions keep progressing while this one classifies
+        async for event in agent_app.astream(state):
             for node_name, output in event.items():
                 if node_name == "generate_response":
                     final_prompt = output["final_answer"]
+                    prompt_tokens = output.get("prompt_stats", {}).get("prompt_tokens") or estimate_tokens(final_prompt)
                 else:
                     yield f"data: {json.dumps({'type': 'status', 'content': f'Node {node_name} finished...'})}\n\n"
 
         if final_prompt:
-            llm = ChatOpenAI(streaming=True)
-            yield f"data: {json.dumps({'type': 'status', 'content': 'Synthesizing final answer...'})}\n\n"
+            llm = ChatOpenAI(streaming=True, task="synthesis")
+            yield f"data: {json.dumps({'type': 'status', 'content': f'Synthesizing final answer (~{prompt_tokens} prompt tokens)...', 'prompt_tokens': prompt_tokens})}\n\n"
             
             async for chunk in llm.astream([HumanMessage(content=final_prompt)]):
                 if chunk.content:
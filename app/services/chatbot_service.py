@@ -1,5 +1,10 @@
+import asyncio
+from typing import AsyncIterator
+
 from database.repository import get_abnormal_labs_by_subject
-from ai.llm_client import generate_ai_summary
+from ai.llm_client import NO_FINDINGS_SUMMARY, SAFE_FALLBACK, astream_ai_summary, generate_ai_summary
+from ai.single_flight import StreamFlights
+from ai.summary_cache import SummaryCache, labs_signature
 
 # ---------------- CONSTANTS ----------------
 
@@ -10,39 +15,103 @@ DISCLAIMER = (
 
 # ---------------- AI SUMMARY (CACHED) ----------------
 
-_AI_SUMMARY_CACHE: dict[int, dict] = {}
+# Shared by all workers; keyed by patient, invalidated when their abnormal labs change
+_summary_cache = SummaryCache()
+
+# One streamed generation per patient and process; late subscribers join it
+_summary_flights = StreamFlights()
+
+# How often a stream re-checks a summary another worker is generating
+SUMMARY_WAIT_POLL_SECONDS = 0.5
+
+
+def _summary_entry(subject_id: int, summary: str) -> dict:
+    return {
+        "subject_id": subject_id,
+        "summary": summary,
+        "disclaimer": DISCLAIMER
+    }
 
 
 def generate_ai_summary_background(subject_id: int):
     """
     Triggers AI summary generation for abnormal lab results.
-    Results are cached in memory for subsequent retrieval.
+    Does nothing if the summary is cached or already being generated.
+    Returns 'generated', 'skipped' or 'failed'.
     """
-    if subject_id in _AI_SUMMARY_CACHE:
-        return
-
-    # Use repository to fetch data directly
     labs = get_abnormal_labs_by_subject(subject_id, limit=5)
+    signature = labs_signature(labs)
 
-    if not labs:
-        _AI_SUMMARY_CACHE[subject_id] = {
-            "subject_id": subject_id,
-            "summary": "No abnormal or critical lab findings were detected.",
-            "disclaimer": DISCLAIMER
-        }
-        return
+    if not _summary_cache.claim(subject_id, signature):
+        return "skipped"
 
-    summary_text = generate_ai_summary(labs)
+    summary_text = generate_ai_summary(labs) if labs else NO_FINDINGS_SUMMARY
 
-    _AI_SUMMARY_CACHE[subject_id] = {
-        "subject_id": subject_id,
-        "summary": summary_text.strip(),
-        "disclaimer": DISCLAIMER
-    }
+    # Failed generations are retried by the next request instead of being cached
+    if summary_text == SAFE_FALLBACK:
+        _summary_cache.release(subject_id)
+        return "failed"
+
+    _summary_cache.put(subject_id, signature, summary_text.strip())
+    return "generated"
 
 
 def get_ai_summary_from_cache(subject_id: int):
     """
-    Retrieves AI summary from memory cache if available.
+    Retrieves the AI summary if one is cached for the patient's current labs.
+    """
+    labs = get_abnormal_labs_by_subject(subject_id, limit=5)
+    summary = _summary_cache.get(subject_id, labs_signature(labs))
+    return _summary_entry(subject_id, summary) if summary is not None else None
+
+
+def get_ai_summary_cache_stats() -> dict:
+    return _summary_cache.stats()
+
+
+async def _produce_summary(subject_id: int) -> AsyncIterator[str]:
+    """
+    Stream the summary and cache it once the generation completed
+    (unless it came back empty or as the fallback).
+    A cached summary is returned at once; a generation running in another
+    worker is waited for instead of duplicated.
+    """
+    labs = await asyncio.to_thread(get_abnormal_labs_by_subject, subject_id, limit=5)
+    signature = labs_signature(labs)
+
+    while not await asyncio.to_thread(_summary_cache.claim, subject_id, signature):
+        summary = await asyncio.to_thread(_summary_cache.get, subject_id, signature)
+        if summary is not None:
+            yield summary
+            return
+        await asyncio.sleep(SUMMARY_WAIT_POLL_SECONDS)
+
+    parts = []
+    try:
+        async for sentence in astream_ai_summary(labs):
+            parts.append(sentence)
+            yield sentence
+    except BaseException:
+        # Failed or cancelled (every viewer left): let the next request retry
+        await asyncio.shield(asyncio.to_thread(_summary_cache.release, subject_id))
+        raise
+
+    summary_text = "".join(parts).strip()
+
+    # An empty or fallback answer is not cached; the next request retries
+    if not summary_text or summary_text == SAFE_FALLBACK:
+        await asyncio.to_thread(_summary_cache.release, subject_id)
+        if not summary_text:
+            yield SAFE_FALLBACK
+        return
+
+    await asyncio.to_thread(_summary_cache.put, subject_id, signature, summary_text)
+
+
+def stream_ai_summary(subject_id: int) -> AsyncIterator[str]:
+    """
+    Streams the AI summary sentence by sentence.
+    The caller joins the patient's in-progress generation (receiving what
+    was already generated) or starts a new one.
     """
-    return _AI_SUMMARY_CACHE.get(subject_id)
+    return _summary_flights.join(str(subject_id), lambda: _produce_summary(subject_id))
@@ -3,8 +3,29 @@ Risk Scoring Service
 Provides APIs for risk prediction and patient risk reports
 """
 
+import base64
+import json
+import os
+import threading
+import time
+
+from ai.inference_executor import inference_executor
 from database.db import get_connection as get_db
-from ai.risk_model import predict_patient_risk
+from database.feature_store import ensure_feature_store, feature_store_ready
+from database.risk_scores import get_top_risk_scores, has_risk_scores, has_scores_from_other_model
+from ai.risk_model import (
+    predict_patient_risk,
+    get_prediction_cache_stats,
+    refresh_risk_scores,
+    load_model,
+    model_version,
+)
+
+# Minimum seconds between incremental re-scoring runs for the ranking
+RISK_SCORE_REFRESH_SECONDS = float(os.getenv("RISK_SCORE_REFRESH_SECONDS", "60"))
+
+_refresh_lock = threading.Lock()
+_refresh_state = {"last_run": 0.0}
 
 
 def get_patient_risk_score(subject_id: int):
@@ -14,37 +35,128 @@ def get_patient_risk_score(subject_id: int):
     return predict_patient_risk(subject_id)
 
 
+def get_prediction_cache_report():
+    """
+    Prediction cache counters (hits, misses, evictions, size).
+    Chat predictions run in the inference workers, each with its own cache;
+    the API process's cache only serves the /predict endpoints.
+    """
+    return {
+        'inference_workers': inference_executor.cache_stats(),
+        'api_process': get_prediction_cache_stats(),
+    }
 
 
-def get_high_risk_patients(risk_level: int = 2, limit: int = 50):
+def _run_refresh():
+    if not _refresh_lock.acquire(blocking=False):
+        return  # another refresh is already running
+    try:
+        # Scores cover feature-store patients only, so backfill the store first
+        ensure_feature_store()
+        refresh_risk_scores()
+        _refresh_state["last_run"] = time.time()
+    finally:
+        _refresh_lock.release()
+
+
+def ensure_risk_scores_fresh():
     """
-    Get all patients above a certain risk level
-    risk_level: 1 = ABNORMAL, 2 = CRITICAL
+    Keep stored scores in step with the model and the feature store.
+    Scores from another model version (checked on the stored rows, so a
+    rescore already done by retrain_and_swap or another worker counts) and
+    patients changed since the last run (at most every
+    RISK_SCORE_REFRESH_SECONDS) are re-scored in the background while the
+    stored rows keep being served. Only an empty score table (first use)
+    is filled synchronously. A feature store that was never backfilled is
+    backfilled in the background first; until then the ranking is partial.
     """
-    conn = get_db()
-    cur = conn.cursor()
+    load_model()
+    version = model_version()
+    if version is None:
+        return
 
-    cur.execute("""
-        SELECT DISTINCT subject_id
-        FROM lab_interpretations
-        WHERE subject_id IN (
-            SELECT subject_id
-            FROM lab_interpretations
-            WHERE status IN ('ABNORMAL', 'CRITICAL')
-        )
-        LIMIT ?
-    """, (limit,))
+    if not feature_store_ready():
+        if not _refresh_lock.locked():
+            threading.Thread(target=_run_refresh, daemon=True).start()
+        return
 
-    patients = cur.fetchall()
-    conn.close()
+    if not has_risk_scores():
+        with _refresh_lock:
+            if not has_risk_scores():
+                refresh_risk_scores()
+                _refresh_state["last_run"] = time.time()
+        return
+
+    if _refresh_lock.locked():
+        return  # a refresh is already running
+    if (has_scores_from_other_model(version)
+            or time.time() - _refresh_state["last_run"] >= RISK_SCORE_REFRESH_SECONDS):
+        threading.Thread(target=_run_refresh, daemon=True).start()
 
-    high_risk = []
-    for patient in patients:
-        score = predict_patient_risk(patient['subject_id'])
-        if 'risk_level' in score and score['risk_level'] >= risk_level:
-            high_risk.append(score)
 
-    return sorted(high_risk, key=lambda x: x.get('confidence', 0), reverse=True)
+def _encode_cursor(row: dict) -> str:
+    raw = json.dumps([row["prob_critical"], row["subject_id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        prob_critical, subject_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(prob_critical), int(subject_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _score_to_prediction(row: dict) -> dict:
+    """Stored score row -> same shape as predict_patient_risk output"""
+    return {
+        'subject_id': row['subject_id'],
+        'gender': row['gender'],
+        'risk_level': row['risk_level'],
+        'risk_label': ['NORMAL', 'ABNORMAL', 'CRITICAL'][row['risk_level']],
+        'confidence': row['confidence'],
+        'predicted_at': row['scored_at'],
+        'probabilities': {
+            'normal': row['prob_normal'],
+            'abnormal': row['prob_abnormal'],
+            'critical': row['prob_critical']
+        }
+    }
+
+
+def get_ranked_high_risk_patients(limit: int = 50,
+                                  risk_level: int = 0,
+                                  gender: str = None,
+                                  cursor: str = None):
+    """
+    Top-k patients by predicted CRITICAL probability, read from the
+    stored score index (no model calls per request).
+    risk_level: minimum predicted risk level (0-2)
+    gender: optional 'M' / 'F' filter
+    cursor: next_cursor from the previous page
+    Returns: {'patients': [...], 'next_cursor': str | None, 'complete': bool}
+    'complete' is False while the feature store is still being backfilled
+    (patients without a store row are not ranked yet).
+    """
+    ensure_risk_scores_fresh()
+
+    after = _decode_cursor(cursor) if cursor else None
+    rows = get_top_risk_scores(limit, risk_level, gender, after)
+
+    return {
+        'patients': [_score_to_prediction(r) for r in rows],
+        'next_cursor': _encode_cursor(rows[-1]) if len(rows) == limit else None,
+        'complete': feature_store_ready(),
+    }
+
+
+def get_high_risk_patients(risk_level: int = 2, limit: int = 50):
+    """
+    Get all patients above a certain risk level
+    risk_level: 1 = ABNORMAL, 2 = CRITICAL
+    Ranked by predicted CRITICAL probability
+    """
+    return get_ranked_high_risk_patients(limit, risk_level)['patients']
 
 
 def get_risk_distribution():
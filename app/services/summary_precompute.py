@@ -0,0 +1,174 @@
+"""
+AI Summary Precomputation
+Clinicians mostly open AI summaries for patients with unreviewed CRITICAL
+labs, so those summaries are generated ahead of time and served from the
+summary cache (ai/summary_cache.py) instead of waiting for the LLM.
+
+- runs from scripts/precompute_summaries.py, or (opt-in, with
+  SUMMARY_PRECOMPUTE_ENABLED=1) as background work in the app. Either way
+  only the process holding SUMMARY_PRECOMPUTE_LOCK_PATH runs passes, so N
+  uvicorn workers don't queue N background generations on Ollama
+- at most SUMMARY_PRECOMPUTE_MAX_PATIENTS patients per pass
+- a thread pool of SUMMARY_PRECOMPUTE_CONCURRENCY workers
+- resumable: the summary cache is the checkpoint. Patients whose summary
+  is cached for their current labs are skipped, so a pass restarted after
+  a crash continues where the previous one stopped. Claims left behind by
+  a crashed pass expire after SUMMARY_PENDING_TIMEOUT_SECONDS.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from app.services.chatbot_service import generate_ai_summary_background
+from database.repository import get_critical_unreviewed_subjects
+
+
+# Off in the app by default; prefer scripts/precompute_summaries.py
+SUMMARY_PRECOMPUTE_ENABLED = os.getenv("SUMMARY_PRECOMPUTE_ENABLED", "0") == "1"
+SUMMARY_PRECOMPUTE_CONCURRENCY = int(os.getenv("SUMMARY_PRECOMPUTE_CONCURRENCY", "1"))
+# Seconds between passes (new critical results arrive with ingestion)
+SUMMARY_PRECOMPUTE_INTERVAL_SECONDS = float(os.getenv("SUMMARY_PRECOMPUTE_INTERVAL_SECONDS", "600"))
+# Patients per pass (0 = all)
+SUMMARY_PRECOMPUTE_MAX_PATIENTS = int(os.getenv("SUMMARY_PRECOMPUTE_MAX_PATIENTS", "50"))
+# Held by the one process that precomputes
+SUMMARY_PRECOMPUTE_LOCK_PATH = Path(os.getenv("SUMMARY_PRECOMPUTE_LOCK_PATH", "database/summary_precompute.lock"))
+
+
+class SummaryPrecomputer:
+    def __init__(self,
+                 concurrency: int = SUMMARY_PRECOMPUTE_CONCURRENCY,
+                 interval_seconds: float = SUMMARY_PRECOMPUTE_INTERVAL_SECONDS,
+                 max_patients: int = SUMMARY_PRECOMPUTE_MAX_PATIENTS):
+        self.concurrency = max(1, concurrency)
+        self.interval_seconds = interval_seconds
+        self.max_patients = max_patients
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_file = None
+        self.running = False
+        self.passes = 0
+        self.last_pass = None
+        self.totals = {'generated': 0, 'skipped': 0, 'failed': 0}
+
+    def _precompute_one(self, subject_id: int) -> str:
+        if self._stop.is_set():
+            return "cancelled"
+        try:
+            return generate_ai_summary_background(subject_id)
+        except Exception as e:
+            print(f"⚠️ Summary precompute failed for {subject_id}: {e}")
+            return "failed"
+
+    def run_once(self) -> dict:
+        """One pass over all patients with unreviewed critical labs"""
+        started = time.perf_counter()
+        subjects = get_critical_unreviewed_subjects(self.max_patients or None)
+        counts = {'generated': 0, 'skipped': 0, 'failed': 0, 'cancelled': 0}
+
+        with self._lock:
+            self.running = True
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency,
+                                    thread_name_prefix="summary-precompute") as pool:
+                futures = [pool.submit(self._precompute_one, s) for s in subjects]
+                for future in as_completed(futures):
+                    outcome = future.result()
+                    counts[outcome] += 1
+                    if outcome in self.totals:
+                        with self._lock:
+                            self.totals[outcome] += 1
+        finally:
+            with self._lock:
+                self.running = False
+
+        result = {
+            'patients': len(subjects),
+            **counts,
+            'seconds': round(time.perf_counter() - started, 1),
+            'finished_at': datetime.now().isoformat(),
+        }
+        with self._lock:
+            self.passes += 1
+            self.last_pass = result
+
+        print(f"✓ AI summaries precomputed for {len(subjects)} critical patients: "
+              f"{counts['generated']} generated, {counts['skipped']} cached, "
+              f"{counts['failed']} failed ({result['seconds']}s)")
+        return result
+
+    def acquire_leader(self, path: Path = SUMMARY_PRECOMPUTE_LOCK_PATH) -> bool:
+        """Non-blocking file lock; False if another process already precomputes"""
+        if self._lock_file is not None:
+            return True
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lock_file = open(path, "a+")
+        try:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def release_leader(self):
+        if self._lock_file is not None:
+            # Closing the file releases the lock
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ Summary precompute pass failed: {e}")
+            self._stop.wait(self.interval_seconds)
+
+    def start(self):
+        """Run passes on a background thread until shutdown(), in one process only"""
+        if not self.acquire_leader():
+            print("✓ AI summary precompute runs in another process; skipped here")
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="summary-precompute", daemon=True)
+            self._thread.start()
+
+    def shutdown(self):
+        """Stop after the generations in progress; queued patients are dropped"""
+        self._stop.set()
+        self._thread = None
+        self.release_leader()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'enabled': SUMMARY_PRECOMPUTE_ENABLED,
+                'leader': self._lock_file is not None,
+                'running': self.running,
+                'concurrency': self.concurrency,
+                'max_patients': self.max_patients,
+                'interval_seconds': self.interval_seconds,
+                'passes': self.passes,
+                'last_pass': self.last_pass,
+                'totals': dict(self.totals),
+            }
+
+
+# Shared precomputer for the FastAPI app
+summary_precomputer = SummaryPrecomputer()
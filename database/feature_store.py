@@ -0,0 +1,228 @@
+"""
+Patient feature store.
+
+Keeps one row per patient in the `patient_features` table with the
+'<test>_value' column layout used by the risk model, so inference is a
+single primary-key lookup and training is a single table read.
+
+The store is updated incrementally on every bulk insert of lab results
+(see database.repository.insert_lab_results_bulk). On a database that
+held labs before the store existed, incremental updates only cover the
+patients ingested since, so readers must not trust the store until it
+was backfilled: feature_store_ready() checks the backfill marker, and
+ensure_feature_store() (run by create_tables) backfills when needed.
+"""
+
+import sqlite3
+
+from database.db import get_connection
+from processing.lab_canonical_map import LAB_CANONICAL_MAP
+
+
+STATUS_RANK = {'NORMAL': 0, 'ABNORMAL': 1, 'CRITICAL': 2}
+
+
+def feature_name(test_name: str) -> str:
+    """Map a lab test name to its model feature column"""
+    return test_name.lower().replace(' ', '_').replace('-', '_') + '_value'
+
+
+FEATURE_TESTS = sorted(set(LAB_CANONICAL_MAP.values()))
+FEATURE_COLUMNS = [feature_name(t) for t in FEATURE_TESTS]
+
+CREATE_FEATURES_SQL = f"""
+CREATE TABLE IF NOT EXISTS patient_features (
+    subject_id INTEGER PRIMARY KEY,
+    risk_level INTEGER NOT NULL DEFAULT 0,
+    {", ".join(f"{col} REAL" for col in FEATURE_COLUMNS)},
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_time TEXT
+)
+"""
+
+# Backfill marker: set once the store covers every patient
+CREATE_FEATURE_STATE_SQL = """
+CREATE TABLE IF NOT EXISTS feature_store_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+)
+"""
+
+_MARK_BACKFILLED_SQL = """
+INSERT OR REPLACE INTO feature_store_state (key, value)
+VALUES ('backfilled_at', datetime('now'))
+"""
+
+_UPSERT_SQL = f"""
+INSERT INTO patient_features (
+    subject_id, risk_level, {", ".join(FEATURE_COLUMNS)}, version, updated_time
+) VALUES (?, ?, {", ".join("?" for _ in FEATURE_COLUMNS)}, 1, datetime('now'))
+ON CONFLICT(subject_id) DO UPDATE SET
+    risk_level = MAX(risk_level, excluded.risk_level),
+    {", ".join(f"{col} = COALESCE(excluded.{col}, {col})" for col in FEATURE_COLUMNS)},
+    version = version + 1,
+    updated_time = excluded.updated_time
+"""
+
+
+def _upsert_rows(cursor, patients: dict):
+    """patients: {subject_id: (risk_level, {feature_col: value})}"""
+    cursor.executemany(_UPSERT_SQL, [
+        (subject_id, risk_level, *[values.get(col) for col in FEATURE_COLUMNS])
+        for subject_id, (risk_level, values) in patients.items()
+    ])
+
+
+# ---------------- INCREMENTAL UPDATES ----------------
+
+def update_patient_features(cursor, records: list[tuple]):
+    """
+    Fold newly inserted lab rows into the feature store.
+
+    records use the INSERT_SQL column order of database.repository:
+    (subject_id, hadm_id, test_name, value, unit, gender, status, ...)
+    Later rows win for the same (patient, test), matching the
+    "last value" rule used when building features from raw rows.
+    """
+    patients = {}
+
+    for record in records:
+        subject_id, _, test_name, value, _, _, status = record[:7]
+        if value is None:
+            continue
+
+        risk_level, values = patients.setdefault(int(subject_id), (0, {}))
+        col = feature_name(test_name)
+        if col in FEATURE_COLUMNS:
+            values[col] = float(value)
+        patients[int(subject_id)] = (
+            max(risk_level, STATUS_RANK.get(status, 0)),
+            values
+        )
+
+    if patients:
+        _upsert_rows(cursor, patients)
+
+
+def rebuild_feature_store():
+    """
+    Recompute the whole feature store from lab_interpretations.
+    Needed once for databases populated before the store existed.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    cursor.execute(CREATE_FEATURE_STATE_SQL)
+    cursor.execute("BEGIN")
+    cursor.execute("DELETE FROM patient_features")
+
+    cursor.execute("""
+        SELECT
+            subject_id,
+            MAX(
+                CASE
+                    WHEN status = 'CRITICAL' THEN 2
+                    WHEN status = 'ABNORMAL' THEN 1
+                    ELSE 0
+                END
+            ) AS risk_level
+        FROM lab_interpretations
+        WHERE value IS NOT NULL
+        GROUP BY subject_id
+    """)
+    patients = {row["subject_id"]: (row["risk_level"], {}) for row in cursor.fetchall()}
+
+    # Last (most recently inserted) value per patient and test
+    cursor.execute("""
+        SELECT subject_id, test_name, value
+        FROM lab_interpretations
+        WHERE id IN (
+            SELECT MAX(id)
+            FROM lab_interpretations
+            WHERE value IS NOT NULL
+            GROUP BY subject_id, test_name
+        )
+    """)
+    for row in cursor.fetchall():
+        col = feature_name(row["test_name"])
+        if col in FEATURE_COLUMNS:
+            patients[row["subject_id"]][1][col] = row["value"]
+
+    _upsert_rows(cursor, patients)
+    cursor.execute(_MARK_BACKFILLED_SQL)
+    cursor.execute("COMMIT")
+    conn.close()
+
+    return len(patients)
+
+
+_ready = False  # once backfilled, the store stays complete (incremental updates)
+
+
+def feature_store_ready() -> bool:
+    """True once the store covers every patient (backfilled or started empty)"""
+    global _ready
+    if _ready:
+        return True
+
+    conn = get_connection()
+    try:
+        row = conn.execute(
+            "SELECT 1 FROM feature_store_state WHERE key = 'backfilled_at'"
+        ).fetchone()
+    except sqlite3.OperationalError:  # marker table not created yet
+        row = None
+    finally:
+        conn.close()
+
+    _ready = row is not None
+    return _ready
+
+
+def ensure_feature_store() -> int:
+    """
+    Backfill the store unless it is known to be complete.
+    A database without labs is simply marked: every later insert keeps the
+    store in step. Returns the number of patients backfilled.
+    """
+    if feature_store_ready():
+        return 0
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(CREATE_FEATURE_STATE_SQL)
+    has_labs = cursor.execute("SELECT EXISTS (SELECT 1 FROM lab_interpretations)").fetchone()[0]
+    if not has_labs:
+        cursor.execute(_MARK_BACKFILLED_SQL)
+        conn.commit()
+        conn.close()
+        return 0
+    conn.close()
+
+    print("🔁 Backfilling the patient feature store from existing lab rows...")
+    count = rebuild_feature_store()
+    print(f"✓ Feature store backfilled for {count} patients")
+    return count
+
+
+def clear_feature_store(cursor):
+    cursor.execute("DELETE FROM patient_features")
+
+
+# ---------------- LOOKUPS ----------------
+
+def get_patient_features(subject_id: int):
+    """
+    Single-row lookup of a patient's feature vector.
+    Returns None when the patient is not in the store.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT * FROM patient_features WHERE subject_id = ?",
+        (subject_id,)
+    )
+    row = cursor.fetchone()
+    conn.close()
+
+    return dict(row) if row else None
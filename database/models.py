@@ -1,4 +1,6 @@
 from database.db import get_connection
+from database.feature_store import CREATE_FEATURE_STATE_SQL, CREATE_FEATURES_SQL, ensure_feature_store
+from database.risk_scores import create_risk_score_tables
 
 
 def create_tables():
@@ -43,5 +45,15 @@ def create_tables():
     ON lab_interpretations (processed_time)
     """)
 
+    # Per-patient feature store for the risk model
+    cursor.execute(CREATE_FEATURES_SQL)
+    cursor.execute(CREATE_FEATURE_STATE_SQL)
+
+    # Stored model scores for top-k risk ranking
+    create_risk_score_tables(cursor)
+
     conn.commit()
     conn.close()
+
+    # Databases that held labs before the feature store existed
+    ensure_feature_store()
@@ -1,4 +1,6 @@
 from database.db import get_connection
+from database.feature_store import update_patient_features, clear_feature_store
+from database.risk_scores import clear_risk_scores
 
 
 # ---------------- INSERTS ----------------
@@ -23,30 +25,49 @@ def insert_lab_results_bulk(records: list[tuple]):
     """
     Bulk insert lab interpretations.
     Used during ingestion / preprocessing (FAST).
+    The patient feature store is updated in the same transaction.
     """
     if not records:
         return
 
     conn = get_connection()
     cursor = conn.cursor()
+    cursor.execute("BEGIN")
     cursor.executemany(INSERT_SQL, records)
-    conn.commit()
+    update_patient_features(cursor, records)
+    cursor.execute("COMMIT")
     conn.close()
 
 
 def clear_lab_interpretations():
     """
     ⚠️ DEVELOPMENT ONLY
-    Clears all lab interpretations.
+    Clears all lab interpretations, with the feature store and the stored
+    risk scores derived from them.
     DO NOT call this in production.
     """
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("DELETE FROM lab_interpretations")
+    clear_feature_store(cursor)
+    clear_risk_scores(cursor)
     conn.commit()
     conn.close()
 
 
+def get_lab_row_watermark() -> int:
+    """
+    Highest lab_interpretations id.
+    Used to measure how many rows were ingested since a point in time.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM lab_interpretations")
+    watermark = cursor.fetchone()[0]
+    conn.close()
+    return watermark
+
+
 # ---------------- AI SUPPORT QUERIES ----------------
 
 def get_abnormal_labs_by_subject(subject_id: int, limit: int = 5):
@@ -139,3 +160,31 @@ def get_critical_unreviewed():
     conn.close()
 
     return [dict(row) for row in rows]
+
+
+def get_critical_unreviewed_subjects(limit: int = None) -> list[int]:
+    """
+    Patients with unreviewed CRITICAL labs, most recent first.
+    Used to precompute AI summaries.
+    """
+
+    query = """
+    SELECT subject_id
+    FROM lab_interpretations
+    WHERE status = 'CRITICAL'
+      AND reviewed = 0
+    GROUP BY subject_id
+    ORDER BY MAX(processed_time) DESC
+    """
+    params = ()
+    if limit:
+        query += " LIMIT ?"
+        params = (limit,)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    conn.close()
+
+    return [row["subject_id"] for row in rows]
@@ -0,0 +1,176 @@
+"""
+Stored patient risk scores.
+
+The `patient_risk_scores` table keeps the latest model output per patient,
+tagged with the feature-store version and model version it was computed
+from. Indexes on critical probability let the high-risk ranking read the
+top-k directly instead of scoring every patient per request.
+"""
+
+from database.db import get_connection
+
+
+CREATE_RISK_SCORES_SQL = """
+CREATE TABLE IF NOT EXISTS patient_risk_scores (
+    subject_id INTEGER PRIMARY KEY,
+    gender TEXT,
+    risk_level INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    prob_normal REAL NOT NULL,
+    prob_abnormal REAL NOT NULL,
+    prob_critical REAL NOT NULL,
+    data_version INTEGER NOT NULL,
+    model_version TEXT NOT NULL,
+    scored_at TEXT NOT NULL
+)
+"""
+
+CREATE_RISK_SCORE_INDEXES_SQL = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_risk_critical
+    ON patient_risk_scores (prob_critical DESC, subject_id)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_risk_gender_critical
+    ON patient_risk_scores (gender, prob_critical DESC, subject_id)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_risk_model_version
+    ON patient_risk_scores (model_version)
+    """,
+]
+
+_UPSERT_SQL = """
+INSERT INTO patient_risk_scores (
+    subject_id, gender, risk_level, confidence,
+    prob_normal, prob_abnormal, prob_critical,
+    data_version, model_version, scored_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(subject_id) DO UPDATE SET
+    gender = excluded.gender,
+    risk_level = excluded.risk_level,
+    confidence = excluded.confidence,
+    prob_normal = excluded.prob_normal,
+    prob_abnormal = excluded.prob_abnormal,
+    prob_critical = excluded.prob_critical,
+    data_version = excluded.data_version,
+    model_version = excluded.model_version,
+    scored_at = excluded.scored_at
+"""
+
+# Patients whose features or model changed since they were last scored
+STALE_FEATURES_SQL = """
+SELECT
+    f.*,
+    (SELECT l.gender FROM lab_interpretations l
+      WHERE l.subject_id = f.subject_id LIMIT 1) AS gender
+FROM patient_features f
+LEFT JOIN patient_risk_scores s ON s.subject_id = f.subject_id
+WHERE s.subject_id IS NULL
+   OR s.data_version != f.version
+   OR s.model_version != ?
+LIMIT ?
+"""
+
+
+def create_risk_score_tables(cursor):
+    cursor.execute(CREATE_RISK_SCORES_SQL)
+    for sql in CREATE_RISK_SCORE_INDEXES_SQL:
+        cursor.execute(sql)
+
+
+def clear_risk_scores(cursor):
+    cursor.execute("DELETE FROM patient_risk_scores")
+
+
+def prune_orphan_risk_scores() -> int:
+    """Drop scores of patients no longer in the feature store; returns rows removed"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        DELETE FROM patient_risk_scores
+        WHERE subject_id NOT IN (SELECT subject_id FROM patient_features)
+    """)
+    removed = cursor.rowcount
+    conn.commit()
+    conn.close()
+    return removed
+
+
+def upsert_risk_scores(rows: list[tuple]):
+    """rows follow the _UPSERT_SQL column order"""
+    if not rows:
+        return
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    cursor.executemany(_UPSERT_SQL, rows)
+    cursor.execute("COMMIT")
+    conn.close()
+
+
+def count_risk_scores() -> int:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM patient_risk_scores")
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
+
+def has_risk_scores() -> bool:
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM patient_risk_scores)")
+    found = bool(cursor.fetchone()[0])
+    conn.close()
+    return found
+
+
+def has_scores_from_other_model(version: str) -> bool:
+    """True if any stored score was computed by a model other than version"""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT EXISTS (
+            SELECT 1 FROM patient_risk_scores
+            WHERE model_version < ? OR model_version > ?
+        )
+    """, (version, version))
+    found = bool(cursor.fetchone()[0])
+    conn.close()
+    return found
+
+
+def get_top_risk_scores(limit: int,
+                        min_risk_level: int = 0,
+                        gender: str = None,
+                        after: tuple = None):
+    """
+    Patients ordered by critical probability (highest first), then subject_id.
+
+    after: (prob_critical, subject_id) of the last row of the previous page
+    (keyset pagination, so deep pages cost the same as the first one).
+    """
+    query = "SELECT * FROM patient_risk_scores WHERE risk_level >= ?"
+    params = [min_risk_level]
+
+    if gender:
+        query += " AND gender = ?"
+        params.append(gender)
+
+    if after is not None:
+        query += " AND (prob_critical < ? OR (prob_critical = ? AND subject_id > ?))"
+        params.extend([after[0], after[0], after[1]])
+
+    query += " ORDER BY prob_critical DESC, subject_id LIMIT ?"
+    params.append(limit)
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(query, tuple(params))
+    rows = cursor.fetchall()
+    conn.close()
+
+    return [dict(row) for row in rows]
@@ -0,0 +1,246 @@
+"""
+Latency benchmark for /chat/stream
+Drives every chat path (greeting, count / risk / knowledge fast paths and
+the full agent graph) and reports percentiles of:
+
+- time to first event   (any SSE event, e.g. the first status)
+- time to first token   (first 'token' event)
+- total time            (until the 'done' event)
+- tokens/sec            (token events after the first one, per second)
+
+With --spawn, a fake Ollama (scripts/fake_ollama.py) and the app are
+started as subprocesses, so the benchmark runs without a real model.
+The LLM response cache is disabled in the spawned app unless --with-cache
+is given, otherwise repeated questions would only measure cache hits.
+
+Run this from the project root:
+    python scripts/benchmark_chat_stream.py --spawn --requests 20 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+sys.path.insert(0, '.')
+
+import httpx
+import numpy as np
+
+DEFAULT_APP_URL = "http://127.0.0.1:8000"
+DEFAULT_SUBJECT_ID = 10014354
+
+SCENARIOS = {
+    "greeting": "hello",
+    "count": "How many critical results does patient {subject_id} have?",
+    "risk": "What is the risk assessment for patient {subject_id}?",
+    "knowledge": "What is glucose?",
+    "agent": "Show abnormal lab results for patient {subject_id}",
+}
+
+
+def pick_subject_id() -> int:
+    """A patient from the local database, so fast paths hit real rows"""
+    try:
+        from database.db import get_connection
+        conn = get_connection()
+        row = conn.execute("SELECT subject_id FROM lab_interpretations LIMIT 1").fetchone()
+        conn.close()
+        if row:
+            return row[0]
+    except Exception:
+        pass
+    return DEFAULT_SUBJECT_ID
+
+
+async def run_once(client: httpx.AsyncClient, url: str, question: str) -> dict:
+    """One /chat/stream request; timings in seconds from request start"""
+    result = {'first_event': None, 'first_token': None, 'total': None, 'tokens': 0, 'error': None}
+    start = time.perf_counter()
+    try:
+        async with client.stream("POST", f"{url}/chat/stream", json={"question": question}) as response:
+            if response.status_code != 200:
+                result['error'] = f"HTTP {response.status_code}"
+                return result
+
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                now = time.perf_counter() - start
+                event = json.loads(line[6:])
+
+                if result['first_event'] is None:
+                    result['first_event'] = now
+                if event.get("type") == "token":
+                    if result['first_token'] is None:
+                        result['first_token'] = now
+                    result['tokens'] += 1
+                elif event.get("type") == "done":
+                    break
+    except Exception as e:
+        result['error'] = str(e) or type(e).__name__
+
+    result['total'] = time.perf_counter() - start
+    return result
+
+
+async def run_scenario(url: str, question: str, requests: int, concurrency: int, timeout: float) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        async def bounded():
+            async with semaphore:
+                return await run_once(client, url, question)
+
+        return await asyncio.gather(*[bounded() for _ in range(requests)])
+
+
+def summarize(results: list) -> dict:
+    ok = [r for r in results if r['error'] is None]
+    summary = {'requests': len(results), 'errors': len(results) - len(ok)}
+
+    def pct(values):
+        if not values:
+            return None
+        return {
+            'p50': round(float(np.percentile(values, 50)) * 1000, 1),
+            'p95': round(float(np.percentile(values, 95)) * 1000, 1),
+            'p99': round(float(np.percentile(values, 99)) * 1000, 1),
+        }
+
+    summary['first_event_ms'] = pct([r['first_event'] for r in ok if r['first_event'] is not None])
+    summary['first_token_ms'] = pct([r['first_token'] for r in ok if r['first_token'] is not None])
+    summary['total_ms'] = pct([r['total'] for r in ok])
+
+    rates = [
+        (r['tokens'] - 1) / (r['total'] - r['first_token'])
+        for r in ok
+        if r['first_token'] is not None and r['tokens'] > 1 and r['total'] > r['first_token']
+    ]
+    summary['tokens_per_sec'] = (
+        {
+            'p50': round(float(np.percentile(rates, 50)), 1),
+            'p5': round(float(np.percentile(rates, 5)), 1),
+        }
+        if rates else None
+    )
+    return summary
+
+
+def print_report(report: dict):
+    def cell(stats, key):
+        return f"{stats[key]:>8.1f}" if stats else f"{'-':>8}"
+
+    print()
+    print(f"{'scenario':<10} {'req':>4} {'err':>4} | {'1st event p50':>13} {'p95':>8} | "
+          f"{'TTFT p50':>8} {'p95':>8} {'p99':>8} | {'total p50':>9} {'p95':>8} | {'tok/s':>6}")
+    print("-" * 114)
+    for name, s in report.items():
+        rate = f"{s['tokens_per_sec']['p50']:>6.1f}" if s['tokens_per_sec'] else f"{'-':>6}"
+        print(f"{name:<10} {s['requests']:>4} {s['errors']:>4} | "
+              f"{cell(s['first_event_ms'], 'p50'):>13} {cell(s['first_event_ms'], 'p95')} | "
+              f"{cell(s['first_token_ms'], 'p50')} {cell(s['first_token_ms'], 'p95')} "
+              f"{cell(s['first_token_ms'], 'p99')} | "
+              f"{cell(s['total_ms'], 'p50'):>9} {cell(s['total_ms'], 'p95')} | {rate}")
+    print("(latencies in ms)")
+
+
+def wait_until_up(url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return True
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    return False
+
+
+def spawn_stack(args) -> list:
+    """Start fake Ollama + the app; returns the processes to stop afterwards"""
+    processes = []
+    fake = subprocess.Popen([
+        sys.executable, "scripts/fake_ollama.py",
+        "--port", "11434",
+        "--tokens-per-sec", str(args.tokens_per_sec),
+        "--first-token-delay", str(args.first_token_delay),
+        "--prefill-tokens-per-sec", str(args.prefill_tokens_per_sec),
+        "--parallel", str(args.ollama_parallel),
+    ])
+    processes.append(fake)
+    if not wait_until_up("http://127.0.0.1:11434/api/tags", 15):
+        raise RuntimeError("fake Ollama did not start")
+
+    env = dict(os.environ)
+    # Background summary generations would compete with the measured requests
+    env["SUMMARY_PRECOMPUTE_ENABLED"] = "0"
+    if not args.with_cache:
+        env["LLM_CACHE_ENABLED"] = "0"
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", "8000", "--log-level", "warning"],
+        env=env,
+    )
+    processes.append(app)
+    if not wait_until_up(f"{DEFAULT_APP_URL}/openapi.json", 60):
+        raise RuntimeError("app did not start")
+    return processes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-to-first-token benchmark for /chat/stream")
+    parser.add_argument("--url", default=DEFAULT_APP_URL)
+    parser.add_argument("--requests", type=int, default=10, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--subject-id", type=int, default=None)
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the report as JSON")
+    parser.add_argument("--spawn", action="store_true",
+                        help="Start fake Ollama and the app as subprocesses")
+    parser.add_argument("--with-cache", action="store_true",
+                        help="Keep the LLM response cache enabled in the spawned app")
+    parser.add_argument("--tokens-per-sec", type=float, default=20.0)
+    parser.add_argument("--first-token-delay", type=float, default=0.2)
+    parser.add_argument("--prefill-tokens-per-sec", type=float, default=100.0,
+                        help="Fake Ollama prompt evaluation speed (prompt size affects TTFT)")
+    parser.add_argument("--ollama-parallel", type=int, default=1)
+    args = parser.parse_args()
+
+    subject_id = args.subject_id or pick_subject_id()
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    processes = spawn_stack(args) if args.spawn else []
+    try:
+        report = {}
+        for name in names:
+            question = SCENARIOS[name].format(subject_id=subject_id)
+            print(f"▶ {name}: {args.requests} requests, concurrency {args.concurrency} — {question!r}")
+            results = asyncio.run(
+                run_scenario(args.url, question, args.requests, args.concurrency, args.timeout)
+            )
+            report[name] = summarize(results)
+            errors = {r['error'] for r in results if r['error']}
+            if errors:
+                print(f"  ⚠️ errors: {', '.join(sorted(errors))}")
+
+        print_report(report)
+
+        if args.json_path:
+            with open(args.json_path, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"✓ Report saved to {args.json_path}")
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Prompt prefix reuse benchmark
+Compares the LLM_PREFIX_REUSE modes of ai/llm_client.py ('off', 'system',
+'context') on AI summaries and ask_llm calls against the fake Ollama
+server, which charges prompt evaluation per token (--prefill-tokens-per-sec)
+and models Ollama's KV cache as longest-common-prefix reuse per slot.
+
+Since the instructions lead the prompt in every mode, 'off' gets prefix
+reuse as well; what the modes change is mainly the tokenization boundary
+and, for 'system', the Modelfile system prompt being replaced. The fake
+server counts words, not real model tokens, and does not model template
+tokens, so treat the numbers as relative.
+
+Reports per mode the prompt tokens Ollama had to evaluate, the tokens
+reused, the modeled prompt-eval time and the client-side latency.
+
+Run this from the project root:
+    python scripts/benchmark_prompt_prefix.py --requests 20 --prefill-tokens-per-sec 100
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+import time
+sys.path.insert(0, '.')
+
+import numpy as np
+
+import ai.llm_client as llm_client
+from scripts.fake_ollama import serve
+
+MODES = ["off", "system", "context"]
+
+
+def sample_labs(i: int) -> list[dict]:
+    """Distinct findings per request, so nothing is answered from a cache"""
+    return [
+        {'test_name': 'Glucose', 'status': 'CRITICAL', 'value': 300 + i, 'unit': 'mg/dL'},
+        {'test_name': 'Potassium', 'status': 'ABNORMAL', 'value': round(5.5 + i / 100, 2), 'unit': 'mEq/L'},
+    ]
+
+
+def run_mode(mode: str, args) -> dict:
+    server = serve(port=args.port, tokens_per_sec=args.tokens_per_sec,
+                   first_token_delay=args.first_token_delay, num_tokens=args.num_tokens,
+                   prefill_tokens_per_sec=args.prefill_tokens_per_sec)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Point the client at this fake server, without response caching
+    llm_client.OLLAMA_URL_GENERATE = f"http://127.0.0.1:{args.port}/api/generate"
+    llm_client.LLM_CACHE_ENABLED = False
+    llm_client.LLM_PREFIX_REUSE = mode
+    llm_client._prefix_contexts.clear()
+
+    latencies = []
+    try:
+        for i in range(args.requests):
+            start = time.perf_counter()
+            if i % 2 == 0 or not args.mix_ask:
+                llm_client.generate_ai_summary(sample_labs(i))
+            else:
+                llm_client.ask_llm(f"Glucose: {300 + i} mg/dL (CRITICAL)", "What stands out?")
+            latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        server.shutdown()
+        server.server_close()
+        # Pooled keep-alive connections point at the stopped server
+        asyncio.run(llm_client.close_http_clients())
+
+    model = server.model
+    return {
+        'requests': args.requests,
+        'prompt_tokens_evaluated': model.prompt_tokens_evaluated,
+        'prompt_tokens_reused': model.prompt_tokens_reused,
+        'prompt_eval_seconds': round(model.prefill_seconds_total, 2),
+        'latency_ms_p50': round(float(np.percentile(latencies, 50)), 1),
+        'latency_ms_mean': round(float(np.mean(latencies)), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt prefix reuse benchmark (fake Ollama)")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--port", type=int, default=11535)
+    parser.add_argument("--prefill-tokens-per-sec", type=float, default=100.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--first-token-delay", type=float, default=0.0)
+    parser.add_argument("--num-tokens", type=int, default=10)
+    parser.add_argument("--no-ask", dest="mix_ask", action="store_false",
+                        help="Only AI summaries (default alternates with ask_llm)")
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    report = {}
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        print(f"▶ {mode}: {args.requests} requests")
+        report[mode] = run_mode(mode, args)
+
+    baseline = report.get("off")
+    print()
+    print(f"{'mode':<8} {'evaluated':>10} {'reused':>8} {'eval s':>8} {'vs off':>7} | "
+          f"{'p50 ms':>8} {'mean ms':>8}")
+    print("-" * 66)
+    for mode, r in report.items():
+        change = "-"
+        if baseline and baseline['prompt_tokens_evaluated']:
+            change = f"{r['prompt_tokens_evaluated'] / baseline['prompt_tokens_evaluated'] - 1:+.0%}"
+        print(f"{mode:<8} {r['prompt_tokens_evaluated']:>10} {r['prompt_tokens_reused']:>8} "
+              f"{r['prompt_eval_seconds']:>8.2f} {change:>7} | "
+              f"{r['latency_ms_p50']:>8.1f} {r['latency_ms_mean']:>8.1f}")
+
+    print("\nℹ️  Fake server: prefix reuse is longest-common-prefix per slot, including raw "
+          "prompt text;\n   word-level tokens, no chat template. Compare modes relative to each other.")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Report saved to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark: sklearn vs compiled Random Forest inference
+Reports p50/p99 latency for single rows and batches, and checks that
+both paths return the same probabilities.
+Run this from the project root: python scripts/benchmark_risk_inference.py
+"""
+
+import sys
+import time
+sys.path.insert(0, '.')
+
+import numpy as np
+
+from ai.risk_model import load_model
+
+BATCH_SIZES = [1, 16, 128, 1024]
+ITERATIONS = 300
+
+
+def percentiles(samples_ms):
+    return np.percentile(samples_ms, 50), np.percentile(samples_ms, 99)
+
+
+def time_calls(model, scaler, X, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        model.predict_proba(scaler.transform(X))
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
+
+
+def main():
+    model, scaler, feature_cols = load_model(compiled=False)
+    if model is None:
+        print("❌ Model not trained. Run: python scripts/train_model.py")
+        return
+
+    fast_model, fast_scaler, _ = load_model(compiled=True)
+
+    # Synthetic rows around the training distribution
+    rng = np.random.default_rng(42)
+    mean = getattr(scaler, 'mean_', np.zeros(len(feature_cols)))
+    scale = getattr(scaler, 'scale_', np.ones(len(feature_cols)))
+    X_all = mean + rng.normal(size=(max(BATCH_SIZES), len(feature_cols))) * scale
+
+    diff = np.abs(
+        model.predict_proba(scaler.transform(X_all))
+        - fast_model.predict_proba(fast_scaler.transform(X_all))
+    ).max()
+    print(f"Max probability difference (sklearn vs compiled): {diff:.2e}")
+    print()
+
+    print(f"{'batch':>6} | {'sklearn p50':>12} {'p99':>9} | {'compiled p50':>12} {'p99':>9}  (ms)")
+    print("-" * 62)
+    for size in BATCH_SIZES:
+        X = X_all[:size]
+        iterations = max(20, ITERATIONS // max(1, size // 16))
+        sk_p50, sk_p99 = time_calls(model, scaler, X, iterations)
+        fc_p50, fc_p99 = time_calls(fast_model, fast_scaler, X, iterations)
+        print(f"{size:>6} | {sk_p50:>12.3f} {sk_p99:>9.3f} | {fc_p50:>12.3f} {fc_p99:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
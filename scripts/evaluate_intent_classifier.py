@@ -0,0 +1,148 @@
+"""
+Routing accuracy and latency report for the local intent classifier
+(ai/intent_classifier.py).
+
+- accuracy: leave-one-out over the seed set (chatbot_questions.txt plus
+  the built-in seeds); each question is classified by centroids built
+  without it
+- coverage: share of questions above the confidence threshold, i.e. that
+  skip the LLM, and the accuracy among those
+- latency: end-to-end predict() (embedding included) per question
+- --with-llm: the same questions through the LLM classifier, for comparison
+  (needs Ollama)
+
+Run this from the project root:
+    python scripts/evaluate_intent_classifier.py
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+sys.path.insert(0, '.')
+
+import numpy as np
+
+from ai.intent_classifier import INTENTS, IntentClassifier, _embed, seed_examples
+
+
+def leave_one_out(examples, threshold: float, temperature: float) -> list[dict]:
+    vectors = _embed([q for q, _ in examples])
+    labels = [intent for _, intent in examples]
+
+    rows = []
+    for i, (question, expected) in enumerate(examples):
+        keep = [j for j in range(len(examples)) if j != i]
+        classifier = IntentClassifier(threshold, temperature)
+        classifier.fit_vectors(vectors[keep], [labels[j] for j in keep])
+        scores = classifier.scores_vector(vectors[i])
+        predicted = max(scores, key=scores.get)
+        rows.append({
+            'question': question,
+            'expected': expected,
+            'predicted': predicted,
+            'confidence': round(scores[predicted], 3),
+            'confident': scores[predicted] >= threshold,
+        })
+    return rows
+
+
+def measure_latency(examples, threshold: float, temperature: float) -> list[float]:
+    classifier = IntentClassifier(threshold, temperature).fit(examples)
+    classifier.predict("warm-up")
+    latencies = []
+    for question, _ in examples:
+        start = time.perf_counter()
+        classifier.predict(question)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def measure_llm(examples) -> dict:
+    from ai.agent import _llm_intent
+
+    async def run():
+        correct, latencies = 0, []
+        for question, expected in examples:
+            start = time.perf_counter()
+            data = await _llm_intent(question)
+            latencies.append((time.perf_counter() - start) * 1000)
+            correct += data.get("intent") == expected
+        return correct, latencies
+
+    correct, latencies = asyncio.run(run())
+    return {
+        'accuracy': round(correct / len(examples), 3),
+        'latency_ms_p50': round(float(np.percentile(latencies, 50)), 1),
+        'latency_ms_p95': round(float(np.percentile(latencies, 95)), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Intent classifier accuracy / latency report")
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--temperature", type=float, default=None)
+    parser.add_argument("--with-llm", action="store_true", help="Also time the LLM classifier")
+    parser.add_argument("--show-errors", action="store_true")
+    parser.add_argument("--json", dest="json_path", default=None)
+    args = parser.parse_args()
+
+    defaults = IntentClassifier()
+    threshold = args.threshold if args.threshold is not None else defaults.threshold
+    temperature = args.temperature if args.temperature is not None else defaults.temperature
+
+    examples = seed_examples()
+    rows = leave_one_out(examples, threshold, temperature)
+    latencies = measure_latency(examples, threshold, temperature)
+
+    confident = [r for r in rows if r['confident']]
+    report = {
+        'examples': len(rows),
+        'threshold': threshold,
+        'accuracy': round(np.mean([r['predicted'] == r['expected'] for r in rows]), 3),
+        'coverage': round(len(confident) / len(rows), 3),
+        'confident_accuracy': (
+            round(np.mean([r['predicted'] == r['expected'] for r in confident]), 3) if confident else None
+        ),
+        'per_intent': {},
+        'latency_ms_p50': round(float(np.percentile(latencies, 50)), 2),
+        'latency_ms_p95': round(float(np.percentile(latencies, 95)), 2),
+    }
+    for intent in INTENTS:
+        subset = [r for r in rows if r['expected'] == intent]
+        if subset:
+            report['per_intent'][intent] = {
+                'examples': len(subset),
+                'accuracy': round(np.mean([r['predicted'] == intent for r in subset]), 3),
+            }
+    if args.with_llm:
+        report['llm'] = measure_llm(examples)
+
+    print(f"\nIntent classifier ({report['examples']} seed questions, leave-one-out)")
+    print(f"  accuracy            {report['accuracy']:.1%}")
+    print(f"  coverage ≥ {threshold:<8g} {report['coverage']:.1%} (rest falls back to the LLM)")
+    if report['confident_accuracy'] is not None:
+        print(f"  accuracy when sure  {report['confident_accuracy']:.1%}")
+    print(f"  latency p50 / p95   {report['latency_ms_p50']:.1f} / {report['latency_ms_p95']:.1f} ms")
+    for intent, r in report['per_intent'].items():
+        print(f"  {intent:<12} {r['accuracy']:>7.1%}  ({r['examples']} examples)")
+    if 'llm' in report:
+        llm = report['llm']
+        print(f"  LLM classifier      {llm['accuracy']:.1%}, "
+              f"p50 {llm['latency_ms_p50']:.0f} ms / p95 {llm['latency_ms_p95']:.0f} ms")
+
+    if args.show_errors:
+        print()
+        for r in rows:
+            if r['predicted'] != r['expected']:
+                print(f"  ✗ {r['expected']:>11} → {r['predicted']:<11} ({r['confidence']:.2f}) {r['question']}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({**report, 'rows': rows}, f, indent=2)
+        print(f"✓ Report saved to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Fake Ollama server for benchmarks and local development
+Implements the parts of the Ollama HTTP API this app uses:
+
+- POST /api/generate  (streaming NDJSON and non-streaming JSON)
+- GET  /api/tags
+
+Generation is simulated with a configurable time-to-first-token and token
+rate, so chat latency can be measured without a real model. With
+--prefill-tokens-per-sec, time-to-first-token also grows with the prompt
+size (one fake token per word, digit or symbol), as prompt evaluation does on CPU. Like Ollama,
+the model is "loaded" on first use (--load-delay) and stays loaded for
+keep_alive (request field, default 5m); a generate call with an empty
+prompt only loads the model.
+
+Prompt prefix reuse is modeled like Ollama's KV cache: each of the
+--parallel slots keeps the token sequence it last evaluated (system
+prompt, then 'context' ids, then the prompt), and a request only pays for
+the tokens after the longest prefix it shares with one of them. That
+applies to raw prompt text as well, so a fixed instruction block at the
+start of every prompt is reused without any 'system' or 'context' field.
+prompt_eval_count only counts evaluated tokens, as in Ollama.
+
+Run this from the project root:
+    python scripts/fake_ollama.py --port 11434 --tokens-per-sec 20
+"""
+
+import argparse
+import json
+import re
+import threading
+import sys
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.insert(0, '.')
+
+DEFAULT_MODEL = "tinyllama:latest"
+DEFAULT_KEEP_ALIVE = 300.0
+
+VOCABULARY = (
+    "The laboratory values show some results outside the expected reference "
+    "range. These findings may warrant clinical review by a healthcare "
+    "professional, who can interpret them together with the patient history."
+).split()
+
+
+def parse_keep_alive(value) -> float:
+    """Ollama accepts seconds (number) or a duration string like '5m' / '1h' / '30s'"""
+    if value is None:
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)?", str(value).strip())
+    if not match:
+        return DEFAULT_KEEP_ALIVE
+    number, unit = float(match.group(1)), match.group(2) or "s"
+    return number * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+
+
+def _common_prefix(a: list, b: list) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class FakeModel:
+    """Load state and timing of the simulated model"""
+
+    def __init__(self, name, tokens_per_sec, first_token_delay, load_delay, num_tokens, parallel,
+                 prefill_tokens_per_sec=0.0):
+        self.name = name
+        self.tokens_per_sec = tokens_per_sec
+        self.first_token_delay = first_token_delay
+        self.prefill_tokens_per_sec = prefill_tokens_per_sec
+        self.load_delay = load_delay
+        self.num_tokens = num_tokens
+        self._lock = threading.Lock()
+        # Like OLLAMA_NUM_PARALLEL: extra requests wait for a free slot
+        self.slots = threading.BoundedSemaphore(parallel)
+        self._loaded_until = 0.0
+        self._kv_cache = deque(maxlen=parallel)  # token sequences held by the slots since the last load
+        self.requests = 0
+        self.loads = 0
+        self.prompt_tokens_evaluated = 0
+        self.prompt_tokens_reused = 0
+        self.prefill_seconds_total = 0.0
+
+    def ensure_loaded(self, keep_alive: float) -> float:
+        """Returns the load time spent (0 if the model was still loaded)"""
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            spent = 0.0
+            if now >= self._loaded_until:
+                time.sleep(self.load_delay)
+                spent = self.load_delay
+                self.loads += 1
+                self._kv_cache.clear()
+            # keep_alive < 0 keeps the model loaded indefinitely
+            self._loaded_until = float("inf") if keep_alive < 0 else time.monotonic() + keep_alive
+            return spent
+
+    def prefill_seconds(self, prompt_tokens: int) -> float:
+        prefill = prompt_tokens / self.prefill_tokens_per_sec if self.prefill_tokens_per_sec > 0 else 0.0
+        return self.first_token_delay + prefill
+
+    def evaluate(self, system: str, context: list, prompt: str) -> int:
+        """Prompt tokens that need evaluation; the longest cached prefix is free"""
+        sequence = self.context_ids(system) + list(context or ()) + self.context_ids(prompt)
+        with self._lock:
+            reused = max((_common_prefix(sequence, cached) for cached in self._kv_cache), default=0)
+            # Keep the full sequence in the slot that matched best, or the oldest one
+            for cached in self._kv_cache:
+                if _common_prefix(sequence, cached) == reused and reused:
+                    self._kv_cache.remove(cached)
+                    break
+            self._kv_cache.append(sequence)
+            tokens = len(sequence) - reused
+            self.prompt_tokens_reused += reused
+            self.prompt_tokens_evaluated += tokens
+            self.prefill_seconds_total += self.prefill_seconds(tokens) - self.first_token_delay
+        return tokens
+
+    @staticmethod
+    def context_ids(*texts) -> list:
+        """Fake token ids of the evaluated conversation (returned as 'context')"""
+        pieces = (p for text in texts for p in re.findall(r"[A-Za-z]+|\d|[^\sA-Za-z\d]", text or ""))
+        return [zlib.crc32(piece.encode("utf-8")) for piece in pieces]
+
+    def tokens(self, prompt: str, num_predict: int = None):
+        # num_predict 0 only evaluates the prompt; None / negative means no limit
+        count = self.num_tokens if num_predict is None or num_predict < 0 else min(self.num_tokens, num_predict)
+        # Deterministic per prompt, so repeated prompts give repeated answers
+        offset = sum(prompt.encode("utf-8")) % len(VOCABULARY)
+        for i in range(count):
+            word = VOCABULARY[(offset + i) % len(VOCABULARY)]
+            yield word if i == 0 else " " + word
+
+
+def make_handler(model: FakeModel):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, chunked streaming
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _write_chunk(self, body: dict):
+            data = (json.dumps(body) + "\n").encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._send_json(200, {"models": [{
+                    "name": model.name,
+                    "model": model.name,
+                    "modified_at": datetime.now(timezone.utc).isoformat(),
+                    "size": 637700138,
+                    "details": {"family": "llama", "parameter_size": "1B"},
+                }]})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except json.JSONDecodeError:
+                self._send_json(400, {"error": "invalid JSON"})
+                return
+
+            if self.path == "/api/generate":
+                self._generate(body)
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def _generate(self, body: dict):
+            start = time.perf_counter()
+            load_seconds = model.ensure_loaded(parse_keep_alive(body.get("keep_alive")))
+            prompt = body.get("prompt") or ""
+            system = body.get("system") or ""
+            context = body.get("context") or []
+            stream = body.get("stream", True)
+
+            # Empty prompt: load the model only
+            if not prompt:
+                prompt_tokens = 0
+            else:
+                prompt_tokens = model.evaluate(system, context, prompt)
+
+            def final(count, text=""):
+                total = time.perf_counter() - start
+                return {
+                    "model": body.get("model", model.name),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "response": "",
+                    "done": True,
+                    "done_reason": "stop" if prompt else "load",
+                    "total_duration": int(total * 1e9),
+                    "load_duration": int(load_seconds * 1e9),
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": int(model.prefill_seconds(prompt_tokens) * 1e9),
+                    "eval_count": count,
+                    "context": list(context) + model.context_ids(system, prompt, text),
+                }
+
+            if not prompt:
+                self._send_json(200, final(0))
+                return
+
+            with model.slots:
+                self._generate_tokens(body, prompt, prompt_tokens, stream, final)
+
+        def _generate_tokens(self, body: dict, prompt: str, prompt_tokens: int, stream: bool, final):
+            num_predict = (body.get("options") or {}).get("num_predict")
+            delay = 1.0 / model.tokens_per_sec if model.tokens_per_sec > 0 else 0.0
+            time.sleep(model.prefill_seconds(prompt_tokens))
+
+            if not stream:
+                words = list(model.tokens(prompt, num_predict))
+                time.sleep(delay * len(words))
+                text = "".join(words)
+                self._send_json(200, {**final(len(words), text), "response": text})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            words = []
+            try:
+                for i, word in enumerate(model.tokens(prompt, num_predict)):
+                    if i:
+                        time.sleep(delay)
+                    self._write_chunk({
+                        "model": body.get("model", model.name),
+                        "response": word,
+                        "done": False,
+                    })
+                    words.append(word)
+                self._write_chunk(final(len(words), "".join(words)))
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # Client went away mid-stream (cancelled request)
+                self.close_connection = True
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1",
+          port: int = 11434,
+          tokens_per_sec: float = 20.0,
+          first_token_delay: float = 0.2,
+          load_delay: float = 0.0,
+          startup_delay: float = 0.0,
+          num_tokens: int = 40,
+          parallel: int = 1,
+          model_name: str = DEFAULT_MODEL,
+          prefill_tokens_per_sec: float = 0.0) -> ThreadingHTTPServer:
+    """Create the server (after startup_delay); call serve_forever() on it"""
+    time.sleep(startup_delay)
+    model = FakeModel(model_name, tokens_per_sec, first_token_delay, load_delay, num_tokens, parallel,
+                      prefill_tokens_per_sec)
+    server = ThreadingHTTPServer((host, port), make_handler(model))
+    server.daemon_threads = True
+    server.model = model
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server for latency benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens-per-sec", type=float, default=20.0,
+                        help="Generation speed after the first token")
+    parser.add_argument("--first-token-delay", type=float, default=0.2,
+                        help="Prompt evaluation time before the first token (s)")
+    parser.add_argument("--prefill-tokens-per-sec", type=float, default=0.0,
+                        help="Prompt evaluation speed; 0 = TTFT independent of prompt size")
+    parser.add_argument("--load-delay", type=float, default=0.0,
+                        help="Model load time on first use / after keep_alive expired (s)")
+    parser.add_argument("--startup-delay", type=float, default=0.0,
+                        help="Delay before the server starts listening (s)")
+    parser.add_argument("--num-tokens", type=int, default=40,
+                        help="Tokens per answer (capped by options.num_predict)")
+    parser.add_argument("--parallel", type=int, default=1,
+                        help="Concurrent generations (like OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.tokens_per_sec, args.first_token_delay,
+                   args.load_delay, args.startup_delay, args.num_tokens, args.parallel,
+                   args.model, args.prefill_tokens_per_sec)
+    print(f"🦙 Fake Ollama listening on http://{args.host}:{args.port} "
+          f"({args.tokens_per_sec:g} tok/s, first token {args.first_token_delay:g}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Precompute AI summaries for patients with unreviewed CRITICAL labs
+    python scripts/precompute_summaries.py --once             # single pass (e.g. from cron)
+    python scripts/precompute_summaries.py --concurrency 2    # loop every SUMMARY_PRECOMPUTE_INTERVAL_SECONDS
+
+Summaries go to the shared summary cache, so the API serves them directly.
+Only one precompute process runs at a time (SUMMARY_PRECOMPUTE_LOCK_PATH).
+An interrupted pass resumes where it stopped (see app/services/summary_precompute.py).
+"""
+
+import argparse
+import sys
+import time
+sys.path.insert(0, '.')
+
+from app.services.summary_precompute import (
+    SUMMARY_PRECOMPUTE_CONCURRENCY,
+    SUMMARY_PRECOMPUTE_INTERVAL_SECONDS,
+    SUMMARY_PRECOMPUTE_MAX_PATIENTS,
+    SummaryPrecomputer,
+)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="AI summary precompute worker")
+    parser.add_argument("--once", action="store_true", help="run a single pass, then exit")
+    parser.add_argument("--concurrency", type=int, default=SUMMARY_PRECOMPUTE_CONCURRENCY)
+    parser.add_argument("--max-patients", type=int, default=SUMMARY_PRECOMPUTE_MAX_PATIENTS,
+                        help="patients per pass (0 = all)")
+    parser.add_argument("--interval", type=float, default=SUMMARY_PRECOMPUTE_INTERVAL_SECONDS,
+                        help="seconds between passes")
+    args = parser.parse_args()
+
+    precomputer = SummaryPrecomputer(args.concurrency, args.interval, args.max_patients)
+    if not precomputer.acquire_leader():
+        print("⚠️ Another process is already precomputing AI summaries; exiting")
+        sys.exit(1)
+
+    if args.once:
+        precomputer.run_once()
+    else:
+        while True:
+            precomputer.run_once()
+            time.sleep(args.interval)
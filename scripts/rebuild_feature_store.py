@@ -0,0 +1,15 @@
+"""
+Script to backfill the patient feature store from lab_interpretations
+Run this from the project root: python scripts/rebuild_feature_store.py
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from database.models import create_tables
+from database.feature_store import rebuild_feature_store
+
+if __name__ == '__main__':
+    create_tables()
+    count = rebuild_feature_store()
+    print(f"✅ Feature store rebuilt for {count} patients")
@@ -0,0 +1,33 @@
+"""
+Background retraining worker for the risk model
+Runs alongside the API server as its own process:
+    python scripts/retrain_worker.py          # loop on schedule / ingestion volume
+    python scripts/retrain_worker.py --once   # single check (e.g. from cron)
+
+Schedule and validation gates are configured through RETRAIN_* environment
+variables (see ai/retraining.py).
+"""
+
+import argparse
+import sys
+sys.path.insert(0, '.')
+
+from ai.retraining import run_retraining_loop
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Risk model retraining worker")
+    parser.add_argument("--once", action="store_true", help="check and retrain at most once, then exit")
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help="stream training data in chunks of this many rows")
+    parser.add_argument("--max-per-class", type=int, default=None,
+                        help="stratified sample of at most this many patients per risk class")
+    args = parser.parse_args()
+
+    run_retraining_loop(
+        data_options={
+            'chunk_rows': args.chunk_rows,
+            'max_patients_per_class': args.max_per_class,
+        },
+        once=args.once,
+    )
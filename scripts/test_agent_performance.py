@@ -1,10 +1,11 @@
 """
 Test to measure the actual time spent in each node of the agent graph
 """
+import asyncio
 import time
 from ai.agent import app as agent_app
 
-def test_agent_performance():
+async def test_agent_performance():
     question = "What is glucose?"
     state = {
         "question": question,
@@ -19,7 +20,7 @@ def test_agent_performance():
     
     start = time.time()
     
-    for event in agent_app.stream(state):
+    async for event in agent_app.astream(state):
         for node_name, output in event.items():
             elapsed = time.time() - start
             print(f"[{elapsed:.1f}s] Node '{node_name}' completed")
@@ -39,4 +40,4 @@ def test_agent_performance():
     print(f"Total graph execution time: {total:.1f}s")
 
 if __name__ == "__main__":
-    test_agent_performance()
+    asyncio.run(test_agent_performance())
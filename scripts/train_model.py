@@ -1,18 +1,68 @@
 """
 Script to train the risk prediction model
 Run this from the project root: python scripts/train_model.py
+
+Hyperparameter search mode (process pool + cross-validation):
+    python scripts/train_model.py --search [--latency-budget-ms 2.0]
+        [--cv 5] [--workers N] [--grid grid.json]
+
+Out-of-core / sampled training data (works with both modes):
+    python scripts/train_model.py --chunk-rows 500000 [--max-per-class 20000]
 """
 
+import argparse
+import json
 import sys
 sys.path.insert(0, '.')
 
 from ai.risk_model import train_risk_model
 
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the patient risk model")
+    parser.add_argument("--search", action="store_true",
+                        help="run a hyperparameter grid search instead of a single fit")
+    parser.add_argument("--grid", help="JSON file mapping parameter names to value lists")
+    parser.add_argument("--cv", type=int, default=5, help="cross-validation folds")
+    parser.add_argument("--workers", type=int, default=None, help="search worker processes")
+    parser.add_argument("--latency-budget-ms", type=float, default=None,
+                        help="max single-row p99 inference latency for the saved model")
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help="stream training data in chunks of this many rows")
+    parser.add_argument("--max-per-class", type=int, default=None,
+                        help="stratified sample of at most this many patients per risk class")
+    return parser.parse_args()
+
+
 if __name__ == '__main__':
+    args = parse_args()
+    data_options = {
+        'chunk_rows': args.chunk_rows,
+        'max_patients_per_class': args.max_per_class,
+    }
+
     print("=" * 50)
     print("PATIENT RISK PREDICTION MODEL TRAINING")
     print("=" * 50)
-    success = train_risk_model()
+
+    if args.search:
+        from ai.model_search import search_risk_model, DEFAULT_LATENCY_BUDGET_MS
+
+        param_grid = None
+        if args.grid:
+            with open(args.grid) as f:
+                param_grid = json.load(f)
+
+        success = search_risk_model(
+            param_grid=param_grid,
+            cv_folds=args.cv,
+            max_workers=args.workers,
+            latency_budget_ms=args.latency_budget_ms or DEFAULT_LATENCY_BUDGET_MS,
+            data_options=data_options,
+        ) is not None
+    else:
+        success = train_risk_model(**data_options)
+
     print("=" * 50)
     if success:
         print("✅ Model training completed successfully!")
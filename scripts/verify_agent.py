@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 
@@ -8,7 +9,8 @@ from ai.agent import app as agent_app
 
 def test_query(question):
     print(f"\n--- Testing Query: '{question}' ---")
-    state = agent_app.invoke({"question": question})
+    # Graph nodes are async, so the graph must be run with ainvoke/astream
+    state = asyncio.run(agent_app.ainvoke({"question": question}))
     print(f"Intent identified: {state.get('intent')}")
     print(f"Entities: {state.get('entities')}")
     print(f"Context found: {len(state.get('context', []))} chunks")
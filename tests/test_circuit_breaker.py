@@ -0,0 +1,143 @@
+import pytest
+import requests
+
+from ai import circuit_breaker
+from ai.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LLMUnavailable
+from ai.llm_client import is_backend_failure
+from ai.llm_scheduler import LLMQueueTimeout
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure(ConnectionError("refused"))
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown_seconds=30)
+
+    breaker.record_failure(ConnectionError("refused"))
+    breaker.record_failure(ConnectionError("refused"))
+    breaker.record_success()  # resets the streak
+    breaker.record_failure(ConnectionError("refused"))
+    breaker.record_failure(ConnectionError("refused"))
+    assert breaker.state == CLOSED
+
+    breaker.record_failure(ConnectionError("refused"))
+    assert breaker.state == OPEN
+    assert breaker.opens == 1
+
+
+def test_open_circuit_rejects_until_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=30)
+    _open(breaker)
+
+    with pytest.raises(LLMUnavailable):
+        breaker.check()
+    with pytest.raises(LLMUnavailable):
+        breaker.before_call()
+    assert breaker.rejected == 2
+
+    clock.now += 30
+    breaker.check()
+    assert breaker.stats()['retry_in_seconds'] == 0
+
+
+def test_half_open_allows_a_single_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=30)
+    _open(breaker)
+    clock.now += 31
+
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(LLMUnavailable):
+        breaker.check()
+    with pytest.raises(LLMUnavailable):
+        breaker.before_call()
+
+
+def test_trial_success_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=30)
+    _open(breaker)
+    clock.now += 31
+
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_trial_failure_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown_seconds=30)
+    _open(breaker)
+    clock.now += 31
+
+    breaker.before_call()
+    breaker.record_failure(ConnectionError("still refused"))
+    assert breaker.state == OPEN
+    assert breaker.opens == 2
+    with pytest.raises(LLMUnavailable):
+        breaker.before_call()
+    assert [t['to'] for t in breaker.stats()['transitions']] == [OPEN, HALF_OPEN, OPEN]
+
+
+def test_guard_releases_the_trial_on_non_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=30)
+    _open(breaker)
+    clock.now += 31
+
+    with pytest.raises(ValueError):
+        with breaker.guard(is_failure=lambda e: False):
+            raise ValueError("bad request")
+    assert breaker.state == HALF_OPEN
+    assert breaker.failures == 1
+
+    # The trial slot is free again, and a success closes the circuit
+    with breaker.guard():
+        pass
+    assert breaker.state == CLOSED
+
+
+def test_guard_records_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=30)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            with breaker.guard():
+                raise ConnectionError("refused")
+    assert breaker.state == OPEN
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+@pytest.mark.parametrize("error, counted", [
+    (requests.ConnectionError("refused"), True),
+    (requests.Timeout("read timed out"), True),
+    (_http_error(503), True),
+    (_http_error(500), True),
+    (_http_error(404), False),
+    (_http_error(400), False),
+    (LLMQueueTimeout("queued too long"), False),
+    (ValueError("parse error"), False),
+])
+def test_backend_failure_classification(error, counted):
+    assert is_backend_failure(error) is counted
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from ai.compiled_forest import compile_model
+
+
+def _fitted(n_classes, **params):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 6)) * [1, 10, 100, 0.1, 5, 1]
+    y = (X[:, 0] + X[:, 1] / 10 > 0).astype(int) + (n_classes > 2) * (X[:, 2] > 50)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(random_state=0, **params).fit(scaler.transform(X), y)
+    return model, scaler, rng.normal(size=(200, 6)) * [1, 10, 100, 0.1, 5, 1]
+
+
+@pytest.mark.parametrize("n_classes, params", [
+    (2, {'n_estimators': 25, 'max_depth': 6}),
+    (2, {'n_estimators': 10}),  # unbounded depth, uneven trees
+    (3, {'n_estimators': 15, 'max_depth': 10, 'min_samples_split': 5}),
+])
+def test_matches_sklearn(n_classes, params):
+    model, scaler, X = _fitted(n_classes, **params)
+    compiled_model, compiled_scaler = compile_model(model, scaler)
+
+    np.testing.assert_allclose(compiled_scaler.transform(X), scaler.transform(X))
+    expected = model.predict_proba(scaler.transform(X))
+    np.testing.assert_allclose(compiled_model.predict_proba(compiled_scaler.transform(X)), expected)
+    np.testing.assert_array_equal(compiled_model.predict(compiled_scaler.transform(X)),
+                                  model.predict(scaler.transform(X)))
+
+
+def test_single_row():
+    model, scaler, X = _fitted(2, n_estimators=10, max_depth=6)
+    compiled_model, compiled_scaler = compile_model(model, scaler)
+
+    row = compiled_scaler.transform(X[:1])
+    np.testing.assert_allclose(compiled_model.predict_proba(row),
+                               model.predict_proba(scaler.transform(X[:1])))
+
+
+def test_unsupported_model():
+    X = np.random.default_rng(0).normal(size=(50, 3))
+    model = LogisticRegression().fit(X, X[:, 0] > 0)
+
+    assert compile_model(model, StandardScaler().fit(X)) == (None, None)
@@ -0,0 +1,63 @@
+import pytest
+
+from ai.entity_extractor import canonical_test, extract_entities
+
+
+@pytest.mark.parametrize("question", [
+    "risk for patient 10014354",
+    "risk for p10014354",
+    "patient#10014354 risk",
+    "subject_id=10014354",
+])
+def test_subject_id(question):
+    assert extract_entities(question)["subject_id"] == "10014354"
+
+
+def test_standalone_id_wins_over_glued_digits():
+    assert extract_entities("order a123456789 for patient 10014354")["subject_id"] == "10014354"
+
+
+def test_short_numbers_are_not_subject_ids():
+    assert "subject_id" not in extract_entities("patient 42, glucose 140 mg/dL")
+
+
+def test_longest_test_match():
+    assert extract_entities("red blood cells for 10000032")["tests"] == ["RBC"]
+
+
+@pytest.mark.parametrize("question, test", [
+    ("any hgbs?", "Hemoglobin"),
+    ("white blood cells", "WBC"),
+    ("Blood sugar trend", "Glucose"),
+    ("platelets", "Platelets"),
+])
+def test_aliases_and_plurals(question, test):
+    assert extract_entities(question)["test_name"] == test
+
+
+def test_every_test_in_order_of_mention():
+    entities = extract_entities("how many glucose and potassium and glucose results")
+
+    assert entities["test_name"] == "Glucose"
+    assert entities["tests"] == ["Glucose", "Potassium"]
+
+
+@pytest.mark.parametrize("question, status", [
+    ("abnormal results", "ABNORMAL"),
+    ("normal results", "NORMAL"),
+    ("normal or abnormal", "ABNORMAL"),
+    ("critically low potassium, otherwise abnormal", "CRITICAL"),
+])
+def test_most_severe_status(question, status):
+    assert extract_entities(question)["status"] == status
+
+
+def test_nothing_found():
+    assert extract_entities("hello there") == {}
+    assert extract_entities("") == {}
+
+
+def test_canonical_test():
+    assert canonical_test("hemoglobin level") == "Hemoglobin"
+    assert canonical_test("nonsense") is None
+    assert canonical_test(None) is None
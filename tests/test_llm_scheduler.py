@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from ai.llm_scheduler import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_CLASSIFICATION,
+    PRIORITY_INTERACTIVE,
+    LLMQueueTimeout,
+    LLMScheduler,
+    deadline_in,
+)
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def _admission_order(scheduler, requests, promote=None):
+    """Queue requests [(name, priority, key)] behind a held slot; names in admission order"""
+    order = []
+
+    async def request(name, priority, key):
+        async with scheduler.slot(priority, key=key):
+            order.append(name)
+
+    await scheduler.acquire(PRIORITY_INTERACTIVE)
+    tasks = []
+    for name, priority, key in requests:
+        tasks.append(asyncio.create_task(request(name, priority, key)))
+        await _settle()
+    if promote:
+        scheduler.promote(*promote)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_priority_order_fifo_within_priority():
+    scheduler = LLMScheduler(max_concurrency=1, queue_timeouts={})
+    order = asyncio.run(_admission_order(scheduler, [
+        ("summary", PRIORITY_BACKGROUND, None),
+        ("intent", PRIORITY_CLASSIFICATION, None),
+        ("chat-1", PRIORITY_INTERACTIVE, None),
+        ("chat-2", PRIORITY_INTERACTIVE, None),
+    ]))
+
+    assert order == ["chat-1", "chat-2", "intent", "summary"]
+    assert scheduler.stats()['active'] == 0
+
+
+def test_promote_moves_a_queued_request_up():
+    scheduler = LLMScheduler(max_concurrency=1, queue_timeouts={})
+    order = asyncio.run(_admission_order(scheduler, [
+        ("intent", PRIORITY_CLASSIFICATION, None),
+        ("summary", PRIORITY_BACKGROUND, "summary:p1"),
+    ], promote=("summary:p1", PRIORITY_INTERACTIVE)))
+
+    assert order == ["summary", "intent"]
+    assert scheduler.promoted == 1
+
+
+def test_sync_waiter_times_out():
+    scheduler = LLMScheduler(max_concurrency=1, queue_timeouts={})
+    scheduler.acquire_sync()
+
+    with pytest.raises(LLMQueueTimeout):
+        scheduler.acquire_sync(PRIORITY_BACKGROUND, deadline=deadline_in(0.05))
+
+    stats = scheduler.stats()
+    assert stats['priorities']['background']['timed_out'] == 1
+    assert stats['queue_depth'] == 0
+
+    # The abandoned waiter does not take the freed slot
+    scheduler.release()
+    with scheduler.slot_sync(PRIORITY_BACKGROUND, deadline=deadline_in(0.05)):
+        assert scheduler.stats()['active'] == 1
+
+
+def test_async_waiter_times_out_with_default_queue_timeout():
+    scheduler = LLMScheduler(max_concurrency=1, queue_timeouts={PRIORITY_INTERACTIVE: 0.05})
+
+    async def run():
+        await scheduler.acquire(PRIORITY_BACKGROUND)
+        with pytest.raises(LLMQueueTimeout):
+            await scheduler.acquire(PRIORITY_INTERACTIVE)
+        scheduler.release()
+
+    asyncio.run(run())
+    stats = scheduler.stats()
+    assert stats['priorities']['interactive']['timed_out'] == 1
+    assert stats['active'] == 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    scheduler = LLMScheduler(max_concurrency=1, queue_timeouts={})
+
+    async def run():
+        await scheduler.acquire()
+        waiter = asyncio.create_task(scheduler.acquire(PRIORITY_CLASSIFICATION))
+        await _settle()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        scheduler.release()
+
+    asyncio.run(run())
+    stats = scheduler.stats()
+    assert stats['priorities']['classification']['cancelled'] == 1
+    assert stats['queue_depth'] == 0
+    assert stats['active'] == 0
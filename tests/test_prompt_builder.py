@@ -0,0 +1,81 @@
+from ai.prompt_builder import build_prompt, select_context
+
+
+PATIENT_1 = (
+    "Clinical Report for Patient 111111 (M):\n"
+    "Summary of this section: 1 CRITICAL, 0 ABNORMAL results.\n"
+    "------------------------------\n"
+    "- Sodium: 140 mEq/L (NORMAL) - Reason: Within range\n"
+    "- Glucose: 300 mg/dL (CRITICAL) - Reason: Above critical max"
+)
+PATIENT_2 = (
+    "Clinical Report for Patient 222222 (F):\n"
+    "- Sodium: 170 mEq/L (CRITICAL) - Reason: Above critical max"
+)
+
+
+def _owner(lines: list[str], result_prefix: str) -> str:
+    """Heading that a result line is listed under"""
+    heading = None
+    for line in lines:
+        if line.startswith("Clinical Report"):
+            heading = line
+        elif line.startswith(result_prefix):
+            return heading
+    raise AssertionError(f"{result_prefix} not selected")
+
+
+def test_results_stay_under_their_patient():
+    lines = select_context([PATIENT_1, PATIENT_2], 1000)['lines']
+
+    assert "111111" in _owner(lines, "- Glucose")
+    assert "222222" in _owner(lines, "- Sodium: 170")
+    assert "111111" in _owner(lines, "- Sodium: 140")
+
+
+def test_lines_ranked_within_a_patient():
+    lines = select_context([PATIENT_1], 1000)['lines']
+
+    assert lines[0].startswith("Clinical Report for Patient 111111")
+    assert lines[1].startswith("- Glucose")  # CRITICAL before NORMAL
+    assert lines[2].startswith("- Sodium")
+
+
+def test_chunks_of_one_patient_share_one_heading():
+    second_chunk = (
+        "Clinical Report for Patient 111111 (M):\n"
+        "- Glucose: 300 mg/dL (CRITICAL) - Reason: Above critical max\n"
+        "- Potassium: 5.5 mEq/L (ABNORMAL) - Reason: Above max"
+    )
+    result = select_context([PATIENT_1, PATIENT_2, second_chunk], 1000)
+    lines = result['lines']
+
+    assert sum(line.startswith("Clinical Report for Patient 111111") for line in lines) == 1
+    assert "111111" in _owner(lines, "- Potassium")
+    assert result['duplicates'] == 1
+
+
+def test_identical_results_of_different_patients_are_kept():
+    other = PATIENT_1.replace("111111", "333333")
+    lines = select_context([PATIENT_1, other], 1000)['lines']
+
+    assert sum(line.startswith("- Glucose") for line in lines) == 2
+
+
+def test_budget_drops_low_priority_lines_not_headings():
+    result = select_context([PATIENT_1, PATIENT_2], 40)
+
+    assert result['tokens'] <= 40
+    assert result['dropped'] > 0
+    assert not any("NORMAL)" in line and "ABNORMAL" not in line for line in result['lines'])
+    for line in result['lines']:
+        if line.startswith("- "):
+            assert _owner(result['lines'], line) is not None
+
+
+def test_build_prompt_respects_budget():
+    template = "Context:\n{context}\nQuestion: {question}"
+    built = build_prompt("rag", template, [PATIENT_1, PATIENT_2] * 20, budget=80, question="Any critical?")
+
+    assert built['prompt_tokens'] <= 80
+    assert built['dropped_lines'] > 0
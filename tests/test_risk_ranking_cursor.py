@@ -0,0 +1,28 @@
+import base64
+
+import pytest
+
+from app.services.risk_service import _decode_cursor, _encode_cursor
+
+
+def test_cursor_round_trip():
+    row = {'prob_critical': 87.25, 'subject_id': 10014354}
+
+    assert _decode_cursor(_encode_cursor(row)) == (87.25, 10014354)
+
+
+def test_cursor_is_url_safe():
+    cursor = _encode_cursor({'prob_critical': 99.99, 'subject_id': 10000001})
+
+    assert set(cursor) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    base64.urlsafe_b64encode(b"[1, 2, 3]").decode(),
+    base64.urlsafe_b64encode(b'{"prob_critical": 1}').decode(),
+    base64.urlsafe_b64encode(b'["high", 10014354]').decode(),
+])
+def test_bad_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        _decode_cursor(cursor)
@@ -0,0 +1,34 @@
+import numpy as np
+
+from ai.risk_model import HOLDOUT_SCHEME, holdout_scheme, is_holdout_subject, split_training_data
+
+
+def test_holdout_patients_never_reach_training():
+    subject_ids = np.arange(10000000, 10000500)
+    X = subject_ids.reshape(-1, 1).astype(float)
+    y = subject_ids % 3
+
+    X_train, X_test, _, _ = split_training_data(X, y, subject_ids)
+
+    assert len(X_test) > 0 and len(X_train) > 0
+    assert all(is_holdout_subject(s) for s in X_test[:, 0])
+    assert not any(is_holdout_subject(s) for s in X_train[:, 0])
+    assert holdout_scheme(subject_ids) == HOLDOUT_SCHEME
+
+
+def test_holdout_is_stable_as_the_dataset_grows():
+    small = np.arange(10000000, 10000200)
+    grown = np.arange(10000000, 10001000)
+
+    _, held_small, _, _ = split_training_data(small.reshape(-1, 1), small, small)
+    _, held_grown, _, _ = split_training_data(grown.reshape(-1, 1), grown, grown)
+
+    assert set(held_small[:, 0]) <= set(held_grown[:, 0])
+
+
+def test_tiny_dataset_falls_back_to_random_split():
+    subject_ids = np.array([s for s in range(10000000, 10000100) if not is_holdout_subject(s)][:5])
+
+    assert holdout_scheme(subject_ids) == "random"
+    X_train, X_test, _, _ = split_training_data(subject_ids.reshape(-1, 1), subject_ids, subject_ids)
+    assert len(X_train) + len(X_test) == 5